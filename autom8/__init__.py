@@ -1,10 +1,12 @@
 __version__ = '0.0.7'
 
+from .caching import DatasetCache
 from .cleaning import clean_dataset
 from .context import create_context, RecordingContext, Labels
 from .exceptions import Autom8Exception, Autom8Warning
-from .formats import read_csv
+from .formats import read_csv, read_csv_batches, write_csv
 from .inference import infer_roles
+from .loading import load_csv
 from .main import fit, run
 
 from .matrix import (
@@ -35,3 +37,4 @@ from .preprocessors import (
 )
 
 from .receiver import Accumulator, Receiver
+from .storage import SpillStorage
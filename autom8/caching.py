@@ -0,0 +1,352 @@
+"""An opt-in, on-disk cache of parsed and cleaned datasets."""
+
+from collections import namedtuple
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import __version__
+from .exceptions import expected, typename
+from .matrix import (
+    Column,
+    DictionaryArray,
+    Matrix,
+    SparseArray,
+    StringArray,
+)
+
+
+# The default maximum size of a cache directory, in bytes.
+default_max_size = 1024 * 1024 * 1024
+
+# The number of bytes that we read at once when hashing a file.
+hash_chunk_size = 1024 * 1024
+
+
+CacheEntry = namedtuple('CacheEntry', 'matrix, steps, warnings')
+
+
+class DatasetCache:
+    """Stores matrices and preprocessing steps in a directory on disk.
+
+    Each entry is a subdirectory, named after the entry's key. The values of
+    each column are stored as `.npy` files, so that autom8 can memory-map them
+    when it loads the entry. An encoded column, like a dictionary column or a
+    text column, is stored as the arrays that make it up (and its mask), so
+    that it stays encoded. When the total size of the entries exceeds
+    `max_size`, the cache deletes the least recently used entries.
+
+    The cache also stores plans, like the decisions that autom8 made when it
+    cleaned a dataset with a particular schema. A plan is any picklable object.
+
+    Parameters:
+        directory (str): The path to the cache directory. autom8 creates the
+            directory if it does not exist.
+        max_size (int or None): The maximum number of bytes that the cache
+            may use. Defaults to None, which means `default_max_size`.
+    """
+
+    def __init__(self, directory, max_size=None):
+        if not isinstance(directory, (str, os.PathLike)):
+            raise expected('directory to be a str', typename(directory))
+
+        if max_size is None:
+            max_size = default_max_size
+
+        if not isinstance(max_size, int) or max_size < 1:
+            raise expected('max_size to be a positive int', repr(max_size))
+
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def load(self, key):
+        """Returns the CacheEntry for the key, or None if there isn't one."""
+
+        path = os.path.join(self.directory, key)
+        meta_path = os.path.join(path, 'meta.pkl')
+
+        if not os.path.exists(meta_path):
+            return None
+
+        try:
+            with open(meta_path, 'rb') as f:
+                meta = pickle.load(f)
+            columns = [
+                _load_column(path, index, *info)
+                for index, info in enumerate(meta['columns'])
+            ]
+        except Exception:
+            logging.getLogger('autom8').exception(f'Invalid cache entry: {path}')
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        # Mark this entry as recently used.
+        os.utime(meta_path)
+        return CacheEntry(Matrix(columns), meta['steps'], meta['warnings'])
+
+    def store(self, key, matrix, steps=(), warnings=()):
+        """Stores the matrix, steps, and warnings under the key.
+
+        If the steps cannot be pickled, then this method does nothing.
+        """
+
+        columns, arrays = [], {}
+        for index, col in enumerate(matrix.columns):
+            kind, length, parts = _column_parts(col)
+            columns.append((col.formula, col.role, col.is_original, kind,
+                length, [(name, _can_mmap(part)) for name, part in parts]))
+            for name, part in parts:
+                arrays[f'{index}-{name}.npy'] = part
+
+        try:
+            meta = pickle.dumps({
+                'columns': columns,
+                'steps': list(steps),
+                'warnings': list(warnings),
+            })
+        except Exception:
+            logging.getLogger('autom8').exception('Cannot cache steps')
+            return
+
+        self._write_entry(key, meta, arrays)
+
+    def load_plan(self, key):
+        """Returns the plan stored under the key, or None if there isn't one."""
+
+        path = os.path.join(self.directory, key)
+        meta_path = os.path.join(path, 'meta.pkl')
+
+        if not os.path.exists(meta_path):
+            return None
+
+        try:
+            with open(meta_path, 'rb') as f:
+                plan = pickle.load(f)['plan']
+        except Exception:
+            logging.getLogger('autom8').exception(f'Invalid cache entry: {path}')
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        # Mark this entry as recently used.
+        os.utime(meta_path)
+        return plan
+
+    def store_plan(self, key, plan):
+        """Stores the plan under the key, replacing any previous plan.
+
+        If the plan cannot be pickled, then this method does nothing.
+        """
+
+        try:
+            meta = pickle.dumps({'plan': plan})
+        except Exception:
+            logging.getLogger('autom8').exception('Cannot cache plan')
+            return
+
+        shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+        self._write_entry(key, meta, {})
+
+    def _write_entry(self, key, meta, arrays):
+        # Write the entry into a temporary directory, and then move it into
+        # place, so that other processes never see a partial entry. The
+        # `arrays` map file names to arrays.
+        temp = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+        try:
+            for filename, values in arrays.items():
+                np.save(os.path.join(temp, filename), values,
+                    allow_pickle=True)
+            with open(os.path.join(temp, 'meta.pkl'), 'wb') as f:
+                f.write(meta)
+            os.rename(temp, os.path.join(self.directory, key))
+        except OSError:
+            # Another process may have stored the same entry.
+            pass
+        finally:
+            shutil.rmtree(temp, ignore_errors=True)
+
+        self.evict()
+
+    def evict(self):
+        """Deletes the least recently used entries, until the cache fits."""
+
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _entries(self):
+        # Returns a list of (last used time, path, size) tuples.
+        result = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta_path = os.path.join(path, 'meta.pkl')
+            if name.startswith('.') or not os.path.exists(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, i))
+                for i in os.listdir(path))
+            result.append((os.path.getmtime(meta_path), path, size))
+        return result
+
+
+def create_cache(cache):
+    """Returns a DatasetCache, given a DatasetCache, a directory, or None."""
+
+    if cache is None or isinstance(cache, DatasetCache):
+        return cache
+
+    if isinstance(cache, (str, os.PathLike)):
+        return DatasetCache(cache)
+
+    raise expected('DatasetCache or str or None', typename(cache))
+
+
+def fingerprint(dataset, *settings):
+    """Returns a key for the dataset and the settings, or None.
+
+    When the dataset is an `os.PathLike`, it's the path of a CSV file, so this
+    function hashes the contents of the file. This function returns None when
+    it cannot hash the dataset (like when the dataset is an iterator).
+
+    Every key includes autom8's version, since cache entries contain pickled
+    preprocessing steps, which may not work with a different version.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(f'autom8 {__version__}:'.encode())
+
+    if isinstance(dataset, os.PathLike):
+        digest.update(b'file:')
+        with open(dataset, 'rb') as f:
+            for chunk in iter(lambda: f.read(hash_chunk_size), b''):
+                digest.update(chunk)
+    elif isinstance(dataset, Matrix):
+        digest.update(b'matrix:')
+        for col in dataset.columns:
+            digest.update(repr((col.formula, col.role, str(col.dtype))).encode())
+            digest.update(_values_bytes(col.values))
+    elif isinstance(dataset, np.ndarray):
+        digest.update(f'array:{dataset.dtype}:{dataset.shape}:'.encode())
+        digest.update(_values_bytes(dataset.ravel()))
+    elif isinstance(dataset, (list, tuple)):
+        # Hash one row at a time, instead of building one huge string. (Each
+        # row starts with its length, so that the rows can't run together.)
+        digest.update(b'rows:')
+        for row in dataset:
+            text = repr(row).encode()
+            digest.update(f'{len(text)}:'.encode())
+            digest.update(text)
+    else:
+        return None
+
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()
+
+
+def derive_key(key, *settings):
+    """Returns a new key, for the entry that depends on `key` and `settings`."""
+    return fingerprint([key], *settings)
+
+
+@contextmanager
+def recording_warnings(ctx):
+    """Temporarily wraps the context's receiver, to record its warnings.
+
+    Yields the list of warnings. The original receiver still receives each
+    warning.
+    """
+
+    receiver = ctx.receiver
+    recorder = WarningRecorder(receiver)
+    ctx.receiver = recorder
+    try:
+        yield recorder.warnings
+    finally:
+        ctx.receiver = receiver
+
+
+class WarningRecorder:
+    """Wraps a receiver, and records each warning that it receives."""
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+        self.warnings = []
+
+    def __getattr__(self, name):
+        return getattr(self.receiver, name)
+
+    def warn(self, message):
+        self.warnings.append(message)
+        self.receiver.warn(message)
+
+
+def _can_mmap(values):
+    return values.dtype != object and values.size > 0
+
+
+def _column_parts(col):
+    # Returns the kind of the column's values, the number of rows, and a list
+    # of (name, array) pairs: the arrays that make up the values, and the
+    # mask. Lazy columns are stored as their computed values.
+    values = col.values if col.is_lazy else col._values
+    if isinstance(values, DictionaryArray):
+        kind = 'dictionary'
+        parts = [('codes', values.codes), ('categories', values.categories)]
+    elif isinstance(values, StringArray):
+        kind = 'text'
+        parts = [('data', values.data), ('offsets', values.offsets)]
+    elif isinstance(values, SparseArray):
+        kind = 'sparse'
+        parts = [('indices', values.indices), ('data', values.data)]
+    else:
+        kind = 'dense'
+        parts = [('values', values)]
+
+    if col.mask is not None:
+        parts.append(('mask', col.mask))
+    return kind, len(values), parts
+
+
+def _load_column(path, index, formula, role, is_original, kind, length, parts):
+    arrays = {name: _load_array(path, f'{index}-{name}.npy', mmap)
+        for name, mmap in parts}
+
+    if kind == 'dictionary':
+        values = DictionaryArray(arrays['codes'], arrays['categories'])
+    elif kind == 'text':
+        values = StringArray(arrays['data'], arrays['offsets'])
+    elif kind == 'sparse':
+        values = SparseArray(arrays['indices'], arrays['data'], length)
+    else:
+        values = arrays['values']
+
+    return Column(values, formula, role, is_original, mask=arrays.get('mask'))
+
+
+def _load_array(path, name, mmap):
+    filename = os.path.join(path, name)
+    if mmap:
+        # Use copy-on-write mode, so that changes never reach the file.
+        return np.asarray(np.load(filename, mmap_mode='c'))
+    else:
+        return np.load(filename, allow_pickle=True)
+
+
+def _values_bytes(values):
+    if values.dtype == object:
+        return repr(values.tolist()).encode()
+    else:
+        return np.ascontiguousarray(values).tobytes()
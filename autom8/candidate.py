@@ -22,8 +22,8 @@ def create_candidate(ctx, pipeline):
     return Candidate(
         pipeline=pipeline,
         formulas=ctx.matrix.formulas,
-        train=_evaluate_predictions(ctx, pipeline, *ctx.training_data()),
-        test=_evaluate_predictions(ctx, pipeline, *ctx.testing_data()),
+        train=_evaluate_predictions(ctx, pipeline, *ctx._float_training_data()),
+        test=_evaluate_predictions(ctx, pipeline, *ctx._float_testing_data()),
     )
 
 
@@ -1,5 +1,9 @@
 import numpy as np
 import pandas as pd
+import scipy.sparse
+
+from .exceptions import expected
+from .matrix import DictionaryArray, SparseArray
 
 
 def select_indices(ctx, only_strings=False):
@@ -8,6 +12,8 @@ def select_indices(ctx, only_strings=False):
     def should_be_encoded(col):
         if col.role != 'categorical':
             return False
+        elif only_strings and col.is_dictionary:
+            return any(isinstance(i, str) for i in col._values.categories)
         elif only_strings:
             return any(isinstance(i, str) for i in col.values)
         else:
@@ -22,9 +28,13 @@ def create_encoder(ctx, method, indices):
 
 def encode(ctx, encoder, indices):
     found = ctx.matrix.select_columns(indices)
-    array = found.stack_columns()
     ctx.matrix.drop_columns_by_index(indices)
 
+    # Pass dictionary columns to the encoder as they are, so that it can
+    # encode their distinct values instead of every row.
+    array = [col._values if col.is_dictionary else col.values
+        for col in found.columns]
+
     if ctx.is_recording:
         result = encoder.fit_transform(array)
     else:
@@ -41,12 +51,19 @@ def encode(ctx, encoder, indices):
 
     for i in range(result.shape[1]):
         ctx.matrix.append_column(
-            values=result[:, i],
+            values=_column_values(result, i),
             formula=formulas[i],
             role='encoded',
         )
 
 
+def _column_values(result, index):
+    if scipy.sparse.issparse(result):
+        return SparseArray.from_csc(result, index)
+    else:
+        return result[:, index]
+
+
 def _one_hot_encoded_formulas(encoder, found):
     result = []
     for series, column in zip(encoder.mapping, found.columns):
@@ -101,17 +118,43 @@ class OrdinalEncoder:
         return 'OrdinalEncoder'
 
     def fit_transform(self, X):
-        X = pd.DataFrame(X)
-        self.mapping = [_ordinally_map_series(X[i]) for i in X.columns]
-        return self.transform(X)
+        columns = _columns_of(X)
+        self.mapping = [_ordinally_map_values(i) for i in columns]
+        return self.transform(columns)
 
     def transform(self, X):
-        if not isinstance(X, pd.DataFrame):
-            X = pd.DataFrame(X)
-        for i, series in enumerate(self.mapping):
-            X[i] = X[i].map(series)
-            X[i].fillna(0, inplace=True)
-        return X.values
+        columns = _columns_of(X)
+        if len(columns) != len(self.mapping):
+            raise expected(f'{len(self.mapping)} columns', len(columns))
+        return np.column_stack([_map_values(values, series)
+            for values, series in zip(columns, self.mapping)])
+
+
+def _columns_of(X):
+    # Returns a list of columns, given a 2D array, a DataFrame, or a list of
+    # columns. (The columns in a list may be DictionaryArrays.)
+    if isinstance(X, list):
+        return X
+    if isinstance(X, pd.DataFrame):
+        return [X[i].to_numpy() for i in X.columns]
+    X = np.asarray(X)
+    return [X[:, i] for i in range(X.shape[1])]
+
+
+def _ordinally_map_values(values):
+    if isinstance(values, DictionaryArray):
+        # Keep the order in which the values first appear.
+        first = pd.unique(values.codes)
+        return _ordinally_map_series(pd.Series(values.categories[first]))
+    return _ordinally_map_series(pd.Series(values))
+
+
+def _map_values(values, series):
+    if isinstance(values, DictionaryArray):
+        # Map each distinct value, and then look up each row's value.
+        mapped = pd.Series(values.categories).map(series).fillna(0)
+        return mapped.to_numpy()[values.codes]
+    return pd.Series(values).map(series).fillna(0).to_numpy()
 
 
 def _ordinally_map_series(series):
@@ -139,8 +182,16 @@ class OneHotEncoder:
         return self._elaborate(self._encoder.transform(X))
 
     def _elaborate(self, X):
-        cols = []
+        # Returns a sparse matrix of booleans, with one column for each value
+        # in each mapping.
+        rows = []
         for i, series in enumerate(self.mapping):
             for value in series:
-                cols.append(X[:, i] == value)
-        return np.stack(cols, axis=1)
+                rows.append(np.flatnonzero(X[:, i] == value))
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(i) for i in rows])
+        indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        data = np.ones(len(indices), dtype=bool)
+        return scipy.sparse.csc_matrix((data, indices, indptr),
+            shape=(len(X), len(rows)))
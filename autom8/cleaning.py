@@ -1,9 +1,15 @@
-import re
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import functools
+
 import numpy as np
+
+from .caching import derive_key, recording_warnings
+from .coercion import can_coerce_strings, coerce_strings, string_mask
 from .exceptions import expected, typename
-from .formats import parse_number
-from .matrix import create_array
-from .preprocessors import planner, preprocessor, _drop_weak_columns
+from .matrix import create_array, sample_indices, Matrix
+from .preprocessors import planner, preprocessor, Step, _drop_weak_columns
+from .receiver import Accumulator
 
 
 int_type = (int, np.int64)
@@ -30,36 +36,316 @@ def clean_dataset(ctx):
     type for all the values in that column. For example, if a column has one
     boolean value, then all the values in the column will be booleans.
 
+    If the context has a cache, and no steps have been recorded yet, then this
+    function stores the cleaned matrix and its steps in the cache. The next
+    time that autom8 cleans the same dataset, it loads them from the cache.
+
+    The cache also keeps the steps that cleaned each column, under a
+    fingerprint of the dataset's schema: the name and dtype of each column,
+    and the types of its values. So when autom8 cleans a different dataset
+    with the same schema (like the same sheet, after someone adds a few rows),
+    it plays the cached steps again, instead of deciding what to do with each
+    column. If the steps don't produce the same kinds of columns as before,
+    then autom8 cleans that column from scratch.
+
     Parameters:
         ctx (RecordingContext): The current context.
     """
 
-    for col in ctx.matrix.columns:
-        _clean_column(ctx, col)
+    # Only use the cache when nothing has changed the original dataset.
+    if ctx.cache is None or ctx.dataset_key is None or ctx.steps:
+        _clean_columns(ctx)
+        return
+
+    key = derive_key(ctx.dataset_key, 'clean_dataset', ctx.input_columns)
+    entry = ctx.cache.load(key)
+
+    if entry is not None:
+        for message in entry.warnings:
+            ctx.receiver.warn(message)
+        if ctx.matrix.storage is not None:
+            entry.matrix.spill(ctx.matrix.storage)
+        ctx.matrix = entry.matrix
+        ctx.steps.extend(entry.steps)
+        return
+
+    with recording_warnings(ctx) as warnings:
+        _clean_columns(ctx)
+
+    ctx.cache.store(key, ctx.matrix, ctx.steps, warnings)
+
+
+def _clean_columns(ctx):
+    # Plan each column by itself (maybe in other processes), and then apply
+    # the plans in the order of the columns, so that the steps are the same no
+    # matter how many processes we use.
+    if ctx.cache is None:
+        plans = _plan_columns(ctx.matrix.columns, ctx.processes,
+            ctx.sample_size)
+    else:
+        plans = _plan_columns_with_cache(ctx)
+
+    # Each cleaning step either changes a column in place, or drops it and
+    # appends new columns to the end of the matrix. So keep track of each
+    # column's current index, instead of searching the matrix for it.
+    index = 0
+    for plan in plans:
+        if plan is None:
+            index += 1
+            continue
+
+        for message in plan.warnings:
+            ctx.receiver.warn(message)
+
+        # The plan's steps refer to the column as index 0. When a column needs
+        # more than one step, record a single step that does all of them.
+        if len(plan.steps) > 1:
+            ops = [(step.func, step.args) for step in plan.steps]
+            ctx.steps.append(Step(_clean_values, (index, ops), {}))
+        else:
+            for step in plan.steps:
+                ctx.steps.append(
+                    step._replace(args=_move_index(step.args, index)))
+
+        if plan.kept:
+            ctx.matrix.columns[index] = plan.columns[0]
+            ctx.matrix.columns.extend(plan.columns[1:])
+            index += 1
+        else:
+            ctx.matrix.drop_columns_by_index([index])
+            ctx.matrix.columns.extend(plan.columns)
+
+    # If the matrix spills its columns, then spill any new columns.
+    if ctx.matrix.storage is not None:
+        ctx.matrix.spill()
+
+
+# The result of cleaning one column by itself. When `kept` is True, the first
+# of the `columns` replaces the original column. The other columns go at the
+# end of the matrix. (See `CachedPlan` for the `censuses`.)
+ColumnPlan = namedtuple('ColumnPlan',
+    'kept, columns, steps, warnings, censuses')
+
+
+def _plan_columns(columns, processes, sample_size=None):
+    # Returns a list with a ColumnPlan for each column, or None for each
+    # column that's already clean.
+    indices = [i for i, col in enumerate(columns) if col.dtype == object]
+    todo = [columns[i] for i in indices]
+
+    # Only use other processes when the context asks for them.
+    processes = min(processes or 1, len(todo))
+
+    plan = functools.partial(_plan_column, sample_size=sample_size)
+    if processes <= 1:
+        results = [plan(col) for col in todo]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(plan, todo))
+
+    plans = [None] * len(columns)
+    for index, plan in zip(indices, results):
+        plans[index] = plan
+    return plans
+
+
+def _plan_column(col, sample_size=None):
+    """Cleans a copy of the column by itself, and returns a ColumnPlan.
+
+    This function doesn't change the column, so it can run in another process.
+    """
+    ctx = ColumnContext(col.copy(), sample_size)
+    original = ctx.matrix.columns[0]
+    _clean_column(ctx, original, 0)
+    return _finish_plan(ctx, original)
+
+
+def _finish_plan(ctx, original):
+    columns = ctx.matrix.columns
+    kept = len(columns) > 0 and columns[0] is original
+    return ColumnPlan(kept, columns, ctx.steps, ctx.receiver.warnings,
+        ctx.censuses)
+
+
+class ColumnContext:
+    """A recording context for cleaning one column by itself."""
+
+    def __init__(self, col, sample_size=None):
+        self.matrix = Matrix([col])
+        self.receiver = Accumulator()
+        self.steps = []
+        self.is_recording = True
+        self.sample_size = sample_size
+        self.censuses = []
+
+
+# The steps that cleaned a column, for the cache. (The steps refer to the
+# column as index 0.) The censuses are the (number of steps, census signature)
+# pairs from each time that `_clean_column` counted the column's values. The
+# formulas and dtypes describe the columns that the steps produced.
+CachedPlan = namedtuple('CachedPlan',
+    'steps, censuses, kept, formulas, dtypes')
+
+
+def _plan_columns_with_cache(ctx):
+    # Like `_plan_columns`, but first tries the plans that the cache has for
+    # the matrix's schema. Then it stores any new plans in the cache.
+    columns = ctx.matrix.columns
+    schema = [_fingerprint_column(col, ctx.sample_size) for col in columns]
+    key = derive_key('clean_dataset', schema)
+
+    cached = ctx.cache.load_plan(key)
+    if cached is None or len(cached) != len(columns):
+        cached = [None] * len(columns)
+
+    plans = [None] * len(columns)
+    todo = []
+    for index, (col, entry) in enumerate(zip(columns, cached)):
+        if col.dtype != object:
+            continue
+        if entry is not None:
+            plans[index] = _replay_plan(col, entry, ctx.sample_size)
+        if plans[index] is None:
+            todo.append(index)
+
+    found = _plan_columns([columns[i] for i in todo], ctx.processes,
+        ctx.sample_size)
+    for index, plan in zip(todo, found):
+        plans[index] = plan
+
+    new_entries = [_cached_plan(plan) for plan in plans]
+    if new_entries != cached:
+        ctx.cache.store_plan(key, new_entries)
+    return plans
+
+
+def _fingerprint_column(col, sample_size=None):
+    # Identifies the column by its name, its dtype, and the parts of its
+    # census that decide how to clean it. (These don't count the values, so
+    # they don't change when someone adds more rows of the same kinds.)
+    if col.dtype != object:
+        return (col.formula, str(col.dtype), None)
+
+    if col.mask is not None and col._values.dtype.kind in 'biuf':
+        return (col.formula, str(col.dtype), (col._values.dtype.name,
+            bool(col.mask.any()), bool(col.mask.all())))
+
+    census = _take_census(col, sample_size)
+    return (col.formula, str(col.dtype), _census_signature(census))
+
+
+def _census_signature(census):
+    # The parts of a census that `_clean_column_step` looks at: which kinds of
+    # values the column contains, and what its strings look like.
+    kinds = [census.num_bools, census.num_floats, census.num_ints,
+        census.num_none, census.num_strings, census.num_other]
+    return (
+        tuple(num > 0 for num in kinds),
+        census.numeric_strings,
+        census.num_blank > 0,
+        census.num_empty > 0,
+        census.num_blank + census.num_empty == census.num_strings,
+    )
+
+
+def _cached_plan(plan):
+    # Doesn't cache the plans of dropped columns, since they're cheap to plan
+    # again. (And planning them again produces their warnings.)
+    if plan is None or not plan.columns:
+        return None
+
+    return CachedPlan(
+        steps=plan.steps,
+        censuses=plan.censuses,
+        kept=plan.kept,
+        formulas=[col.formula for col in plan.columns],
+        dtypes=[str(col.dtype) for col in plan.columns],
+    )
+
+
+def _replay_plan(col, cached, sample_size=None):
+    # Plays the cached steps on a copy of the column, and returns a new
+    # ColumnPlan. Returns None if `_clean_column` would have counted different
+    # kinds of values along the way, if the steps don't produce the same
+    # columns as before, or if any of the new columns aren't clean.
+    ctx = ColumnContext(col.copy(), sample_size)
+    ctx.censuses = list(cached.censuses)
+    original = ctx.matrix.columns[0]
+
+    # The first census is part of the column's fingerprint, so only check the
+    # ones that came after some of the steps.
+    checkpoints = {i: signature for i, signature in cached.censuses if i > 0}
+
+    try:
+        for position in range(len(cached.steps) + 1):
+            signature = checkpoints.get(position)
+            if signature is not None and signature != _census_signature(
+                    _take_census(original, sample_size)):
+                return None
+            if position < len(cached.steps):
+                step = cached.steps[position]
+                step.func(ctx, *step.args, **step.kwargs)
+    except Exception:
+        return None
+
+    plan = _finish_plan(ctx, original)
+    if _cached_plan(plan) != cached:
+        return None
+
+    return plan if all(_is_clean(i) for i in plan.columns) else None
+
+
+def _is_clean(col):
+    # Indicates if the column has a numpy dtype, or if it only contains
+    # strings.
+    if col.dtype != object:
+        return True
+
+    if col.mask is not None:
+        return False
+
+    if col.is_text:
+        return True
+
+    values = col._values.categories if col.is_dictionary else col.values
+    return bool(string_mask(values).all())
+
 
+def _move_index(args, index):
+    # Each cleaning step's first argument is either the index of its column,
+    # or a list that contains the index.
+    first = [index] if isinstance(args[0], list) else index
+    return (first,) + args[1:]
 
-def _clean_column(ctx, col):
+
+def _clean_column(ctx, col, index):
     # If numpy inferred a real dtype for this column, then it's clean enough.
     # TODO: Consider bipartitioning columns with nan values.
     if col.dtype != object:
         return
 
-    index = ctx.matrix.columns.index(col)
-    values = col.values
-    num_values = len(values)
+    # A masked column of numbers just needs its missing values flagged.
+    if col.mask is not None and col._values.dtype.kind in 'biuf':
+        _clean_masked_column(ctx, col, index)
+        return
 
-    num_bools = sum(1 for i in values if isinstance(i, bool))
-    num_floats = sum(1 for i in values if isinstance(i, float))
+    # Count the column's values once. Each step that rewrites the column
+    # returns the new counts, and then we decide what to do next. (Unless
+    # numpy inferred a real dtype for the new values.)
+    census = _count_values(ctx, col)
+    while census is not None and col.dtype == object:
+        census = _clean_column_step(ctx, col, index, census)
 
-    num_ints = sum(1 for i in values
-        if isinstance(i, int_type)
-        and not isinstance(i, bool))
 
-    num_none = sum(1 for i in values if i is None)
-    num_strings = sum(1 for i in values if isinstance(i, str))
-    computed_total = num_bools + num_floats + num_ints + num_none + num_strings
+def _clean_column_step(ctx, col, index, census):
+    # Performs one cleaning step. Returns the census of the rewritten column,
+    # or None when the column is clean.
+    num_values = census.num_values
+    num_none = census.num_none
+    num_strings = census.num_strings
 
-    if computed_total != num_values:
+    if census.num_other:
+        values = col.values
         try:
             found = {typename(i) for i in values if i is not None
                 and not isinstance(i, (bool, int, float, str, np.int64))}
@@ -68,73 +354,73 @@ def _clean_column(ctx, col):
         ctx.receiver.warn(f'Dropping column "{col.name}". A column must only'
             f' contain booleans, numbers, and strings. Received: {found}.')
         _drop_weak_columns(ctx, [index])
-        return
+        return None
 
     # Record the number of values for each type.
-    counts = {bool: num_bools, float: num_floats, int: num_ints}
+    counts = {
+        bool: census.num_bools,
+        float: census.num_floats,
+        int: census.num_ints,
+    }
 
     # If we somehow got an array of primitives with dtype == object, then just
     # coerce it to the appropriate type.
     for typ, num in counts.items():
         if num == num_values:
             _coerce_column(ctx, index, typ)
-            return
+            return None
 
     # If we have all None values, then drop this column.
     if num_none == num_values:
         ctx.receiver.warn(f'Dropping column of all None values: {col.name}')
         _drop_weak_columns(ctx, [index])
-        return
+        return None
 
     # If we have some strings, see if we can convert them all to numbers.
-    if num_strings > 0 and _can_coerce_all_strings_to_numbers(values):
+    # (This changes the types of the values, so count them again.)
+    if num_strings > 0 and census.numeric_strings:
         _coerce_strings_to_numbers(ctx, index)
-        _clean_column(ctx, col)
-        return
+        return _count_values(ctx, col)
 
     # If we have all strings, then we're clean. Just leave this column alone.
     if num_strings == num_values:
-        assert all(isinstance(i, str) for i in values)
-        return
+        return None
 
     # If we have all strings, but some are None, then use the empty string.
     # (And don't warn the user about the None values in this case.)
     if num_strings + num_none == num_values:
         _replace_none_values(ctx, index, '')
-        return
+        return None
 
     # If we have some ints and some floats, then coerce the ints to floats
-    # and recur.
-    if num_ints > 0 and num_floats > 0:
+    # and try again. (Booleans are ints too, so they also become floats.)
+    if census.num_ints > 0 and census.num_floats > 0:
         _coerce_ints_to_floats(ctx, index)
-        _clean_column(ctx, col)
-        return
+        return census._replace(
+            num_floats=census.num_floats + census.num_ints + census.num_bools,
+            num_ints=0, num_bools=0)
 
     # If any strings are blank, then replace them with the empty string and
-    # recur.
-    if any(i.isspace() for i in values if isinstance(i, str)):
+    # try again.
+    if census.num_blank > 0:
         _replace_blank_strings(ctx, index)
-        _clean_column(ctx, col)
-        return
+        return census._replace(
+            num_empty=census.num_empty + census.num_blank, num_blank=0)
 
     # If all of the strings are the empty string, then replace the empty
-    # strings with None and recur.
-    if num_strings > 0 and all(i == '' for i in values if isinstance(i, str)):
+    # strings with None and try again.
+    if num_strings > 0 and census.num_empty == num_strings:
         _replace_empty_strings(ctx, index, None)
-        _clean_column(ctx, col)
-        return
+        return census._replace(num_none=num_none + num_strings,
+            num_strings=0, num_empty=0)
 
     # If we have all primitive values, but some are None, then replace None
     # values with the appropriate zero value. Add a boolean column that records
     # which values were missing.
     for typ, num in counts.items():
         if num + num_none == num_values:
-            ctx.receiver.warn(
-                f'Column {repr(col.name)} has {num_none} missing'
-                f' value{"" if num_none == 1 else "s"}.'
-            )
             _flag_missing_values(ctx, index, typ(0))
-            return
+            return None
 
     # Now we know we have some strings, some numbers, and maybe some Nones.
     # We also know that the nonempty strings cannot all be coerced into
@@ -144,6 +430,166 @@ def _clean_column(ctx, col):
     # this column into two columns: one for numbers and another for strings.
     _coerce_strings_to_numbers(ctx, index)
     _bipartition_strings(ctx, index)
+    return None
+
+
+def _count_values(ctx, col):
+    # Takes a census of the column, and records its signature, so that a
+    # cached plan can check that the census would say the same thing.
+    census = _take_census(col, ctx.sample_size)
+    ctx.censuses.append((len(ctx.steps), _census_signature(census)))
+    return census
+
+
+Census = namedtuple('Census', [
+    'num_values',
+    'num_bools',
+    'num_floats',
+    'num_ints',
+    'num_none',
+    'num_strings',
+    'num_other',
+
+    # The number of strings that only contain spaces, and the number of empty
+    # strings.
+    'num_blank',
+    'num_empty',
+
+    # Indicates if each string can be coerced to a number.
+    'numeric_strings',
+])
+
+
+def _take_census(col, sample_size=None):
+    """Counts the types of the column's values, all at once.
+
+    For a dictionary column, this function only looks at each distinct value,
+    and weighs it by the number of times that it appears. For a text column,
+    it gets the counts from the column's mask.
+
+    When `sample_size` is an int, and the column has more rows than that, this
+    function checks a sample of the strings before it checks all of them. If
+    any string in the sample is not a number, then the whole column can't be
+    coerced to numbers, so the other strings don't matter.
+
+    >>> from autom8.matrix import Column
+    >>> values = np.array([1, 2.5, None, ' ', '', 'x', True], dtype=object)
+    >>> census = _take_census(Column(values, 'A', None, True))
+    >>> census.num_ints, census.num_floats, census.num_bools, census.num_none
+    (1, 1, 1, 1)
+    >>> census.num_strings, census.num_blank, census.num_empty
+    (3, 1, 1)
+    >>> census.numeric_strings
+    False
+    """
+
+    totals = dict.fromkeys(['bool', 'float', 'int', 'none', 'str', 'other'], 0)
+
+    if col.is_text:
+        # A text column only contains strings and missing values, so don't
+        # decode its values unless we need to.
+        num_defined = len(col) if col.mask is None else int(
+            np.count_nonzero(col.mask))
+        totals['str'] = num_defined
+        totals['none'] = len(col) - num_defined
+        values = weights = None
+    else:
+        if col.is_dictionary:
+            values = col._values.categories
+            weights = col._values.counts().tolist()
+        else:
+            values = col.values
+            weights = None
+
+        # Count the values of each type. (There are usually only a few
+        # distinct types, so look at each type just once.)
+        if weights is None:
+            type_counts = Counter(map(type, values))
+        else:
+            type_counts = Counter()
+            for typ, weight in zip(map(type, values), weights):
+                type_counts[typ] += weight
+
+        for typ, count in type_counts.items():
+            totals[_type_kind(typ)] += count
+
+    num_strings = totals['str']
+    num_blank = num_empty = 0
+    numeric_strings = True
+
+    if num_strings > 0 and sample_size is not None and len(col) > sample_size:
+        sample = col.select_rows(sample_indices(len(col), sample_size))
+        numeric_strings = _can_coerce_all_strings_to_numbers(sample.values)
+
+    # Only look for blank strings when there's something besides strings and
+    # None values, since that's the only time that they matter.
+    has_others = num_strings + totals['none'] < len(col)
+
+    if num_strings > 0 and (numeric_strings or has_others):
+        if values is None:
+            # Decode the text column without putting None in its missing
+            # values, since only the strings matter.
+            values = col._values.toarray()
+            if col.mask is not None:
+                values = values[col.mask]
+        is_str = string_mask(values)
+        strings = values[is_str]
+        if numeric_strings:
+            numeric_strings = _can_coerce_all_strings_to_numbers(strings)
+
+        if has_others:
+            text = strings.tolist()
+            str_weights = ([1] * len(text) if weights is None
+                else np.asarray(weights)[is_str].tolist())
+            num_blank = sum(w for i, w in zip(text, str_weights) if i.isspace())
+            num_empty = sum(w for i, w in zip(text, str_weights) if i == '')
+
+    return Census(
+        num_values=len(col),
+        num_bools=totals['bool'],
+        num_floats=totals['float'],
+        num_ints=totals['int'],
+        num_none=totals['none'],
+        num_strings=num_strings,
+        num_other=totals['other'],
+        num_blank=num_blank,
+        num_empty=num_empty,
+        numeric_strings=numeric_strings,
+    )
+
+
+def _type_kind(typ):
+    # Classifies values the same way as `isinstance`, so subclasses count.
+    if typ is type(None):
+        return 'none'
+    if issubclass(typ, bool):
+        return 'bool'
+    if issubclass(typ, float):
+        return 'float'
+    if issubclass(typ, int_type):
+        return 'int'
+    if issubclass(typ, str):
+        return 'str'
+    return 'other'
+
+
+def _clean_masked_column(ctx, col, index):
+    # Follows the same rules as `_clean_column`, but it gets the counts from
+    # the dtype and the mask, instead of looking at each value.
+    num_values = len(col)
+    num_none = num_values - int(np.count_nonzero(col.mask))
+    typ = {'b': bool, 'f': float}.get(col._values.dtype.kind, int)
+
+    if num_none == 0:
+        _coerce_column(ctx, index, typ)
+        return
+
+    if num_none == num_values:
+        ctx.receiver.warn(f'Dropping column of all None values: {col.name}')
+        _drop_weak_columns(ctx, [index])
+        return
+
+    _flag_missing_values(ctx, index, typ(0))
 
 
 @preprocessor
@@ -152,23 +598,6 @@ def _coerce_column(ctx, index, to_type):
     col.coerce(to_type)
 
 
-_string_to_number_regex = re.compile(r'''
-    ^\s* # leading spaces
-    \$*  # any number of dollar sign characters
-    (
-        [\-\+]?  # optional sign
-        (
-            \.[0-9_]+      # decimal part without integral part
-            |              # OR
-            [0-9,_]+       # integral part
-            (\.[0-9_]*)?   # and optional decimal part
-        )
-    )
-    \%*  # any number of percent characters
-    \s*$ # trailing spaces
-''', re.VERBOSE)
-
-
 def _can_coerce_all_strings_to_numbers(values):
     """Tests if each string in the collection can be coerced to a number.
 
@@ -202,46 +631,41 @@ def _can_coerce_all_strings_to_numbers(values):
     >>> _can_coerce_all_strings_to_numbers(['1+2'])
     False
     """
-    return all(_string_to_number_regex.match(i)
-        for i in values if isinstance(i, str))
+    if isinstance(values, np.ndarray):
+        strings = values[string_mask(values)]
+    else:
+        strings = [i for i in values if isinstance(i, str)]
+    return can_coerce_strings(strings)
 
 
 @preprocessor
 def _coerce_strings_to_numbers(ctx, index):
     col = ctx.matrix.columns[index]
-    new_values = [_coerce_string_to_number(i)
-        if isinstance(i, str) else i
-        for i in col.values]
-    col.values = create_array(new_values)
-
+    new_values = np.array(col.values, dtype=object)
+    is_str = string_mask(new_values)
 
-def _coerce_string_to_number(obj):
-    assert isinstance(obj, str)
+    if is_str.any():
+        strings = new_values[is_str]
+        numbers, invalid = coerce_strings(strings)
 
-    # Remove leading and trailing whitespace.
-    obj = obj.strip()
+        # Keep the strings that aren't numbers, but remove their spaces.
+        if invalid.any():
+            numbers[invalid] = np.char.strip(strings[invalid].astype(str))
 
-    # Replace the empty string with None.
-    if obj == '':
-        return None
+        new_values[is_str] = numbers
 
-    try:
-        return parse_number(obj)
-    except Exception:
-        pass
-
-    # Pull out the number part and try parsing it.
-    try:
-        m = _string_to_number_regex.match(obj)
-        return parse_number(m.group(1)) if m else obj
-    except Exception:
-        # If we still can't parse it, then just admit defeat.
-        return obj
+    col.values = create_array(new_values.tolist())
 
 
 @preprocessor
 def _replace_none_values(ctx, index, replacement):
     col = ctx.matrix.columns[index]
+
+    # A masked text column already has empty strings for its None values.
+    if col.is_text and col.mask is not None and replacement == '':
+        col.mask = None
+        return
+
     new_values = [replacement if i is None else i for i in col.values]
     col.values = create_array(new_values)
 
@@ -275,11 +699,31 @@ def _replace_empty_strings(ctx, index, replacement):
 @preprocessor
 def _flag_missing_values(ctx, index, replacement):
     col = ctx.matrix.columns[index]
-    new_values = [replacement if i is None else i for i in col.values]
+
+    # Use the mask when the column has one, so that the numbers never have to
+    # become objects.
+    if col.mask is not None and isinstance(col._values, np.ndarray):
+        new_values = np.where(col.mask, col._values, replacement)
+        is_defined = np.array(col.mask)
+    else:
+        values = col.values
+        new_values = create_array(
+            [replacement if i is None else i for i in values])
+        is_defined = values != None
+
+    # Warn about the missing values here, instead of where we decided to flag
+    # them, so that a cached cleaning plan warns about the current number.
+    if ctx.is_recording:
+        num_none = len(is_defined) - int(np.count_nonzero(is_defined))
+        ctx.receiver.warn(
+            f'Column {repr(col.name)} has {num_none} missing'
+            f' value{"" if num_none == 1 else "s"}.'
+        )
+
     ctx.matrix.drop_columns_by_index([index])
-    ctx.matrix.columns.append(col.copy_with(create_array(new_values)))
+    ctx.matrix.columns.append(col.copy_with(new_values))
     ctx.matrix.append_column(
-        values=col.values != None,
+        values=is_defined,
         formula=['is-defined', col],
         role='encoded',
         is_original=True,
@@ -293,9 +737,10 @@ def _bipartition_strings(ctx, index):
     col = ctx.matrix.columns[index]
     ctx.matrix.drop_columns_by_index([index])
 
+    values = col.values
     is_num = lambda x: x is not None and not isinstance(x, str)
-    numbers = [i if is_num(i) else 0 for i in col.values]
-    strings = [i if isinstance(i, str) else '' for i in col.values]
+    numbers = [i if is_num(i) else 0 for i in values]
+    strings = [i if isinstance(i, str) else '' for i in values]
 
     ctx.matrix.append_column(
         values=create_array(numbers),
@@ -310,3 +755,128 @@ def _bipartition_strings(ctx, index):
         role=None,
         is_original=True,
     )
+
+
+@preprocessor
+def _clean_values(ctx, index, ops):
+    """Cleans a column's values in a single pass."""
+
+    # Each op is a cleaning step and its arguments, which refer to the column
+    # as index 0. The steps in `_fused_steps` work on the same array of
+    # values, instead of creating a new array each time. Any other step runs
+    # as usual, on the current values.
+    col = ctx.matrix.columns[index]
+    values = FusedValues(col.values)
+
+    for func, args in ops:
+        fused = _fused_steps.get(func)
+        if fused is not None:
+            fused(values, *args[1:])
+            values.settle()
+            continue
+
+        col.values = values.array
+        func.__wrapped__(ctx, *_move_index(args, index))
+
+        # Stop if the step replaced the column.
+        columns = ctx.matrix.columns
+        if index >= len(columns) or columns[index] is not col:
+            return
+        values = FusedValues(col.values)
+
+    col.values = values.array
+
+
+class FusedValues:
+    """The values of a column, while `_clean_values` cleans them.
+
+    When the array contains objects, this class keeps track of which values
+    are strings and which are None. After each step, `settle` converts the
+    array to a numpy dtype when `create_array` would have done so.
+    """
+
+    def __init__(self, array):
+        if array.dtype == object:
+            self.array = np.array(array, dtype=object)
+            self.is_str = string_mask(self.array)
+            with np.errstate(all='ignore'):
+                self.is_none = ~self.is_str & (self.array == None)
+        else:
+            self.array = array
+            self.is_str = self.is_none = np.zeros(len(array), dtype=bool)
+
+    @property
+    def is_object(self):
+        return self.array.dtype == object
+
+    def assign(self, where, replacement):
+        self.array[where] = replacement
+        self.is_str[where] = isinstance(replacement, str)
+        self.is_none[where] = replacement is None
+
+    def settle(self):
+        # Like `create_array`, let numpy infer the dtype when there aren't any
+        # strings. (When there are None values, the dtype is still object.)
+        if self.is_object and not self.is_str.any() and not self.is_none.any():
+            self.array = np.array(self.array.tolist())
+            self.is_str = self.is_none = np.zeros(len(self.array), dtype=bool)
+
+
+def _fuse_replace_blank_strings(values):
+    if values.is_object and values.is_str.any():
+        indices = np.flatnonzero(values.is_str)
+        blank = [i.isspace() for i in values.array[indices].tolist()]
+        values.assign(indices[np.array(blank, dtype=bool)], '')
+
+
+def _fuse_replace_empty_strings(values, replacement):
+    if values.is_object and values.is_str.any():
+        with np.errstate(all='ignore'):
+            empty = values.is_str & (values.array == '')
+        values.assign(empty, replacement)
+
+
+def _fuse_replace_none_values(values, replacement):
+    if values.is_object and values.is_none.any():
+        values.assign(values.is_none.copy(), replacement)
+
+
+def _fuse_coerce_strings_to_numbers(values):
+    if not values.is_object or not values.is_str.any():
+        return
+
+    indices = np.flatnonzero(values.is_str)
+    strings = values.array[indices]
+    numbers, invalid = coerce_strings(strings)
+
+    # Keep the strings that aren't numbers, but remove their spaces.
+    if invalid.any():
+        numbers[invalid] = np.char.strip(strings[invalid].astype(str))
+
+    values.array[indices] = numbers
+    converted = indices[~invalid]
+    values.is_str[converted] = False
+    with np.errstate(all='ignore'):
+        values.is_none[converted] = numbers[~invalid] == None
+
+
+def _fuse_coerce_ints_to_floats(values):
+    if not values.is_object:
+        if values.array.dtype == np.int64:
+            values.array = values.array.astype(float)
+        return
+
+    is_int = np.fromiter((isinstance(i, int_type) for i in values.array),
+        dtype=bool, count=len(values.array))
+    if is_int.any():
+        values.array[is_int] = values.array[is_int].astype(float)
+
+
+# The cleaning steps that `_clean_values` performs on an array of values.
+_fused_steps = {
+    _coerce_ints_to_floats: _fuse_coerce_ints_to_floats,
+    _coerce_strings_to_numbers: _fuse_coerce_strings_to_numbers,
+    _replace_blank_strings: _fuse_replace_blank_strings,
+    _replace_empty_strings: _fuse_replace_empty_strings,
+    _replace_none_values: _fuse_replace_none_values,
+}
@@ -0,0 +1,268 @@
+"""Functions for converting whole arrays of strings into numbers at once."""
+
+import re
+import numpy as np
+
+from .formats import parse_number
+
+
+_string_to_number_regex = re.compile(r'''
+    ^\s* # leading spaces
+    \$*  # any number of dollar sign characters
+    (
+        [\-\+]?  # optional sign
+        (
+            \.[0-9_]+      # decimal part without integral part
+            |              # OR
+            [0-9,_]+       # integral part
+            (\.[0-9_]*)?   # and optional decimal part
+        )
+    )
+    \%*  # any number of percent characters
+    \s*$ # trailing spaces
+''', re.VERBOSE)
+
+
+# Matches a newline-separated list of stripped strings, when each one matches
+# `_string_to_number_regex`.
+_number_pattern = r'\$*[\-\+]?(?:\.[0-9_]+|[0-9,_]+(?:\.[0-9_]*)?)\%*'
+_number_list_regex = re.compile(rf'{_number_pattern}(?:\n{_number_pattern})*')
+
+
+def string_mask(values):
+    """Returns a boolean array that indicates which values are strings.
+
+    >>> string_mask(np.array(['a', 1, None, 'b'], dtype=object)).tolist()
+    [True, False, False, True]
+    """
+
+    if not isinstance(values, np.ndarray) or values.dtype == object:
+        return np.fromiter((isinstance(i, str) for i in values), dtype=bool,
+            count=len(values))
+    else:
+        return np.full(len(values), values.dtype.kind == 'U')
+
+
+def can_coerce_strings(strings):
+    """Tests if each string can be coerced to a number by `coerce_strings`.
+
+    This function uses the grammar of `_string_to_number_regex`, but it checks
+    all of the strings with a single regular expression search.
+
+    >>> can_coerce_strings(['1.0', '$2', '3%', ' .4 ', '5.', '-6', '+7'])
+    True
+
+    >>> can_coerce_strings(['1', '2', 'foo'])
+    False
+
+    >>> can_coerce_strings([])
+    True
+    """
+
+    if len(strings) == 0:
+        return True
+
+    text = [i.strip() for i in strings]
+    joined = '\n'.join(text)
+
+    # If any string contains a newline, then check each one separately.
+    if joined.count('\n') != len(text) - 1:
+        return all(_string_to_number_regex.match(i) for i in strings)
+
+    return _number_list_regex.fullmatch(joined) is not None
+
+
+def coerce_strings(strings, strict=False):
+    """Converts an array of strings into numbers, all at once.
+
+    When `strict` is False, this function follows the rules that
+    `autom8.clean_dataset` uses for strings: It ignores leading and trailing
+    spaces, dollar signs, percent signs, commas, and underscores. And it
+    converts blank strings to None.
+
+    When `strict` is True, this function follows the rules of
+    `autom8.formats.parse_number`.
+
+    Parameters:
+        strings (list[str] or numpy.ndarray): The strings to convert.
+        strict (bool): Indicates if only plain numbers should be converted.
+
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray): An object array of ints, floats,
+        and None values, and a boolean array that indicates which strings could
+        not be converted. (The first array contains None for these strings.)
+
+    >>> values, invalid = coerce_strings(['1', ' 2.5 ', '$3,000', '', 'x'])
+    >>> values.tolist()
+    [1, 2.5, 3000, None, None]
+    >>> invalid.tolist()
+    [False, False, False, False, True]
+
+    >>> values, invalid = coerce_strings(['1', '0xff', '$3', ''], strict=True)
+    >>> values.tolist()
+    [1, 255, None, None]
+    >>> invalid.tolist()
+    [False, False, True, True]
+    """
+
+    num_strings = len(strings)
+    if num_strings == 0:
+        return np.empty(0, dtype=object), np.zeros(0, dtype=bool)
+
+    # Use python's string methods here, since they are faster than the
+    # functions in numpy.char.
+    if strict:
+        text = [str(i) for i in strings]
+        blank = np.zeros(num_strings, dtype=bool)
+    else:
+        text = [i.strip() for i in strings]
+        blank = np.array([i == '' for i in text], dtype=bool)
+
+    cleaned = [i.replace(',', '').replace('_', '') for i in text]
+    values = _parse_plain_numbers(cleaned, blank)
+
+    # Maybe the strings contain dollar signs and percent signs.
+    if values is None and not strict and can_coerce_strings(
+            [i for i in text if i]):
+        cleaned = [i.lstrip('$').rstrip('%') for i in cleaned]
+        values = _parse_plain_numbers(cleaned, blank)
+
+    if values is None:
+        return _coerce_distinct_strings(strings, strict)
+
+    values[blank] = None
+    return values, np.zeros(num_strings, dtype=bool)
+
+
+def coerce_to_numbers(values, to_type=float, default=0):
+    """Converts an array of arbitrary values into an array of numbers.
+
+    Strings are converted with `parse_number`. Other values are converted with
+    `to_type`. Values that cannot be converted become the `default` value.
+
+    >>> coerce_to_numbers(np.array([1, 2.5, '3', 'hi', None], dtype=object))
+    array([1. , 2.5, 3. , 0. , 0. ])
+
+    >>> coerce_to_numbers(np.array([True, '0x10', object(), 7.9], dtype=object), int)
+    array([ 1, 16,  0,  7])
+    """
+
+    values = np.asarray(values, dtype=object)
+    result = np.full(len(values), default, dtype=to_type)
+
+    is_str = string_mask(values)
+    if is_str.any():
+        numbers, invalid = coerce_strings(values[is_str], strict=True)
+        numbers[invalid] = default
+        result[is_str] = _convert_objects(numbers, to_type, default)
+
+    is_other = ~is_str & (values != None)
+    if is_other.any():
+        result[is_other] = _convert_objects(values[is_other], to_type, default)
+
+    return result
+
+
+def _parse_plain_numbers(cleaned, blank):
+    # Returns None unless every string (that isn't blank) is a plain int or
+    # float literal.
+    cleaned = np.array(cleaned, dtype=str)
+    if blank.any():
+        cleaned = np.where(blank, '0', cleaned)
+
+    try:
+        return cleaned.astype(np.int64).astype(object)
+    except OverflowError:
+        return None
+    except ValueError:
+        pass
+
+    try:
+        floats = cleaned.astype(np.float64)
+    except ValueError:
+        return None
+
+    # Keep the int literals as ints, like `parse_number` does. Only whole
+    # numbers can be int literals, so just check those strings.
+    result = floats.astype(object)
+    is_int = np.zeros(len(cleaned), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        is_whole = np.flatnonzero(np.mod(floats, 1) == 0)
+    is_int[is_whole] = [i.strip().lstrip('+-').isdigit() for i in
+        cleaned[is_whole].tolist()]
+    if is_int.any():
+        try:
+            result[is_int] = cleaned[is_int].astype(np.int64).astype(object)
+        except (OverflowError, ValueError):
+            return None
+    return result
+
+
+def _coerce_distinct_strings(strings, strict):
+    convert = _parse_number_or_none if strict else _coerce_string_to_number
+    converted = {}
+    values = np.empty(len(strings), dtype=object)
+    invalid = np.zeros(len(strings), dtype=bool)
+
+    for index, string in enumerate(strings):
+        try:
+            value = converted[string]
+        except KeyError:
+            value = converted[string] = convert(string)
+
+        if isinstance(value, str):
+            invalid[index] = True
+        elif value is not None:
+            values[index] = value
+        elif strict:
+            invalid[index] = True
+
+    return values, invalid
+
+
+def _parse_number_or_none(obj):
+    try:
+        return parse_number(obj)
+    except Exception:
+        return None
+
+
+def _coerce_string_to_number(obj):
+    assert isinstance(obj, str)
+
+    # Remove leading and trailing whitespace.
+    obj = obj.strip()
+
+    # Replace the empty string with None.
+    if obj == '':
+        return None
+
+    try:
+        return parse_number(obj)
+    except Exception:
+        pass
+
+    # Pull out the number part and try parsing it.
+    try:
+        m = _string_to_number_regex.match(obj)
+        return parse_number(m.group(1)) if m else obj
+    except Exception:
+        # If we still can't parse it, then just admit defeat.
+        return obj
+
+
+def _convert_objects(values, to_type, default):
+    try:
+        return values.astype(to_type)
+    except Exception:
+        pass
+
+    def conv(x):
+        if isinstance(x, to_type):
+            return x
+        try:
+            return to_type(x)
+        except Exception:
+            return default
+
+    return np.array([conv(x) for x in values], dtype=to_type)
@@ -2,16 +2,19 @@ from collections import namedtuple
 from contextlib import contextmanager
 import logging
 import random
+import threading
 
 import numpy as np
 import scipy.sparse
 
+from .caching import create_cache, fingerprint, WarningRecorder
 from .candidate import create_candidate
 from .categories import LabelEncoder
 from .docstrings import render_docstring
 from .exceptions import expected, typename
 from .inference import _infer_role
 from .matrix import create_matrix, Matrix
+from .storage import is_spilled, SpillStorage
 from .pipeline import Pipeline
 from .receiver import Receiver
 
@@ -27,6 +30,12 @@ def create_context(
     random_state=None,
     allow_multicore=True,
     executor_class=None,
+    cache=None,
+    compact=False,
+    memory_limit=None,
+    spill=False,
+    processes=None,
+    sample_size=None,
     receiver=None,
 ):
     """Returns a new `autom8.RecordingContext` object, ready to create pipelines.
@@ -45,9 +54,17 @@ def create_context(
     if receiver is None:
         receiver = Receiver()
 
+    cache = create_cache(cache)
+    dataset_key = None
+    if cache is not None:
+        dataset_key = fingerprint(dataset, column_names, column_roles)
+
     # Small optimization: don't copy the matrix if we don't need to.
     if isinstance(dataset, Matrix) and column_names is None and column_roles is None:
         matrix = dataset
+    elif dataset_key is not None:
+        matrix = _load_matrix(cache, dataset_key, receiver,
+            dataset, column_names, column_roles)
     else:
         matrix = create_matrix(
             dataset=dataset,
@@ -120,6 +137,31 @@ def create_context(
     if executor_class is None:
         executor_class = SynchronousExecutor
 
+    if not isinstance(compact, bool):
+        raise expected('compact to be a bool', typename(compact))
+
+    if memory_limit is not None and (not isinstance(memory_limit, int)
+            or isinstance(memory_limit, bool) or memory_limit < 1):
+        raise expected('memory_limit to be a positive int or None',
+            repr(memory_limit))
+
+    if not isinstance(spill, (bool, str)):
+        raise expected('spill to be a bool or a str', typename(spill))
+
+    if processes is not None and (not isinstance(processes, int)
+            or isinstance(processes, bool) or processes < 1):
+        raise expected('processes to be a positive int or None',
+            repr(processes))
+
+    if sample_size is not None and (not isinstance(sample_size, int)
+            or isinstance(sample_size, bool) or sample_size < 1):
+        raise expected('sample_size to be a positive int or None',
+            repr(sample_size))
+
+    if spill is not False:
+        matrix = matrix if matrix is not dataset else matrix.copy()
+        matrix.spill(SpillStorage(None if spill is True else spill))
+
     return RecordingContext(
         matrix=matrix,
         labels=labels,
@@ -129,9 +171,33 @@ def create_context(
         allow_multicore=allow_multicore,
         executor_class=executor_class,
         receiver=receiver,
+        cache=cache,
+        dataset_key=dataset_key,
+        compact=compact,
+        memory_limit=memory_limit,
+        processes=processes,
+        sample_size=sample_size,
     )
 
 
+def _load_matrix(cache, key, receiver, dataset, column_names, column_roles):
+    entry = cache.load(key)
+    if entry is not None:
+        for message in entry.warnings:
+            receiver.warn(message)
+        return entry.matrix
+
+    recorder = WarningRecorder(receiver)
+    matrix = create_matrix(
+        dataset=dataset,
+        column_names=column_names,
+        column_roles=column_roles,
+        receiver=recorder,
+    )
+    cache.store(key, matrix, warnings=recorder.warnings)
+    return matrix
+
+
 class RecordingContext:
     """Keep track of autom8's internal state as it generates candidate
     pipelines.
@@ -152,13 +218,28 @@ class RecordingContext:
             numerical.
 
         test_indices (list[int]): A list of indices. Indicates which rows in
-            should be used in the test dataset.
+            should be used in the test dataset. (When you assign a new list,
+            the context recomputes its training and testing rows.)
         problem_type (str): Either `classification` or `regression`.
         allow_multicore (bool): Indicates if estimators may use multiple cores.
         executor_class (class): The executor class that autom8 should use when
             it wants to run tasks in parallel.
         receiver (Receiver): An object that receives out-of-band data, like
             candidate pipelines and warnings.
+        cache (DatasetCache or None): The cache of parsed and cleaned
+            datasets, if any.
+        dataset_key (str or None): The cache key of the original dataset.
+        compact (bool): Indicates if engineered features and training data
+            should use 32-bit floats.
+        memory_limit (int or None): The approximate number of bytes that the
+            feature matrix and the training data may use.
+        peak_memory_usage (int): The largest value that `memory_usage()` has
+            returned so far.
+        processes (int or None): The number of processes that
+            `autom8.clean_dataset()` may use.
+        sample_size (int or None): The number of rows that
+            `autom8.clean_dataset()` and `autom8.infer_roles()` look at first,
+            before they look at the rest of a column.
         steps (list[Step]): A list of all the preprocessing steps that have
             been applied to the feature matrix.
         pool (Executor): The current executor, for executing tasks in parallel.
@@ -169,6 +250,8 @@ class RecordingContext:
     def __init__(
             self, matrix, labels, test_indices, problem_type,
             random_state, allow_multicore, executor_class, receiver,
+            cache=None, dataset_key=None, compact=False, memory_limit=None,
+            processes=None, sample_size=None,
         ):
         self.input_columns = matrix.column_names
         self.matrix = matrix.copy()
@@ -179,10 +262,58 @@ class RecordingContext:
         self.allow_multicore = allow_multicore
         self.executor_class = executor_class
         self.receiver = receiver
+        self.cache = cache
+        self.dataset_key = dataset_key
+        self.compact = compact
+        self.memory_limit = memory_limit
+        self.peak_memory_usage = 0
+        self.processes = processes
+        self.sample_size = sample_size
         self.steps = []
         self.pool = None
         self.is_recording = True
 
+        # The float arrays of the training and testing features, for the
+        # current version of the matrix. Concurrent fits share these arrays,
+        # so the lock makes sure that only one thread computes them.
+        self._split = None
+        self._split_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Executors may send the context to other processes. Locks cannot be
+        # pickled, and the cached arrays are cheap to recompute.
+        state = dict(self.__dict__, _split=None)
+        del state['_split_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._split_lock = threading.Lock()
+
+    @property
+    def test_indices(self):
+        return self._test_indices
+
+    @test_indices.setter
+    def test_indices(self, indices):
+        # Precompute the rows of each split, so that each call to
+        # `training_data` and `testing_data` can simply select rows.
+        is_test = np.zeros(len(self.labels.encoded), dtype=bool)
+        is_test[indices] = True
+        self._test_indices = indices
+        self._test_rows = np.flatnonzero(is_test)
+        self._train_rows = np.flatnonzero(~is_test)
+        self._split = None
+
+    @property
+    def _train_labels(self):
+        # Select the labels each time, in case someone replaces `labels`.
+        return self.labels.encoded[self._train_rows]
+
+    @property
+    def _test_labels(self):
+        return self.labels.encoded[self._test_rows]
+
     @property
     def is_classification(self):
         return self.problem_type == 'classification'
@@ -233,8 +364,8 @@ class RecordingContext:
             self.pool.submit(self.fit, estimator)
 
     def fit(self, estimator):
-        X, y = self.training_data()
-        X = scipy.sparse.csr_matrix(X._float_array())
+        split = self._float_split()
+        X, y = split.sparse_train, self._train_labels
 
         try:
             estimator.fit(X, y)
@@ -248,11 +379,47 @@ class RecordingContext:
             steps=list(self.steps),
             estimator=estimator,
             label_encoder=self.labels.encoder,
+            compact=self.compact,
         )
 
         candidate = create_candidate(self, pipeline)
         self.receiver.receive_candidate(candidate)
 
+    def memory_usage(self):
+        """Returns the approximate number of bytes that the context is using.
+
+        This includes the feature matrix and the cached training and testing
+        data. When the result is a new peak, this method also sends it to the
+        receiver's `receive_memory_usage` method.
+        """
+        usage = self.matrix.nbytes
+        split = self._split
+        if split is not None:
+            usage += split.nbytes
+
+        if usage > self.peak_memory_usage:
+            self.peak_memory_usage = usage
+            self.receiver.receive_memory_usage(usage)
+        return usage
+
+    def columns_within_limit(self, count):
+        """Returns how many of `count` new columns fit within the memory limit.
+
+        Each new column costs about three float arrays: the column itself, and
+        its dense and sparse copies in the training and testing data. When the
+        matrix spills its columns, the training and testing data are spilled,
+        too. But each new column is still built in memory before the matrix
+        spills it, so it costs one float array.
+        """
+        if self.memory_limit is None:
+            return count
+
+        itemsize = 4 if self.compact else 8
+        arrays = 3 if self.matrix.storage is None else 1
+        cost = arrays * max(len(self.matrix), 1) * itemsize
+        available = self.memory_limit - self.memory_usage()
+        return max(0, min(count, available // cost))
+
     def submit(self, func, *args, **kwargs):
         if self.pool is None:
             func(*args, **kwargs)
@@ -260,14 +427,34 @@ class RecordingContext:
             self.pool.submit(f, *args, **kwargs)
 
     def testing_data(self):
-        feat = self.matrix.select_rows(self.test_indices)
-        lab = self.labels.encoded[self.test_indices]
-        return (feat, lab)
+        feat = self.matrix.select_rows(self._test_rows)
+        return (feat, self._test_labels)
 
     def training_data(self):
-        feat = self.matrix.exclude_rows(self.test_indices)
-        lab = np.delete(self.labels.encoded, self.test_indices)
-        return (feat, lab)
+        feat = self.matrix.select_rows(self._train_rows)
+        return (feat, self._train_labels)
+
+    def _float_testing_data(self):
+        return (self._float_split().test, self._test_labels)
+
+    def _float_training_data(self):
+        return (self._float_split().train, self._train_labels)
+
+    def _float_split(self):
+        # Returns the FloatSplit for the current version of the matrix. Since
+        # preprocessors replace a column's values instead of writing into
+        # them, the matrix is unchanged as long as its columns have the same
+        # values arrays. (Don't read `col.values` here, since that would
+        # compute each lazy column.)
+        with self._split_lock:
+            sources = [col._values for col in self.matrix.columns]
+            split = self._split
+            if split is None or not _same_arrays(split.sources, sources):
+                split = self._split = _create_float_split(
+                    self.matrix, self._train_rows, self._test_rows,
+                    np.float32 if self.compact else np.float64)
+                self.memory_usage()
+            return split
 
     @contextmanager
     def sandbox(self):
@@ -302,6 +489,51 @@ class RecordingContext:
             )
 
 
+class FloatSplit(namedtuple('FloatSplit',
+        'sources, train, test, sparse_train')):
+    """The float arrays of the training and testing features."""
+
+    @property
+    def nbytes(self):
+        arrays = [self.train, self.test]
+        if self.sparse_train is not self.train:
+            arrays.append(self.sparse_train)
+        return sum(_nbytes(i) for i in arrays)
+
+
+def _create_float_split(matrix, train_rows, test_rows, dtype):
+    # Coerce a copy of the matrix, so that the context's columns keep their
+    # original types. (The copy shares the values of the float columns.)
+    copy = matrix.copy()
+    X = copy._float_array(dtype)
+
+    # Copying the matrix makes its writable columns read-only, which replaces
+    # their values arrays. So get the sources after making the copy.
+    sources = [col._values for col in matrix.columns]
+    storage = matrix.storage
+
+    # When the matrix spills its columns, spill the training data too. And in
+    # this case, don't create a sparse copy in memory. The estimators can read
+    # the dense arrays from the files.
+    if storage is not None and not scipy.sparse.issparse(X):
+        train = storage.take(X, train_rows)
+        test = storage.take(X, test_rows)
+        return FloatSplit(sources, train, test, train)
+
+    train, test = X[train_rows], X[test_rows]
+    return FloatSplit(sources, train, test, scipy.sparse.csr_matrix(train))
+
+
+def _nbytes(array):
+    if scipy.sparse.issparse(array):
+        return array.data.nbytes + array.indices.nbytes + array.indptr.nbytes
+    return 0 if is_spilled(array) else array.nbytes
+
+
+def _same_arrays(xs, ys):
+    return len(xs) == len(ys) and all(x is y for x, y in zip(xs, ys))
+
+
 class Labels(namedtuple('Labels', 'name, original, encoded, encoder')):
     @property
     def classes(self):
@@ -7,11 +7,27 @@ _strip = lambda section: section.strip() + '\n'
 
 
 dataset_parameters = _strip("""
-        dataset (list or tuple or numpy.ndarray or autom8.Matrix): The dataset.
+        dataset (list or tuple or numpy.ndarray or autom8.Matrix or
+            pandas.DataFrame or dict or iterator or str): The dataset.
 
             The `dataset` parameter may be a list of rows, a tuple of rows,
             a `numpy.ndarray` object of rows, or an autom8.Matrix object.
 
+            It may also be a `pandas.DataFrame`, a dict that maps column names
+            to lists or one-dimensional arrays, or a structured numpy array.
+            In these cases, autom8 uses the existing column names. And when a
+            column already has a boolean or numeric dtype, autom8 uses its
+            array without copying it. (So don't modify the array while autom8
+            is using it.)
+
+            It may also be a `pathlib.Path` (or another `os.PathLike`) that
+            points to a CSV file. In this case, autom8 reads the file with
+            `autom8.load_csv()`. (A plain string is never treated as a path.)
+
+            It may also be an iterator that yields batches of rows, like the
+            one returned by `autom8.read_csv_batches()`. In this case, autom8
+            builds the matrix one batch at a time.
+
             Each row should contain booleans, numbers, strings, or None values.
             Columns with other kinds of values may be dropped by autom8.
 
@@ -120,6 +136,67 @@ problem_parameters = _strip("""
               to run at some point in the future (which may be right now).
             - `shutdown(self, wait=True)`: Shuts down the executor. If `wait`
               is True, then blocks until all tasks are complete.
+
+        cache (autom8.DatasetCache or str or None): An optional cache of
+            parsed and cleaned datasets. Defaults to None.
+
+            If `cache` is a string, then it must be the path of a directory.
+            In this case, autom8 creates a new `autom8.DatasetCache` object
+            for that directory.
+
+            When you run autom8 on the same dataset more than once, the cache
+            allows autom8 to skip parsing and cleaning the dataset. autom8
+            identifies datasets by the contents of the dataset (or the
+            contents of the CSV file), and by the `column_names`,
+            `column_roles`, and `target_column` parameters.
+
+        compact (bool): Use less memory for engineered features. Defaults to
+            False.
+
+            When `compact` is True, autom8 stores the columns that it derives
+            from numerical columns as 32-bit floats instead of 64-bit floats,
+            and it gives estimators 32-bit training and testing data. Most
+            estimators accept 32-bit data, and the ones that don't convert it
+            themselves. This roughly halves the memory that autom8 uses for
+            these arrays, at the cost of some precision.
+
+        memory_limit (int or None): The approximate number of bytes that the
+            context's feature matrix and training data may use. Defaults to
+            None, which means no limit.
+
+            When autom8 engineers new features, it only creates as many
+            columns as fit within the limit, and it warns you when it skips
+            some of them. The limit does not include the memory that the
+            estimators use, or the Python objects in columns of strings.
+
+        spill (bool or str): Keep the dataset's columns of booleans and
+            numbers in memory-mapped temporary files. Defaults to False.
+
+            If `spill` is a string, then it must be the path of a directory
+            for the temporary files. If `spill` is True, then autom8 uses
+            Python's default temporary directory. This lets autom8 work on
+            datasets that don't fit comfortably in memory, since the
+            operating system can page the files out to disk. The files are
+            deleted automatically. Columns that autom8 spills don't count
+            towards the `memory_limit`, but autom8 still builds each new
+            column in memory before it spills the column, so new columns do.
+            (And the dataset itself must fit in memory once, since autom8
+            spills its columns after loading it.)
+
+        processes (int or None): The number of processes that
+            `autom8.clean_dataset()` may use. Defaults to None, which means
+            that autom8 cleans each column in the current process, just like
+            when `processes` is 1. (On platforms that spawn new processes,
+            like macOS and Windows, only use more than one process from under
+            an `if __name__ == '__main__'` guard.)
+
+        sample_size (int or None): The number of rows that autom8 samples
+            from each large column, when it cleans the column and infers its
+            role. Defaults to None, which means that autom8 looks at every
+            value. When the sample settles a question (like finding a string
+            that isn't a number), autom8 only checks the rest of the column
+            with a cheap, vectorized pass. Otherwise, it falls back to looking
+            at every value. Either way, the results are the same.
 """)
 
 
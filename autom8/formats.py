@@ -1,8 +1,28 @@
+from collections import namedtuple
+from collections.abc import Iterator
+import codecs
+from concurrent.futures import ProcessPoolExecutor
 import csv
 from functools import reduce
-from io import StringIO
+from io import StringIO, TextIOWrapper
+import itertools
+import mmap
+import os
 
 import chardet
+import numpy as np
+
+from .exceptions import expected, typename
+
+
+# The default number of rows in each batch, when reading a CSV file in batches.
+default_batch_size = 10000
+
+# The number of bytes that we use to detect the encoding of a CSV stream.
+encoding_sample_size = 64 * 1024
+
+# The maximum number of bytes that a single process parses at once.
+max_range_size = 8 * 1024 * 1024
 
 
 def decode_csv(payload):
@@ -15,19 +35,99 @@ def decode_csv(payload):
         list[row]: A list of rows. Each row is a list of strings and numbers.
     """
 
-    def _convert(cell):
-        try:
-            return parse_number(cell)
-        except Exception:
-            return cell
-
     if isinstance(payload, bytes):
         payload = payload.decode(chardet.detect(payload)['encoding'])
 
     # SHOULD: Make this work for quoted values with newlines in the first row.
     dialect = csv.Sniffer().sniff(payload.split('\n')[0])
     reader = csv.reader(StringIO(payload), dialect)
-    return [[_convert(i) for i in row] for row in reader]
+    return [[_convert_cell(i) for i in row] for row in reader]
+
+
+def decode_csv_batches(stream, batch_size=None, parse_numbers=True):
+    """Takes a binary CSV stream and yields its rows in batches.
+
+    Unlike `decode_csv`, this function never holds the whole file in memory.
+    It detects the encoding from the first few kilobytes of the stream, and
+    then decodes the rest of the stream incrementally. If a later part of the
+    stream doesn't match that encoding, then its bytes are decoded as
+    latin-1, instead of failing halfway through the stream.
+
+    Parameters:
+        stream (file object): A seekable binary stream, positioned at the start
+            of the CSV data.
+        batch_size (int or None): The maximum number of rows in each batch.
+            Defaults to None, which means `default_batch_size`.
+        parse_numbers (bool): Indicates if cells should be converted to
+            numbers, where possible. Defaults to True. When False, each cell
+            is left as a string.
+
+    Yields:
+        list[row]: A list of rows. Each row is a list of strings and numbers.
+    """
+
+    if batch_size is None:
+        batch_size = default_batch_size
+
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise ValueError(f'batch_size must be a positive int: {batch_size!r}')
+
+    start = stream.tell()
+    sample = stream.read(encoding_sample_size)
+    stream.seek(start)
+
+    encoding = _detect_encoding(sample, is_partial=len(sample) == encoding_sample_size)
+    text = TextIOWrapper(stream, encoding=encoding, errors=_latin_1_fallback,
+        newline='')
+
+    try:
+        first_line = next(text, None)
+        if first_line is None:
+            return
+
+        dialect = csv.Sniffer().sniff(first_line.split('\n')[0])
+        reader = csv.reader(itertools.chain([first_line], text), dialect)
+
+        while True:
+            batch = list(itertools.islice(reader, batch_size))
+            if not batch:
+                return
+            if parse_numbers:
+                batch = [[_convert_cell(i) for i in row] for row in batch]
+            yield batch
+    finally:
+        # Don't let the wrapper close the caller's stream.
+        text.detach()
+
+
+def _convert_cell(cell):
+    try:
+        return parse_number(cell)
+    except Exception:
+        return cell
+
+
+def _decode_as_latin_1(error):
+    # Latin-1 maps every byte to a character, so it never fails.
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    return error.object[error.start:error.end].decode('latin-1'), error.end
+
+
+# The name of the codec error handler that decodes invalid bytes as latin-1.
+_latin_1_fallback = 'autom8-latin-1'
+codecs.register_error(_latin_1_fallback, _decode_as_latin_1)
+
+
+def _detect_encoding(sample, is_partial):
+    encoding = chardet.detect(sample)['encoding'] or 'utf-8'
+
+    # If we only looked at the beginning of the stream, then an ASCII sample
+    # doesn't mean much. Use UTF-8, since it's a superset of ASCII.
+    if is_partial and encoding.lower() == 'ascii':
+        return 'utf-8'
+
+    return encoding
 
 
 def drop_empty_rows(rows):
@@ -46,13 +146,78 @@ def drop_empty_rows(rows):
     [[9, 8, 7], [6, 5, 4]]
     """
 
-    def _is_blank(obj):
-        if isinstance(obj, str):
-            return obj == '' or obj.isspace()
+    # Keep each row as soon as we find a value that isn't blank. (This loop is
+    # a bit faster than calling a helper function for each value.)
+    result = []
+    for row in rows:
+        for i in row:
+            if i is None or (isinstance(i, str) and (i == '' or i.isspace())):
+                continue
+            result.append(row)
+            break
+    return result
+
+
+def empty_row_mask(columns):
+    """Takes a list of columns and indicates which rows are blank.
+
+    This is the column-oriented version of `drop_empty_rows`. Only strings and
+    None values can be blank, so a column with a boolean or numeric dtype (or
+    any dtype other than object or str) means that no row is blank.
+    Otherwise, each column only checks the rows that are still blank in the
+    previous columns.
+
+    Parameters:
+        columns (list[numpy.ndarray]): A list of one-dimensional arrays, each
+            with the same length.
+
+    Returns:
+        numpy.ndarray: A boolean array, with one value for each row.
+
+    >>> empty_row_mask([]).tolist()
+    []
+
+    >>> empty_row_mask([np.array([1, 2]), np.array([None, ''])]).tolist()
+    [False, False]
+
+    >>> empty_row_mask([
+    ...     np.array(['a', ' ', None, ''], dtype=object),
+    ...     np.array([None, '', '\\t', 3], dtype=object),
+    ... ]).tolist()
+    [False, True, True, False]
+    """
+
+    if not columns:
+        return np.zeros(0, dtype=bool)
+
+    mask = np.zeros(len(columns[0]), dtype=bool)
+    if any(col.dtype.kind not in 'OU' for col in columns):
+        return mask
+
+    candidates = np.arange(len(mask))
+    for col in columns:
+        values = col[candidates]
+        if values.dtype.kind == 'U':
+            blank = (values == '') | np.char.isspace(values)
         else:
-            return obj is None
+            blank = _blank_objects(values)
+        candidates = candidates[blank]
+        if len(candidates) == 0:
+            return mask
+
+    mask[candidates] = True
+    return mask
+
 
-    return [row for row in rows if any(not _is_blank(i) for i in row)]
+def _blank_objects(values):
+    with np.errstate(all='ignore'):
+        blank = (values == None) | (values == '')
+
+    # Check the remaining strings for whitespace.
+    others = np.flatnonzero(~blank)
+    blank[others] = [isinstance(i, str) and i.isspace()
+        for i in values[others].tolist()]
+    return blank
 
 
 def encode_csv(dataset):
@@ -82,6 +247,125 @@ def encode_csv(dataset):
     return result.getvalue()
 
 
+def encode_csv_columns(columns, stream, column_names=None, batch_size=None):
+    """Writes a list of columns to a text stream, as CSV rows.
+
+    Unlike `encode_csv`, this function never creates a list of all the rows,
+    or a string that contains the whole CSV file. It converts `batch_size`
+    rows at a time into python values, and writes them to the stream.
+
+    Parameters:
+        columns (list[numpy.ndarray or list]): The columns. Each column must
+            have the same length.
+        stream (file object): A text stream. If it's a file, then it should
+            be opened with `newline=''`.
+        column_names (list[str] or None): An optional header row.
+        batch_size (int or None): The number of rows to convert at once.
+            Defaults to None, which means `default_batch_size`.
+
+    Returns:
+        int: The number of rows written, not counting the header row.
+
+    >>> out = StringIO()
+    >>> encode_csv_columns([[1, 2], np.array(['a, b', None])], out, ['x', 'y'])
+    2
+    >>> out.getvalue()
+    'x,y\\r\\n1,"a, b"\\r\\n2,\\r\\n'
+    """
+
+    if batch_size is None:
+        batch_size = default_batch_size
+
+    writer = csv.writer(stream, quoting=csv.QUOTE_MINIMAL)
+    if column_names is not None:
+        writer.writerow(column_names)
+
+    num_rows = len(columns[0]) if columns else 0
+    for start in range(0, num_rows, batch_size):
+        stop = start + batch_size
+        batch = [_python_values(col[start:stop]) for col in columns]
+        writer.writerows(zip(*batch))
+
+    return num_rows
+
+
+def write_csv(file, dataset, column_names=None, batch_size=None):
+    """Writes a dataset to a CSV file, incrementally.
+
+    The `dataset` may be an `autom8.Matrix`, a `PredictionReport` (the result
+    of `Pipeline.run`), or a list of columns. It may also be an iterator that
+    yields any of these, one batch at a time. This allows you to write a file
+    of predictions without ever holding all of them in memory:
+
+        reports = (pipeline.run(batch) for batch in batches)
+        autom8.write_csv('predictions.csv', reports)
+
+    For each `PredictionReport`, this function writes the predicted value and,
+    if the estimator provides probabilities, the probability of the predicted
+    value.
+
+    Parameters:
+        file (str or file object): The path of a CSV file, or a text stream.
+        dataset (autom8.Matrix or PredictionReport or list or iterator): The
+            dataset to write.
+        column_names (list[str] or None): The header row. Defaults to None,
+            which means the matrix's column names for a Matrix, the strings
+            `prediction` and `probability` for a PredictionReport, and no
+            header for a list of columns.
+        batch_size (int or None): The number of rows to convert at once.
+            Defaults to None, which means `default_batch_size`.
+
+    Returns:
+        int: The number of rows written, not counting the header row.
+    """
+
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'w', newline='', encoding='utf-8') as stream:
+            return write_csv(stream, dataset, column_names, batch_size)
+
+    is_batched = isinstance(dataset, Iterator)
+    batches = dataset if is_batched else [dataset]
+
+    num_rows = 0
+    for index, batch in enumerate(batches):
+        columns, names = _csv_columns(batch)
+
+        # Only write the header before the first batch.
+        if index == 0:
+            header = names if column_names is None else column_names
+        else:
+            header = None
+
+        num_rows += encode_csv_columns(columns, file, header, batch_size)
+
+    return num_rows
+
+
+def _csv_columns(batch):
+    # Returns a list of columns and the default column names for the batch.
+    from .matrix import Matrix
+    from .pipeline import PredictionReport
+
+    if isinstance(batch, Matrix):
+        return [col.values for col in batch.columns], batch.column_names
+
+    if isinstance(batch, PredictionReport):
+        if batch.probabilities is None:
+            return [batch.predictions], ['prediction']
+        probs = [row[0][1] if row else None for row in batch.probabilities]
+        return [batch.predictions, probs], ['prediction', 'probability']
+
+    if isinstance(batch, (list, tuple)):
+        return list(batch), None
+
+    raise expected('Matrix, PredictionReport, or list of columns',
+        typename(batch))
+
+
+def _python_values(values):
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+
 def excel_column_index(name):
     """Takes the Excel-style name of a column and returns its 0-based index.
 
@@ -187,15 +471,191 @@ def parse_number(string):
     raise Exception(f'invalid number literal: {repr(string)}')
 
 
-def read_csv(path):
+def read_csv(path, processes=None):
     """Reads the CSV file at the indicated path and returns a list of rows.
 
+    When `processes` is more than 1, this function memory-maps the file,
+    splits it into byte ranges at the ends of rows, and parses the ranges in a
+    pool of processes. (So on platforms that spawn new processes, like macOS
+    and Windows, call it from under an `if __name__ == '__main__'` guard.)
+
     Parameters:
         path (str): The path to a CSV file.
+        processes (int or None): The number of processes to use. Defaults to
+            None, which means that autom8 parses the file in the current
+            process, just like when `processes` is 1.
 
     Returns:
         list[row]: A list of rows. Each row is a list of strings and numbers.
     """
 
+    plan = plan_csv_ranges(path, processes)
+    if plan is not None:
+        try:
+            return [row for rows in map_csv_ranges(plan, _decode_csv_range)
+                for row in rows]
+        except UnicodeDecodeError:
+            # The beginning of the file misled us about its encoding.
+            pass
+
     with open(path, 'rb') as f:
         return decode_csv(f.read())
+
+
+def read_csv_batches(path, batch_size=None, parse_numbers=True):
+    """Reads the CSV file at the indicated path and yields batches of rows.
+
+    Parameters:
+        path (str): The path to a CSV file.
+        batch_size (int or None): The maximum number of rows in each batch.
+            Defaults to None, which means `default_batch_size`.
+        parse_numbers (bool): Indicates if cells should be converted to
+            numbers, where possible. Defaults to True.
+
+    Yields:
+        list[row]: A list of rows. Each row is a list of strings and numbers.
+    """
+
+    with open(path, 'rb') as f:
+        yield from decode_csv_batches(f, batch_size, parse_numbers)
+
+
+# Describes how to parse a CSV file in parallel. The `dialect` is a dict of
+# keyword arguments for `csv.reader`, and `ranges` is a list of (start, end)
+# byte offsets.
+CsvRanges = namedtuple('CsvRanges',
+    'path, encoding, dialect, ranges, processes')
+
+
+def plan_csv_ranges(path, processes=None):
+    """Decides how to split a CSV file into ranges of rows.
+
+    Each range starts at the beginning of a row and ends at the end of a row.
+    (A newline inside a quoted field does not end a row.)
+
+    Parameters:
+        path (str): The path to a CSV file.
+        processes (int or None): The number of processes. See `read_csv` for
+            the details.
+
+    Returns:
+        CsvRanges or None: The ranges to parse, or None when the file should
+        be parsed in a single process.
+    """
+
+    if processes is not None and (not isinstance(processes, int)
+            or isinstance(processes, bool) or processes < 1):
+        raise ValueError(f'processes must be a positive int: {processes!r}')
+
+    if processes is None or processes == 1:
+        return None
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return None
+
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        sample = mm[:encoding_sample_size]
+        encoding = _detect_encoding(sample, is_partial=size > len(sample))
+
+        # We can only split the bytes at newlines when the encoding agrees
+        # with ASCII about newlines and quotes.
+        if not _is_ascii_compatible(encoding):
+            return None
+
+        first_line = mm[:_find_newline(mm, 0)].decode(encoding, 'replace')
+        dialect = csv.Sniffer().sniff(first_line.split('\n')[0])
+
+        # Without doubled quotes, an escaped quote would confuse our count.
+        if not dialect.doublequote and dialect.escapechar:
+            return None
+
+        quote = None
+        if dialect.quoting != csv.QUOTE_NONE and dialect.quotechar:
+            quote = dialect.quotechar.encode(encoding)
+
+        num_ranges = max(processes, -(-size // max_range_size))
+        ranges = _split_rows(mm, -(-size // num_ranges), quote)
+
+    return CsvRanges(
+        path=path,
+        encoding=encoding,
+        dialect=_dialect_params(dialect),
+        ranges=ranges,
+        processes=processes,
+    )
+
+
+def map_csv_ranges(plan, func):
+    """Calls `func(path, start, end, encoding, dialect)` for each range.
+
+    The calls run in a pool of processes, so `func` must be a module-level
+    function. The results are yielded in the order of the ranges.
+    """
+
+    args = [(plan.path, start, end, plan.encoding, plan.dialect)
+        for start, end in plan.ranges]
+
+    if len(args) == 1:
+        yield func(*args[0])
+        return
+
+    with ProcessPoolExecutor(min(plan.processes, len(args))) as pool:
+        yield from pool.map(func, *zip(*args))
+
+
+def _decode_csv_range(path, start, end, encoding, dialect, parse_numbers=True):
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode(encoding)
+
+    reader = csv.reader(StringIO(text), **dialect)
+    if parse_numbers:
+        return [[_convert_cell(i) for i in row] for row in reader]
+    else:
+        return list(reader)
+
+
+def _split_rows(mm, range_size, quote):
+    ranges = []
+    start = 0
+    while start < len(mm):
+        end = _end_of_row(mm, start, min(start + range_size, len(mm)), quote)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _end_of_row(mm, start, pos, quote):
+    # Returns the offset just past the first newline at or after `pos` that
+    # is not inside a quoted field. We know that `start` is the beginning of
+    # a row, so we can tell if we're inside quotes by counting them.
+    in_quotes = quote is not None and mm[start:pos].count(quote) % 2 == 1
+    while True:
+        newline = _find_newline(mm, pos)
+        if newline == len(mm):
+            return newline
+        if quote is not None and mm[pos:newline].count(quote) % 2 == 1:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            return newline + 1
+        pos = newline + 1
+
+
+def _find_newline(mm, pos):
+    index = mm.find(b'\n', pos)
+    return len(mm) if index == -1 else index
+
+
+def _is_ascii_compatible(encoding):
+    try:
+        return 'a\n",'.encode(encoding).endswith(b'a\n",')
+    except LookupError:
+        return False
+
+
+def _dialect_params(dialect):
+    names = ['delimiter', 'doublequote', 'escapechar', 'lineterminator',
+        'quotechar', 'quoting', 'skipinitialspace', 'strict']
+    return {i: getattr(dialect, i) for i in names if hasattr(dialect, i)}
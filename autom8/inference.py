@@ -1,6 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from .caching import derive_key
+from .coercion import string_mask
+from .matrix import sample_indices, DictionaryArray
 from .preprocessors import planner, preprocessor
 
 
+# A categorical column has fewer than `max_categories` distinct values, and
+# at most `max_category_ratio` of its values are distinct.
+max_categories = 50
+max_category_ratio = 0.25
+
+# The number of rows that autom8 samples, when it checks a cached role and the
+# context doesn't have a `sample_size`.
+default_sample_size = 1000
+
+
 @planner
 def infer_roles(ctx):
     """Infers the role of each column.
@@ -18,9 +34,25 @@ def infer_roles(ctx):
     Otherwise, if a column contains strings, then autom8 infers that it
     contains textual data. And if it contains numbers, then autom8 infers that
     it contains numerical data.
+
+    When the context has a `sample_size`, autom8 first looks at a sample of
+    each large column's rows. (See `autom8.create_context()` for the details.)
+
+    When the context has a cache, autom8 stores the inferred roles under a
+    fingerprint of the matrix's schema. The next time that it sees the same
+    schema, it checks each cached role against the column's values (with a
+    single vectorized pass, or with a sample), instead of inferring the role
+    from scratch.
     """
 
-    roles = [_infer_role(col, ctx.receiver) for col in ctx.matrix.columns]
+    columns = ctx.matrix.columns
+    if ctx.cache is None:
+        inferred = [_discover_role(col, ctx.sample_size) for col in columns]
+    else:
+        inferred = _infer_roles_with_cache(ctx)
+
+    roles = [_merge_roles(col, role, ctx.receiver)
+        for col, role in zip(columns, inferred)]
     _set_roles(ctx, roles)
 
 
@@ -31,11 +63,90 @@ def _set_roles(ctx, roles):
         col.role = role
 
 
-def _infer_role(col, receiver):
-    inferred = _infer_role_from_values(col.values)
+def _infer_role(col, receiver, sample_size=None):
+    inferred = _discover_role(col, sample_size)
     return _merge_roles(col, inferred, receiver)
 
 
+def _discover_role(col, sample_size=None, values=None):
+    # Reading `col.values` decodes an encoded column into a new array, so
+    # decode it once and pass the result to each check.
+    if values is None:
+        values = _encoded_values(col)
+
+    inferred = None
+    if sample_size is not None and len(col) > sample_size:
+        inferred = _infer_role_from_sample(col, values, sample_size)
+
+    if inferred is None:
+        inferred = _infer_role_from_values(values)
+    return inferred
+
+
+def _encoded_values(col):
+    # Dictionary columns stay encoded, since their categories are enough.
+    return col._values if col.is_dictionary else col.values
+
+
+def _infer_roles_with_cache(ctx):
+    # Returns the inferred role of each column, using the roles that the cache
+    # has for the matrix's schema. Each cached role is a (role, distinct
+    # values) pair. (Only categorical columns keep their distinct values.)
+    columns = ctx.matrix.columns
+    schema = [(col.formula, str(col.dtype), type(col._values).__name__,
+        col.mask is not None) for col in columns]
+    key = derive_key('infer_roles', schema)
+
+    cached = ctx.cache.load_plan(key)
+    if cached is None or len(cached) != len(columns):
+        cached = [None] * len(columns)
+
+    sample_size = ctx.sample_size or default_sample_size
+    entries = []
+    for col, entry in zip(columns, cached):
+        values = _encoded_values(col)
+        if entry is None or not _check_cached_role(
+                col, values, entry, sample_size):
+            role = _discover_role(col, ctx.sample_size, values)
+            distinct = (tuple(_distinct_values(values))
+                if role == 'categorical' else None)
+            entry = (role, distinct)
+        entries.append(entry)
+
+    if entries != cached:
+        ctx.cache.store_plan(key, entries)
+    return [role for role, _ in entries]
+
+
+def _check_cached_role(col, values, entry, sample_size):
+    role, distinct = entry
+
+    # If the column only contains the cached values, then it has at most that
+    # many distinct values.
+    if role == 'categorical':
+        return (len(distinct) <= max_category_ratio * len(col)
+            and _only_contains(values, distinct))
+
+    return _infer_role_from_sample(col, values, sample_size) == role
+
+
+def _distinct_values(values):
+    if isinstance(values, DictionaryArray):
+        return values.categories[values.counts() > 0].tolist()
+    return pd.unique(pd.Series(values, dtype=object)).tolist()
+
+
+def _only_contains(values, distinct):
+    # Checks if each of the values is one of the distinct values, with one
+    # vectorized pass.
+    if isinstance(values, DictionaryArray):
+        values = values.categories[values.counts() > 0]
+
+    if values.dtype == object:
+        return bool(pd.Series(values, dtype=object).isin(list(distinct)).all())
+    return bool(np.isin(values, list(distinct)).all())
+
+
 def _infer_role_from_values(values):
     # If it's a column of booleans, then just say that it's already encoded.
     if values.dtype == bool:
@@ -45,12 +156,21 @@ def _infer_role_from_values(values):
     if values.dtype == float:
         return 'numerical'
 
-    num_unique = len(set(values))
-    ratio = num_unique / len(values)
-    is_categorical = ratio <= 0.25 and num_unique < 50
-    is_all_strings = all(isinstance(e, str) for e in values)
+    # A dictionary array already knows its distinct values. (But a subset of
+    # its rows may not use all of them.)
+    if isinstance(values, DictionaryArray):
+        distinct = values.categories[values.counts() > 0]
+    else:
+        distinct = set(values)
+
+    return _infer_role_from_distinct(distinct, len(values))
 
-    if is_categorical:
+
+def _infer_role_from_distinct(distinct, num_values):
+    num_unique = len(distinct)
+    is_all_strings = all(isinstance(e, str) for e in distinct)
+
+    if _is_categorical(num_unique, num_values):
         return 'categorical'
     elif is_all_strings:
         return 'textual'
@@ -58,6 +178,39 @@ def _infer_role_from_values(values):
         return 'numerical'
 
 
+def _is_categorical(num_unique, num_values):
+    ratio = num_unique / num_values
+    return ratio <= max_category_ratio and num_unique < max_categories
+
+
+def _infer_role_from_sample(col, values, sample_size):
+    # Infers the role from a sample of the column's rows, and then checks the
+    # rest of the column with one vectorized pass. Returns None when the check
+    # fails. (Columns of booleans and floats, and dictionary columns, are
+    # cheap enough already.)
+    if col.is_dictionary or col.dtype.kind not in 'iuO':
+        return None
+
+    distinct = set(values[sample_indices(len(col), sample_size)])
+
+    # The column has at least as many distinct values as the sample, so it's
+    # too varied to be categorical. Then the role only depends on whether
+    # every value is a string.
+    if len(distinct) >= max_categories:
+        if col.dtype != object:
+            return 'numerical'
+        elif col.is_text:
+            is_all_strings = col.mask is None
+        else:
+            is_all_strings = bool(string_mask(values).all())
+        return 'textual' if is_all_strings else 'numerical'
+
+    # Otherwise, the sample may contain every distinct value in the column.
+    if not _only_contains(values, distinct):
+        return None
+    return _infer_role_from_distinct(distinct, len(col))
+
+
 def _merge_roles(col, new_role, receiver):
     # Let's use short names in here.
     old, new = col.role, new_role
@@ -0,0 +1,286 @@
+import numpy as np
+
+from .coercion import _coerce_distinct_strings
+from .docstrings import render_docstring
+from .formats import (
+    _convert_cell,
+    _decode_csv_range,
+    drop_empty_rows,
+    map_csv_ranges,
+    plan_csv_ranges,
+    read_csv_batches,
+)
+from .matrix import (
+    _concatenate_chunks,
+    _encode_columns,
+    _looks_like_column_names,
+    _name_columns,
+    _update_roles,
+    _warn_about_dropped_rows,
+    _warn_about_duplicate_names,
+    _warn_about_extra_columns,
+    create_array,
+    excel_column_name,
+    Column,
+    Matrix,
+)
+from .receiver import Receiver
+
+
+@render_docstring
+def load_csv(
+    path,
+    column_names=None,
+    column_roles=None,
+    receiver=None,
+    batch_size=None,
+    processes=None,
+):
+    """Reads the CSV file at the indicated path and returns a new Matrix.
+
+    This function produces the same matrix as
+    `autom8.create_matrix(autom8.read_csv(path))`, but it never creates a list
+    of rows. Instead, it reads the file in batches, and parses each batch
+    directly into typed numpy arrays, one column at a time.
+
+    When `processes` is more than 1, this function parses byte ranges of the
+    file in a pool of processes, and then concatenates the arrays from each
+    range.
+
+    Parameters:
+        path (str): The path to a CSV file.
+        column_names (list[str] or str or None): The column names for this
+            dataset. See `autom8.create_matrix()` for the details.
+        column_roles (list or dict or None): The roles of some or all of
+            the dataset's columns. See `autom8.create_matrix()` for the
+            details.
+        $receiver_parameter
+        batch_size (int or None): The maximum number of rows that autom8
+            should parse at once. Defaults to None, which means
+            `autom8.formats.default_batch_size`.
+        processes (int or None): The number of processes to use. See
+            `autom8.read_csv()` for the details.
+
+    Returns:
+        autom8.Matrix: The new matrix.
+    """
+
+    if receiver is None:
+        receiver = Receiver()
+
+    table = _read_table(path, batch_size, processes)
+
+    _warn_about_dropped_rows(receiver, table.num_dropped)
+    _warn_about_extra_columns(receiver, len(table.builders), table.maxcols)
+
+    if table.first_row is None:
+        matrix = Matrix([])
+    else:
+        first_row = table.first_row[:len(table.builders)]
+        first_row = [_convert_cell(i) for i in first_row]
+        remaining = [builder.finish() for builder in table.builders]
+        matrix = _assemble_matrix(first_row, remaining, column_names)
+
+    _update_roles(matrix, column_roles)
+    _warn_about_duplicate_names(receiver, matrix)
+    _encode_columns(matrix)
+    return matrix
+
+
+def _read_table(path, batch_size, processes):
+    plan = plan_csv_ranges(path, processes)
+    if plan is not None:
+        try:
+            table = TableBuilder()
+            for piece in map_csv_ranges(plan, _parse_csv_range):
+                table.append_piece(*piece)
+            return table
+        except UnicodeDecodeError:
+            # The beginning of the file misled us about its encoding.
+            pass
+
+    table = TableBuilder()
+    for batch in read_csv_batches(path, batch_size, parse_numbers=False):
+        table.append_rows(batch)
+    return table
+
+
+def _parse_csv_range(path, start, end, encoding, dialect):
+    # Runs in a worker process. Returns the first non-empty row as strings,
+    # and the remaining rows as a list of typed numpy arrays (one per column).
+    batch = _decode_csv_range(path, start, end, encoding, dialect,
+        parse_numbers=False)
+    rows = drop_empty_rows(batch)
+    num_dropped = len(batch) - len(rows)
+
+    if not rows:
+        return None, None, num_dropped, 0
+
+    maxcols = max(len(row) for row in rows)
+    columns = [_parse_cells(cells) for cells in zip(*rows[1:])]
+    return rows[0], columns if len(rows) > 1 else None, num_dropped, maxcols
+
+
+def _append_rows(builders, rows):
+    # Transpose the batch. Since zip stops at the shortest row, this also
+    # drops any extra columns.
+    columns = list(zip(*rows))
+    del builders[len(columns):]
+    for builder, cells in zip(builders, columns):
+        builder.append_cells(cells)
+
+
+def _assemble_matrix(first_row, remaining, names):
+    if isinstance(names, str) and names == 'included':
+        has_names = True
+    elif names is None or (isinstance(names, str) and names == 'unknown'):
+        has_names = _looks_like_column_names(first_row, remaining)
+    else:
+        has_names = False
+
+    if has_names:
+        return Matrix([
+            Column(values=values, formula=str(name), role=None, is_original=True)
+            for name, values in zip(first_row, remaining)
+        ])
+
+    matrix = Matrix([
+        Column(
+            values=_prepend_cell(first, values),
+            formula=excel_column_name(index),
+            role=None,
+            is_original=True,
+        )
+        for index, (first, values) in enumerate(zip(first_row, remaining))
+    ])
+    _name_columns(matrix, 'missing' if names is None else names)
+    return matrix
+
+
+def _prepend_cell(cell, values):
+    # An empty column has no type of its own, so don't let it promote the
+    # cell. (An empty builder returns an array of floats.)
+    first = create_array([cell])
+    return _concatenate_chunks([first, values]) if len(values) else first
+
+
+class TableBuilder:
+    """Builds a table of columns from rows of CSV cells.
+
+    The first non-empty row is held out as `first_row`, since it may contain
+    the column names. Each of the remaining rows goes into the `builders`.
+    """
+
+    def __init__(self):
+        self.first_row = None
+        self.builders = []
+        self.num_dropped = 0
+        self.maxcols = 0
+
+    def append_rows(self, rows):
+        nonempty = drop_empty_rows(rows)
+        self.num_dropped += len(rows) - len(nonempty)
+
+        if nonempty and self.first_row is None:
+            self.first_row, nonempty = nonempty[0], nonempty[1:]
+            self.builders = [ColumnBuilder() for _ in self.first_row]
+            self.maxcols = len(self.first_row)
+
+        if nonempty:
+            self.maxcols = max(self.maxcols, max(len(i) for i in nonempty))
+            _append_rows(self.builders, nonempty)
+
+    def append_piece(self, first_row, columns, num_dropped, maxcols):
+        # Appends the result of `_parse_csv_range`.
+        if first_row is not None:
+            self.append_rows([first_row])
+
+        self.num_dropped += num_dropped
+        self.maxcols = max(self.maxcols, maxcols)
+
+        if columns is not None:
+            del self.builders[len(columns):]
+            for builder, values in zip(self.builders, columns):
+                builder.chunks.append(values)
+
+
+class ColumnBuilder:
+    """Builds a column of values from batches of CSV cells.
+
+    Each batch of cells becomes a typed numpy array. When every cell in a
+    batch is an integer, the batch becomes an int64 array. When every cell is
+    a float, the batch becomes a float64 array. Otherwise, the batch becomes
+    an object array of strings and numbers. The `finish` method promotes the
+    batches to a common dtype, just like `create_array` would have done with
+    all of the values at once.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def __len__(self):
+        return sum(len(i) for i in self.chunks)
+
+    @property
+    def dtype(self):
+        if not self.chunks:
+            return None
+        return np.result_type(*self.chunks)
+
+    def append_cells(self, cells):
+        self.chunks.append(_parse_cells(cells))
+
+    def finish(self):
+        if not self.chunks:
+            return create_array([])
+        return _concatenate_chunks(self.chunks)
+
+
+def _parse_cells(cells):
+    # Let numpy parse the whole batch at once. This uses the same rules as
+    # `int` and `float`, so it agrees with `parse_number` whenever it works.
+    array = np.array(cells, dtype=str)
+
+    try:
+        return array.astype(np.int64)
+    except OverflowError:
+        # Fall back to python's arbitrary precision ints.
+        return _convert_cells(cells)
+    except ValueError:
+        pass
+
+    try:
+        floats = array.astype(np.float64)
+    except ValueError:
+        floats = None
+
+    # Keep the ints in a batch of ints and floats, in case the column also
+    # contains strings.
+    if floats is not None and not _has_int_cells(array, floats):
+        return floats
+
+    # Something in this batch is not a plain float. So convert the cells one
+    # at a time.
+    return _convert_cells(cells)
+
+
+def _has_int_cells(array, floats):
+    # A cell with a whole number is an int, unless it has a decimal point or
+    # an exponent.
+    cells = array[np.isfinite(floats) & (np.floor(floats) == floats)]
+    is_float = ((np.char.find(cells, '.') >= 0)
+        | (np.char.find(np.char.lower(cells), 'e') >= 0))
+    return not is_float.all()
+
+
+def _convert_cells(cells):
+    # We already know that these cells aren't all plain numbers, so skip
+    # straight to converting each distinct cell.
+    values, invalid = _coerce_distinct_strings(cells, strict=True)
+
+    # Keep the cells that aren't numbers as strings. (And keep the values as
+    # objects, so that `_concatenate_chunks` can promote them.)
+    if invalid.any():
+        values[invalid] = np.array(cells, dtype=object)[invalid]
+
+    return values
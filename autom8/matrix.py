@@ -1,15 +1,21 @@
+from collections.abc import Iterator
+import os.path
 import re
 import numpy as np
+import pandas as pd
+import scipy.sparse
 
+from .coercion import coerce_to_numbers, string_mask
 from .docstrings import render_docstring
 from .exceptions import expected, typename
 from .formats import (
     drop_empty_rows,
+    empty_row_mask,
     excel_column_index,
     excel_column_name,
-    parse_number,
 )
 from .receiver import Receiver
+from .storage import is_spilled, SpillStorage
 
 
 @render_docstring
@@ -24,37 +30,303 @@ def create_matrix(dataset, column_names=None, column_roles=None, receiver=None):
     if receiver is None:
         receiver = Receiver()
 
-    matrix = _create_matrix(dataset, column_names, column_roles, receiver)
-
-    # Warn the user if the column names are not unique.
-    names = matrix.column_names
-    if len(names) != len(set(names)):
-        receiver.warn(f'Column names are not unique in {repr(names)}')
+    # Only read a file when the caller clearly passes a path, so that a string
+    # never gets read as a CSV file just because it names an existing file.
+    if isinstance(dataset, os.PathLike):
+        from .loading import load_csv
+        return load_csv(dataset, column_names, column_roles, receiver)
 
+    matrix = _create_matrix(dataset, column_names, column_roles, receiver)
+    _warn_about_duplicate_names(receiver, matrix)
+    _encode_columns(matrix)
     return matrix
 
 
 def _create_matrix(dataset, names, roles, receiver):
+    if isinstance(dataset, Iterator):
+        return _create_matrix_from_batches(dataset, names, roles, receiver)
+
+    if isinstance(dataset, pd.DataFrame):
+        labels = list(dataset.columns)
+        arrays = [_series_values(dataset.iloc[:, i]) for i in range(len(labels))]
+        return _create_matrix_from_columns(labels, arrays, names, roles, receiver)
+
+    if isinstance(dataset, dict):
+        labels = list(dataset.keys())
+        arrays = [_column_values(i) for i in dataset.values()]
+        return _create_matrix_from_columns(labels, arrays, names, roles, receiver)
+
+    if isinstance(dataset, np.ndarray) and dataset.dtype.names is not None:
+        labels = list(dataset.dtype.names)
+        arrays = [np.asarray(dataset[i]) for i in labels]
+        return _create_matrix_from_columns(labels, arrays, names, roles, receiver)
+
     if not isinstance(dataset, (list, tuple, np.ndarray, Matrix)):
-        raise expected('list, tuple, numpy array, or Matrix', typename(dataset))
+        raise expected(
+            'list, tuple, numpy array, Matrix, DataFrame, dict of columns,'
+            ' iterator of row batches, or pathlib.Path of a CSV file',
+            typename(dataset),
+        )
 
     if isinstance(dataset, Matrix):
         return _copy_and_update_matrix(dataset, names, roles)
 
+    # Treat a 2D array as a list of columns. (A 2D array of numbers can't
+    # contain empty rows or column names, so just use a view of each column.)
+    if isinstance(dataset, np.ndarray) and dataset.ndim == 2 and len(dataset):
+        arrays = [dataset[:, i] for i in range(dataset.shape[1])]
+        if _is_clean_dtype(dataset.dtype) and _are_unknown(names):
+            names = 'missing'
+        return _create_matrix_from_columns(None, arrays, names, roles, receiver)
+
     # Drop empty rows.
     rows = drop_empty_rows(dataset)
-    num_dropped = len(dataset) - len(rows)
+    _warn_about_dropped_rows(receiver, len(dataset) - len(rows))
+
+    # Figure out how many columns we need.
+    mincols = min(len(row) for row in rows) if rows else 0
+    maxcols = max(len(row) for row in rows) if rows else 0
+    _warn_about_extra_columns(receiver, mincols, maxcols)
+
+    def make(index):
+        values = create_array([row[index] for row in rows])
+        formula = excel_column_name(index)
+        return Column(values=values, formula=formula, role=None, is_original=True)
+
+    matrix = Matrix([make(i) for i in range(mincols)])
+    _name_columns(matrix, names)
+    _update_roles(matrix, roles)
+    return matrix
+
+
+def _create_matrix_from_batches(batches, names, roles, receiver):
+    # Build each column one batch at a time, so that we only ever hold one
+    # batch of rows in memory, along with the column arrays.
+    chunks = None
+    num_dropped = 0
+    maxcols = 0
+
+    for batch in batches:
+        rows = drop_empty_rows(batch)
+        num_dropped += len(batch) - len(rows)
+
+        if not rows:
+            continue
+
+        batch_mincols = min(len(row) for row in rows)
+        maxcols = max(maxcols, max(len(row) for row in rows))
+
+        if chunks is None:
+            chunks = [[] for _ in range(batch_mincols)]
+        else:
+            del chunks[batch_mincols:]
+
+        for index, column_chunks in enumerate(chunks):
+            column_chunks.append(_create_chunk([row[index] for row in rows]))
+
+    chunks = chunks or []
+    _warn_about_dropped_rows(receiver, num_dropped)
+    _warn_about_extra_columns(receiver, len(chunks), maxcols)
+
+    matrix = Matrix([
+        Column(
+            values=_concatenate_chunks(column_chunks),
+            formula=excel_column_name(index),
+            role=None,
+            is_original=True,
+        )
+        for index, column_chunks in enumerate(chunks)
+    ])
+    _name_columns(matrix, names)
+    _update_roles(matrix, roles)
+    return matrix
+
+
+def _create_matrix_from_columns(labels, arrays, names, roles, receiver):
+    if any(i.ndim != 1 for i in arrays):
+        raise expected('each column to be one-dimensional',
+            [i.shape for i in arrays])
+
+    # Use each array as-is when numpy already gave it a clean dtype. Otherwise,
+    # let `create_array` infer the dtype, like it does for lists of rows.
+    arrays = [i if _is_clean_dtype(i.dtype) else create_array(i.tolist())
+        for i in arrays]
+
+    if len({len(i) for i in arrays}) > 1:
+        raise expected('columns of equal length', [len(i) for i in arrays])
+
+    is_empty = empty_row_mask(arrays)
+    if is_empty.any():
+        arrays = [i[~is_empty] for i in arrays]
+        _warn_about_dropped_rows(receiver, int(is_empty.sum()))
+
+    # When we don't have any labels, use the Excel-style names for now.
+    if labels is None:
+        labels = [excel_column_name(i) for i in range(len(arrays))]
+        has_labels = False
+    else:
+        has_labels = True
+
+    matrix = Matrix([
+        Column(values=values, formula=str(label), role=None, is_original=True)
+        for label, values in zip(labels, arrays)
+    ])
+
+    # Use the labels as the column names, unless the caller says otherwise.
+    if not has_labels or not _are_unknown(names):
+        _name_columns(matrix, names)
+
+    _update_roles(matrix, roles)
+    return matrix
+
+
+def _are_unknown(names):
+    return names is None or (isinstance(names, str) and names == 'unknown')
+
+
+def _is_clean_dtype(dtype):
+    return dtype.kind in 'biuf'
+
+
+def _series_values(series):
+    # Ask pandas for a view of the series, when it has a plain numpy dtype.
+    if isinstance(series.dtype, np.dtype) and _is_clean_dtype(series.dtype):
+        return series.to_numpy(copy=False)
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def _column_values(values):
+    if isinstance(values, pd.Series):
+        return _series_values(values)
+    if isinstance(values, np.ndarray):
+        return values
+    if isinstance(values, (list, tuple)):
+        return create_array(values)
+    raise expected('dict of lists or one-dimensional arrays', typename(values))
 
-    # Warn the users if we dropped some rows.
+
+def _create_chunk(values):
+    # Like `create_array`, but a chunk that mixes types (like ints and floats)
+    # stays an array of objects, so that `_concatenate_chunks` can promote it
+    # once it sees the whole column.
+    array = create_array(values)
+    if array.dtype != object and len(set(map(type, values))) > 1:
+        return np.array(values, dtype=object)
+    return array
+
+
+def _concatenate_chunks(chunks):
+    # Returns the same array that `create_array` would have returned for all
+    # of the values at once. When a column contains strings, each value keeps
+    # its type, so numpy casts the typed chunks to objects. Otherwise, let
+    # numpy promote the values to a common dtype.
+    values = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+    if values.dtype == object and not string_mask(values).any():
+        return create_array(values.tolist())
+    return values
+
+
+def _encode_columns(matrix):
+    # Dictionary-encode the columns of strings that repeat a lot, and pack the
+    # other columns of strings into buffers. In the columns of numbers, move
+    # the None values into masks. (Columns that already have a clean dtype
+    # never contain strings or None values.)
+    for col in matrix.columns:
+        values = col._values
+        if isinstance(values, np.ndarray) and values.dtype == object:
+            col.values, col.mask = _encode_values(values)
+
+
+# A column of strings is dictionary-encoded when at most this fraction of its
+# values are distinct.
+max_dictionary_ratio = 0.5
+
+
+def _encode_values(values):
+    # Returns a tuple of (values, mask), where the mask is None or a boolean
+    # array that indicates which values are defined.
+    if len(values) == 0:
+        return values, None
+
+    is_str = string_mask(values)
+    with np.errstate(all='ignore'):
+        is_none = ~is_str & (values == None)
+    mask = ~is_none if is_none.any() else None
+
+    if (is_str | is_none).all():
+        encoded = _dictionary_encode(values, is_none)
+        if encoded is not None:
+            return encoded, None
+
+        # Use the empty string for each None value, and mask it.
+        if mask is not None:
+            values = np.where(mask, values, '')
+        return StringArray.from_strings(values), mask
+
+    if mask is None or is_str.any():
+        return values, None
+
+    typed = _typed_values(values[mask])
+    if typed is None:
+        return values, None
+
+    # Use zero for each None value, and mask it.
+    result = np.zeros(len(values), dtype=typed.dtype)
+    result[mask] = typed
+    return result, mask
+
+
+def _typed_values(values):
+    # Returns a typed array of the values, when they are all booleans, all
+    # ints, or all floats. Otherwise, returns None.
+    kind = type(values[0])
+    if kind not in (bool, int, float):
+        return None
+
+    if not all(type(i) is kind for i in values):
+        return None
+
+    try:
+        return values.astype(kind)
+    except OverflowError:
+        return None
+
+
+def _dictionary_encode(values, is_none):
+    # Returns a DictionaryArray for the strings and None values, or None when
+    # too many of them are distinct.
+
+    # Only hash strings here. (Hashing would treat 1, 1.0, and True as the
+    # same value.) The code -1 means None.
+    codes, uniques = pd.factorize(values)
+    has_none = is_none.any()
+    num_categories = len(uniques) + int(has_none)
+    if num_categories > max_dictionary_ratio * len(values):
+        return None
+
+    categories = np.empty(num_categories, dtype=object)
+    categories[:len(uniques)] = uniques
+    if has_none:
+        codes[codes < 0] = len(uniques)
+    return DictionaryArray(
+        codes.astype(np.min_scalar_type(num_categories), copy=False),
+        categories,
+    )
+
+
+def _warn_about_duplicate_names(receiver, matrix):
+    names = matrix.column_names
+    if len(names) != len(set(names)):
+        receiver.warn(f'Column names are not unique in {repr(names)}')
+
+
+def _warn_about_dropped_rows(receiver, num_dropped):
     if num_dropped:
         suffix = '' if num_dropped == 1 else 's'
         receiver.warn(f'Dropped {num_dropped} empty row{suffix} from dataset.')
 
-    # Figure out how many columns we need.
-    mincols = min(len(row) for row in rows) if rows else 0
-    maxcols = max(len(row) for row in rows) if rows else 0
 
-    # Warn the user if we're dropping any extra columns.
+def _warn_about_extra_columns(receiver, mincols, maxcols):
     if mincols < maxcols:
         num_extra = maxcols - mincols
         suffix1 = '' if num_extra == 1 else 's'
@@ -66,32 +338,50 @@ def _create_matrix(dataset, names, roles, receiver):
             ' the same number of columns.'
         )
 
-    def make(index):
-        values = create_array([row[index] for row in rows])
-        formula = excel_column_name(index)
-        return Column(values=values, formula=formula, role=None, is_original=True)
-
-    matrix = Matrix([make(i) for i in range(mincols)])
-    _name_columns(matrix, names)
-    _update_roles(matrix, roles)
-    return matrix
-
 
 class Matrix:
     """Represents a matrix of features.
 
+    Once all of the matrix's columns contain floats, the matrix can pack them
+    into a single, Fortran-ordered block. Then each column's values are a
+    read-only view of one column in the block, and `_float_array` can return
+    the block without copying it. Appending a column of floats to a packed
+    matrix writes the column into the block, which grows by doubling its
+    capacity.
+
+    A column's values may also be a `SparseArray`, like the columns that
+    one-hot encoding produces. When the matrix has any sparse columns,
+    `_float_array` returns a `scipy.sparse.csr_matrix` instead of a block.
+
+    When a matrix has a `SpillStorage` (see the `spill` method), it keeps its
+    columns of booleans and numbers (and its block) in memory-mapped
+    temporary files. So do the matrices that it creates, like the results of
+    `copy` and `select_rows`.
+
     Attributes:
         columns (list[Column]): A list of the matrix's columns.
+        storage (SpillStorage or None): Where the matrix spills its columns.
     """
 
-    def __init__(self, columns):
+    def __init__(self, columns, storage=None):
         assert isinstance(columns, list)
         assert all(isinstance(i, Column) for i in columns)
         self.columns = columns
+        self.storage = storage
+
+        # The block is a 2D array with one row for each row in the matrix, and
+        # enough room for at least one column for each column in the matrix.
+        # The block is only valid while the values of the matrix's columns are
+        # the views in `_block_sources`, in the same order.
+        self._block = None
+        self._block_sources = []
+
+        # The index of the column names, for the current list of columns.
+        self._column_index = None
 
     @property
     def column_names(self):
-        return [col.name for col in self.columns]
+        return list(self._index().names)
 
     @property
     def formulas(self):
@@ -100,15 +390,55 @@ class Matrix:
     def __len__(self):
         return len(self.columns[0]) if self.columns else 0
 
+    @property
+    def nbytes(self):
+        """The approximate number of bytes that the matrix's columns use."""
+        return sum(col.nbytes for col in self.columns)
+
     def copy(self):
-        return Matrix([i.copy() for i in self.columns])
+        return Matrix([i.copy() for i in self.columns], self.storage)
+
+    def spill(self, storage=None):
+        """Moves the matrix's columns into memory-mapped temporary files.
+
+        After calling this method, the matrix also spills any columns that it
+        creates. Columns of objects (like strings) stay in memory.
+
+        Parameters:
+            storage (SpillStorage or None): Where to spill the columns.
+                Defaults to None, which means the matrix's current storage, or
+                a new `SpillStorage` in the default temporary directory.
+        """
+        if storage is not None:
+            self.storage = storage
+        elif self.storage is None:
+            self.storage = SpillStorage()
+
+        for col in self.columns:
+            self._spill_column(col)
 
     def tolist(self):
-        cols = [c.values.astype(object) for c in self.columns]
-        return np.column_stack(cols).tolist()
+        # Convert each column to python values, and then transpose them. This
+        # avoids creating a 2D object array.
+        cols = [c.values.tolist() for c in self.columns]
+        return [list(row) for row in zip(*cols)]
 
     def stack_columns(self):
-        return np.column_stack([col.values for col in self.columns])
+        if self._is_packed():
+            return _read_only(self._block[:, :len(self.columns)])
+
+        if self.storage is None and all(
+                isinstance(col._values, np.ndarray) for col in self.columns):
+            return np.column_stack([col.values for col in self.columns])
+
+        # Compute the lazy and sparse columns directly into the result. (But
+        # let masked columns put None in their missing values.)
+        dtype = np.result_type(*[col.dtype for col in self.columns])
+        result = self._empty((len(self), len(self.columns)), dtype)
+        for index, col in enumerate(self.columns):
+            values = col._values if col.mask is None else col.values
+            _copy_into(result[:, index], values)
+        return result
 
     def to_array(self):
         if len(self.columns) == 1:
@@ -124,40 +454,76 @@ class Matrix:
             raise expected('array of values', values.shape)
 
         col = Column(values, formula=formula, role=role, is_original=is_original)
-        self.columns.append(col)
+
+        # If the matrix is packed, then try to keep it that way.
+        if (self._is_packed()
+                and _is_float_column(values, len(self), self._block.dtype)):
+            num_cols = len(self.columns)
+            if num_cols == self._block.shape[1]:
+                self._pack(capacity=2 * num_cols)
+            _copy_into(self._block[:, num_cols], values)
+            col.values = _read_only(self._block[:, num_cols])
+            self._block_sources.append(col.values)
+
+        self.columns.append(self._spill_column(col))
 
     def drop_columns_by_index(self, indices):
         if isinstance(indices, int):
             indices = [indices]
 
-        self.columns = [col for i, col in enumerate(self.columns) if i not in indices]
+        # Copy the slices between the dropped columns into a new list. (Don't
+        # delete the columns in place, since the caller may be iterating over
+        # the current list.)
+        num_cols = len(self.columns)
+        columns, start = [], 0
+        for i in sorted({i for i in indices if 0 <= i < num_cols}):
+            columns.extend(self.columns[start:i])
+            start = i + 1
+        columns.extend(self.columns[start:])
+        self.columns = columns
 
     def select_rows(self, indices):
-        return Matrix([col.select_rows(indices) for col in self.columns])
+        # Spill each column as soon as it's created.
+        return Matrix([self._spill_column(col.select_rows(indices))
+            for col in self.columns], self.storage)
 
     def exclude_rows(self, indices):
-        return Matrix([col.exclude_rows(indices) for col in self.columns])
+        return Matrix([self._spill_column(col.exclude_rows(indices))
+            for col in self.columns], self.storage)
 
     def select_columns(self, indices):
-        return Matrix([self.columns[i].copy() for i in indices])
+        return Matrix([self.columns[i].copy() for i in indices], self.storage)
 
     def exclude_columns(self, indices):
+        indices = set(indices)
         return Matrix([col.copy()
             for i, col in enumerate(self.columns)
-                if i not in indices])
+                if i not in indices], self.storage)
 
     def select_columns_by_name(self, names):
+        index = self._index()
+
         # If the names match exactly, then return the matrix as-is.
-        if self.column_names == names:
+        if index.names == names:
             return self
 
         # If this matrix has the requested columns, then make a new matrix with them.
-        if set(self.column_names).issuperset(names):
-            lookup = {col.name: col for col in self.columns}
-            return Matrix([lookup[n].copy() for n in names])
+        positions = index.positions
+        if all(n in positions for n in names):
+            return Matrix([self.columns[positions[n]].copy() for n in names],
+                self.storage)
 
         raise expected(f'column names to be in {self.column_names}', names)
 
+    def column_index(self, name):
+        """Returns the index of the column with the given name or formula.
+
+        If more than one column has the name, then this method returns the
+        index of the last one. If no column has the name, then it returns
+        None.
+        """
+        return self._index().positions.get(_formula_name(name))
+
     def column_indices_where(self, predicate):
         return [i for i, col in enumerate(self.columns) if predicate(col)]
 
@@ -165,20 +531,431 @@ class Matrix:
         for col in self.columns:
             col.coerce(to_type)
 
-    def _float_array(self):
-        """Warning: This method mutates the matrix object."""
-        self.coerce(float)
-        return self.stack_columns()
+    def _float_array(self, dtype=float):
+        """Warning: This method mutates the matrix object.
+
+        The result is a read-only view of the matrix's block. Or when the
+        matrix has sparse columns, the result is a `scipy.sparse.csr_matrix`.
+        The `dtype` is the type of the result: either float64 or float32.
+        """
+        dtype = np.dtype(dtype)
+
+        # Numeric columns are cast when they're copied into the result, so
+        # only coerce the other columns.
+        for col in self.columns:
+            if col.is_sparse or col.dtype.kind not in 'biuf':
+                col.coerce(float)
+
+        if any(col.is_sparse for col in self.columns):
+            return self._sparse_array(dtype)
+        if not self._is_packed(dtype):
+            self._pack(capacity=len(self.columns), dtype=dtype)
+        return _read_only(self._block[:, :len(self.columns)])
+
+    def _index(self):
+        # Returns the ColumnIndex for the current columns. Code outside of this
+        # class may change the list of columns, or a column's formula, so
+        # check that the index is still valid. (This only compares identities,
+        # so it's much faster than computing the names again.)
+        formulas = [col.formula for col in self.columns]
+        index = self._column_index
+        if (index is None
+                or not _same_items(index.columns, self.columns)
+                or not _same_items(index.formulas, formulas)):
+            index = self._column_index = ColumnIndex(list(self.columns), formulas)
+        return index
+
+    def _is_packed(self, dtype=None):
+        sources = self._block_sources
+        return (
+            self._block is not None
+            and (dtype is None or self._block.dtype == dtype)
+            and len(sources) == len(self.columns)
+            and all(c._values is v for c, v in zip(self.columns, sources))
+        )
+
+    def _sparse_array(self, dtype):
+        # Builds the CSC arrays one column at a time, so that the dense
+        # columns only contribute their nonzero values.
+        pieces = [
+            col._values if col.is_sparse else SparseArray.from_dense(col.values)
+            for col in self.columns
+        ]
+        indptr = np.zeros(len(pieces) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(i.indices) for i in pieces])
+        indices = np.concatenate([i.indices for i in pieces] or [[]])
+        data = np.concatenate([i.data for i in pieces] or [[]])
+        result = scipy.sparse.csc_matrix(
+            (data.astype(dtype, copy=False), indices, indptr),
+            shape=(len(self), len(pieces)),
+        )
+        return result.tocsr()
+
+    def _pack(self, capacity, dtype=float):
+        # Copies each column into a new block, and makes each column's values
+        # a view of the block. Every column must already contain numbers.
+        block = self._empty((len(self), max(capacity, 1)), dtype, order='F')
+        for index, col in enumerate(self.columns):
+            _copy_into(block[:, index], col._values)
+            col.values = _read_only(block[:, index])
+        self._block = block
+        self._block_sources = [col.values for col in self.columns]
+
+    def _empty(self, shape, dtype, order='C'):
+        if self.storage is None:
+            return np.empty(shape, dtype=dtype, order=order)
+        return self.storage.empty(shape, dtype, order)
+
+    def _spill_column(self, col):
+        # Lazy columns stay lazy, since they are computed directly into the
+        # block. And sparse and dictionary columns are already small.
+        # (Set `_values` directly, so that the column keeps its mask.)
+        values = col._values
+        if self.storage is None:
+            return col
+
+        if isinstance(values, StringArray):
+            col._values = StringArray(
+                _read_only(self.storage.spill(values.data)),
+                _read_only(self.storage.spill(values.offsets)),
+            )
+        elif isinstance(values, np.ndarray):
+            spilled = self.storage.spill(values)
+            if spilled is not values:
+                if not values.flags.writeable:
+                    spilled = _read_only(spilled)
+                col._values = spilled
+
+        if col.mask is not None:
+            col.mask = _read_only(self.storage.spill(col.mask))
+        return col
+
+
+class ColumnIndex:
+    """Maps the names of a matrix's columns to their indices."""
+
+    def __init__(self, columns, formulas):
+        self.columns = columns
+        self.formulas = formulas
+        self.names = [col.name for col in columns]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+
+def _formula_name(formula):
+    if isinstance(formula, str):
+        return formula
+    else:
+        # TODO: Pretty-print the formula. Maybe put "=" in front.
+        return repr(formula)
+
+
+def _same_items(xs, ys):
+    return len(xs) == len(ys) and all(x is y for x, y in zip(xs, ys))
+
+
+def _read_only(values):
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+
+def _is_float_column(values, num_rows, dtype=np.float64):
+    return (
+        values.dtype == dtype
+        and len(values) == num_rows
+        and not isinstance(values, SparseArray)
+    )
+
+
+def _copy_into(out, values):
+    if isinstance(values, LazyArray):
+        values.compute(out=out)
+    elif isinstance(values, SparseArray):
+        out.fill(0)
+        out[values.indices] = values.data
+    elif isinstance(values, (DictionaryArray, StringArray)):
+        out[:] = values.toarray()
+    else:
+        out[:] = values
+
+
+class SparseArray:
+    """A column of numbers that are mostly zeros.
+
+    Only the nonzero values are stored: `data[i]` is the value in the row
+    `indices[i]`. A sparse array is immutable, so columns can share it.
+
+    >>> arr = SparseArray.from_dense(np.array([0.0, 2.5, 0.0, 1.0]))
+    >>> arr.indices.tolist(), arr.data.tolist(), len(arr)
+    ([1, 3], [2.5, 1.0], 4)
+    >>> arr.toarray()
+    array([0. , 2.5, 0. , 1. ])
+    """
+
+    def __init__(self, indices, data, length):
+        self.indices = indices
+        self.data = data
+        self.shape = (length,)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @classmethod
+    def from_dense(cls, values):
+        indices = np.flatnonzero(values)
+        return cls(indices, values[indices], len(values))
+
+    @classmethod
+    def from_csc(cls, matrix, index):
+        """Returns one column of a `scipy.sparse.csc_matrix`."""
+        start, stop = matrix.indptr[index], matrix.indptr[index + 1]
+        return cls(matrix.indices[start:stop], matrix.data[start:stop],
+            matrix.shape[0])
+
+    def astype(self, dtype):
+        return SparseArray(self.indices, self.data.astype(dtype), len(self))
+
+    def take(self, rows):
+        return SparseArray.from_dense(self.toarray()[rows])
+
+    def toarray(self):
+        result = np.zeros(len(self), dtype=self.dtype)
+        result[self.indices] = self.data
+        return result
+
+
+class DictionaryArray:
+    """A column of strings that repeat a lot.
+
+    Each distinct value is stored once, in `categories`, and `codes[i]` is the
+    index of the value in the row `i`. The categories may include None. A
+    dictionary array is immutable, so columns can share it.
+
+    >>> arr = DictionaryArray(np.array([0, 1, 0, 2], dtype=np.uint8),
+    ...     np.array(['a', 'b', None], dtype=object))
+    >>> len(arr), arr.dtype
+    (4, dtype('O'))
+    >>> arr.toarray().tolist()
+    ['a', 'b', 'a', None]
+    >>> arr.counts().tolist()
+    [2, 1, 1]
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+        self.shape = codes.shape
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def dtype(self):
+        return self.categories.dtype
+
+    def counts(self):
+        """Returns the number of times that each category appears."""
+        return np.bincount(self.codes, minlength=len(self.categories))
+
+    def take(self, rows):
+        return DictionaryArray(self.codes[rows], self.categories)
+
+    def delete(self, rows):
+        return DictionaryArray(np.delete(self.codes, rows), self.categories)
+
+    def toarray(self):
+        return self.categories[self.codes]
+
+
+class StringArray:
+    """A column of strings, packed into a single buffer.
+
+    The `data` array contains the UTF-8 bytes of every string, one after
+    another, and the string in the row `i` is `data[offsets[i]:offsets[i + 1]]`.
+    So the strings don't need a Python object each, and the whole column can
+    be pickled, spilled, or sent to another process as two numpy arrays. A
+    string array is immutable, so columns can share it.
+
+    >>> arr = StringArray.from_strings(['hi', '', 'café'])
+    >>> arr.data.tobytes(), arr.offsets.tolist()
+    (b'hicaf\\xc3\\xa9', [0, 2, 2, 7])
+    >>> arr.toarray().tolist()
+    ['hi', '', 'café']
+    >>> arr.take([2, 0, 2]).tolist()
+    ['café', 'hi', 'café']
+    >>> StringArray.join([arr, arr.take([1, 1, 0])], ' ').tolist()
+    ['hi ', ' ', 'café hi']
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self.shape = (len(offsets) - 1,)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def dtype(self):
+        return np.dtype(object)
+
+    @property
+    def lengths(self):
+        """The number of bytes in each string."""
+        return np.diff(self.offsets)
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [i.encode('utf-8', 'surrogatepass') for i in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+            count=len(encoded)), out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def join(cls, arrays, separator):
+        """Joins the strings in each row of the arrays, like `str.join`."""
+
+        sep = np.frombuffer(separator.encode('utf-8'), dtype=np.uint8)
+        lengths = [i.lengths for i in arrays]
+        offsets = np.zeros(len(arrays[0]) + 1, dtype=np.int64)
+        np.cumsum(sum(lengths) + len(sep) * (len(arrays) - 1), out=offsets[1:])
+        data = np.empty(offsets[-1], dtype=np.uint8)
+
+        # Copy each array's bytes to their places in each row, and then put a
+        # separator after them, except in the last array.
+        starts = offsets[:-1].copy()
+        for index, (arr, length) in enumerate(zip(arrays, lengths)):
+            shift = np.repeat(starts - arr.offsets[:-1], length)
+            data[shift + np.arange(len(shift))] = arr.data[:arr.offsets[-1]]
+            starts += length
+            if index < len(arrays) - 1:
+                for i, byte in enumerate(sep):
+                    data[starts + i] = byte
+                starts += len(sep)
+        return cls(data, offsets)
+
+    def take(self, rows):
+        lengths = self.lengths[rows]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        shift = np.repeat(self.offsets[:-1][rows] - offsets[:-1], lengths)
+        return StringArray(self.data[shift + np.arange(offsets[-1])], offsets)
+
+    def delete(self, rows):
+        return self.take(np.delete(np.arange(len(self)), rows))
+
+    def tolist(self):
+        text = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [text[start:stop].decode('utf-8', 'surrogatepass')
+            for start, stop in zip(offsets, offsets[1:])]
+
+    def toarray(self):
+        result = np.empty(len(self), dtype=object)
+        result[:] = self.tolist()
+        return result
+
+
+# The immutable arrays that columns share, and that the `values` property
+# turns into a new numpy array each time.
+_encoded_arrays = (SparseArray, DictionaryArray, StringArray)
+
+
+class LazyArray:
+    """An array of floats that autom8 only computes when something needs it.
+
+    The values are the result of `func(*args)`. The `func` must also accept an
+    `out` keyword argument, like a numpy ufunc, so that a matrix can compute
+    the values directly into its block of floats. And it must work on one
+    element at a time, so that `take` can compute just some of the rows. The
+    `dtype` is the type of the values, which defaults to float64.
+
+    >>> x = np.array([1.0, 2.0, 3.0])
+    >>> lazy = LazyArray(np.multiply, x, x)
+    >>> col = Column(lazy, formula=['square', 'x'], role='numerical',
+    ...     is_original=False)
+    >>> col.is_lazy, len(col), col.dtype
+    (True, 3, dtype('float64'))
+    >>> col.values
+    array([1., 4., 9.])
+    >>> col.is_lazy
+    False
+    """
+
+    def __init__(self, func, *args, dtype=float):
+        self.func = func
+        self.args = args
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(args[0]),)
+        self._result = None
+
+    def __len__(self):
+        return self.shape[0]
+
+    def compute(self, out=None):
+        """Returns the values, or writes them into `out` and returns `out`.
+
+        When `out` is None, the array remembers its values (as a read-only
+        array), so that every column that shares it computes them only once.
+        """
+
+        # Read the args first. If another thread has already computed the
+        # result, then it set `_result` before it cleared `args`.
+        args, result = self.args, self._result
+
+        if result is None and out is not None:
+            return self.func(*args, out=out)
+
+        if result is None:
+            values = self.func(*args).astype(self.dtype, copy=False)
+            result = self._result = _read_only(values)
+            # Let go of the source arrays.
+            self.args = None
+
+        if out is None:
+            return result
+
+        out[:] = result
+        return out
+
+    def take(self, rows):
+        """Returns the values in the indicated rows, as a new array.
+
+        Unless the array has already computed all of its values, this only
+        computes the values in those rows.
+        """
+        args, result = self.args, self._result
+        if result is not None:
+            return result[rows]
+        values = self.func(*[arg[rows] for arg in args])
+        return values.astype(self.dtype, copy=False)
 
 
 class Column:
-    def __init__(self, values, formula, role, is_original):
+    def __init__(self, values, formula, role, is_original, mask=None):
         assert len(values.shape) == 1
         assert isinstance(formula, (str, list))
         assert role is None or isinstance(role, str)
         assert isinstance(is_original, bool)
+
+        # The values may be a LazyArray, in which case the `values` property
+        # computes them the first time that someone reads it. Or they may be
+        # a SparseArray, a DictionaryArray, or a StringArray, in which case
+        # the `values` property returns a new, read-only dense array each
+        # time. (So code that needs the dense values more than once should
+        # read them once and keep them, or work with `_values` directly.)
         self.values = values
 
+        # When the column has a mask, the `values` property returns an array
+        # of objects, with None wherever the mask is False.
+        assert mask is None or len(mask) == len(values)
+        self.mask = mask
+
         if isinstance(formula, str):
             self.formula = formula
         else:
@@ -189,19 +966,69 @@ class Column:
         self.is_original = is_original
 
     def __len__(self):
-        return len(self.values)
+        return len(self._values)
+
+    @property
+    def values(self):
+        values = self._values
+        if isinstance(values, LazyArray):
+            values = self._values = values.compute()
+        elif isinstance(values, _encoded_arrays):
+            values = values.toarray()
+
+        if self.mask is not None:
+            values = np.array(values, dtype=object)
+            values[~self.mask] = None
+
+        if values is not self._values:
+            values = _read_only(values)
+        return values
+
+    @values.setter
+    def values(self, values):
+        # The new values replace the mask, too.
+        self._values = values
+        self.mask = None
+
+    @property
+    def nbytes(self):
+        """The approximate number of bytes that the column's values use.
+
+        For a lazy column, this is the size of the values once they are
+        computed. For an array of objects, this only counts the references to
+        the objects. Values in memory-mapped files don't count.
+        """
+        mask = 0 if self.mask is None else _nbytes(self.mask)
+        return mask + _values_nbytes(self._values)
+
+    @property
+    def is_lazy(self):
+        """Indicates if the column's values have not been computed yet."""
+        return isinstance(self._values, LazyArray)
+
+    @property
+    def is_sparse(self):
+        """Indicates if the column's values are a SparseArray."""
+        return isinstance(self._values, SparseArray)
+
+    @property
+    def is_dictionary(self):
+        """Indicates if the column's values are a DictionaryArray."""
+        return isinstance(self._values, DictionaryArray)
+
+    @property
+    def is_text(self):
+        """Indicates if the column's values are a StringArray."""
+        return isinstance(self._values, StringArray)
 
     @property
     def name(self):
-        if isinstance(self.formula, str):
-            return self.formula
-        else:
-            # TODO: Pretty-print the formula. Maybe put "=" in front.
-            return repr(self.formula)
+        return _formula_name(self.formula)
 
     @property
     def dtype(self):
-        return self.values.dtype
+        # A masked column's values are objects, since they include None.
+        return np.dtype(object) if self.mask is not None else self._values.dtype
 
     @property
     def is_numerical(self):
@@ -221,10 +1048,20 @@ class Column:
         self._role = role
 
     def copy(self):
-        values = np.copy(self.values)
-        return self.copy_with(values)
-
-    def copy_with(self, values, role='__copy__'):
+        # Copy the values lazily. Both columns share a read-only view of the
+        # values, so neither one can change them in place. Code that wants to
+        # change a column's values must give the column a new array instead.
+        # (A lazy column shares its LazyArray, which computes its values once,
+        # and the other columns share their immutable encoded arrays.)
+        # A masked column shares its mask, too.
+        values = self._values
+        if isinstance(values, np.ndarray):
+            if values.flags.writeable:
+                self._values = values = _read_only(values)
+            values = _read_only(values)
+        return self.copy_with(values, mask=self.mask)
+
+    def copy_with(self, values, role='__copy__', mask=None):
         assert len(values.shape) == 1
 
         # Use a magic sentinel instead of None, since None is a valid role.
@@ -236,6 +1073,7 @@ class Column:
             formula=self.formula,
             role=role,
             is_original=self.is_original,
+            mask=mask,
         )
 
     def coerce(self, to_type):
@@ -243,6 +1081,20 @@ class Column:
         if to_type not in expected:
             raise TypeError(f'coerce() argument must be one of: {expected}')
 
+        # Lazy columns already contain floats, so don't compute them yet.
+        if self.is_lazy and to_type == float:
+            return
+
+        # Keep sparse columns sparse, when they only need a new dtype.
+        if self.is_sparse and to_type in (bool, float, int):
+            if self.dtype != to_type:
+                self._values = self._values.astype(to_type)
+            return
+
+        # Dictionary and text columns already contain objects.
+        if (self.is_dictionary or self.is_text) and to_type == object:
+            return
+
         if to_type == bool:
             self._coerce(bool, False, bool)
 
@@ -259,13 +1111,18 @@ class Column:
             assert False
 
     def coerce_values_to_numbers(self, to_type=float):
-        def conv(x):
-            try:
-                return to_type(parse_number(x))
-            except Exception:
-                return to_type(x)
+        # Missing numbers become zero, which is already in their place.
+        if self.mask is not None and self._values.dtype.kind in 'biuf':
+            self.values = _coerce_to_numbers(self._values, to_type)
+            return
 
-        self._coerce(to_type, to_type(0), conv)
+        # Convert each distinct value of a dictionary column just once.
+        if self.is_dictionary:
+            dictionary = self._values
+            numbers = _coerce_to_numbers(dictionary.categories, to_type)
+            self.values = numbers[dictionary.codes]
+        else:
+            self.values = _coerce_to_numbers(self.values, to_type)
 
     def coerce_values_to_strings(self):
         def conv(x):
@@ -274,8 +1131,15 @@ class Column:
             except Exception:
                 return ''
 
-        if not all(isinstance(x, str) for x in self.values):
-            self.values = create_array([conv(x) for x in self.values])
+        # A text column, or a dictionary column of strings, is already clean.
+        if self.is_text and self.mask is None:
+            return
+        if self.is_dictionary and string_mask(self._values.categories).all():
+            return
+
+        values = self.values
+        if not all(isinstance(x, str) for x in values):
+            self.values = create_array([conv(x) for x in values])
 
     def _coerce(self, to_type, default, coerce_func):
         try:
@@ -295,9 +1159,19 @@ class Column:
         self.values = np.array([conv(x) for x in self.values], dtype=to_type)
 
     def select_rows(self, indices):
+        mask = None if self.mask is None else self.mask[indices]
+        if isinstance(self._values, _encoded_arrays):
+            return self.copy_with(self._values.take(indices), mask=mask)
+        if mask is not None:
+            return self.copy_with(self._values[indices], mask=mask)
         return self.copy_with(self.values[indices])
 
     def exclude_rows(self, indices):
+        mask = None if self.mask is None else np.delete(self.mask, indices)
+        if self.is_dictionary or self.is_text:
+            return self.copy_with(self._values.delete(indices), mask=mask)
+        if mask is not None:
+            return self.copy_with(np.delete(self._values, indices), mask=mask)
         return self.copy_with(np.delete(self.values, indices))
 
     def root_columns(self):
@@ -314,6 +1188,28 @@ class Column:
         return roots
 
 
+def _values_nbytes(values):
+    if isinstance(values, SparseArray):
+        return values.indices.nbytes + values.data.nbytes
+    if isinstance(values, DictionaryArray):
+        return values.codes.nbytes + values.categories.nbytes
+    if isinstance(values, StringArray):
+        return _nbytes(values.data) + _nbytes(values.offsets)
+    return _nbytes(values)
+
+
+def _nbytes(values):
+    # Values in memory-mapped files don't count.
+    return 0 if is_spilled(values) else len(values) * values.dtype.itemsize
+
+
+def _coerce_to_numbers(values, to_type):
+    try:
+        return values.astype(to_type, copy=False)
+    except Exception:
+        return coerce_to_numbers(values, to_type, to_type(0))
+
+
 def _copy_and_update_matrix(matrix, names, roles):
     matrix = matrix.copy()
 
@@ -363,26 +1259,77 @@ def _includes_column_names(matrix):
     if len(matrix) == 0:
         return False
 
+    first_row = [col.values[0] for col in matrix.columns]
+    remaining = [col.values[1:] for col in matrix.columns]
+    return _looks_like_column_names(first_row, remaining)
+
+
+def _looks_like_column_names(first_row, remaining):
     # If the first row contains all strings, then assume those are the
     # column names.
-    if all(isinstance(col.values[0], str) for col in matrix.columns):
+    if all(isinstance(i, str) for i in first_row):
         return True
 
     # If any column looks like it starts with a name, then assume that this
     # matrix must include the column names.
-    for col in matrix.columns:
-        vals = col.values
-        has_name = isinstance(vals[0], str)
-        has_rest = len(vals) > 1
-        has_nums = any(i is not None and not isinstance(i, str) for i in vals[1:])
-        no_strs = all(not isinstance(i, str) or i == '' for i in vals[1:])
-        if has_name and has_rest and has_nums and no_strs:
+    for first, rest in zip(first_row, remaining):
+        if isinstance(first, str) and len(rest) > 0 and _only_numbers(rest):
             return True
 
     # Well, it doesn't look like this matrix contains the column names.
     return False
 
 
+# The number of values that `_only_numbers` checks before it checks the rest.
+header_sample_size = 1000
+
+
+def sample_indices(num_rows, size):
+    """Returns the sorted indices of a stratified sample of the rows.
+
+    The sample contains rows from the beginning and the end, plus rows from
+    the middle, chosen at random. (The random rows are the same every time.)
+    When `size` is at least `num_rows`, the sample contains every row.
+
+    >>> sample_indices(100, 7)[:2].tolist(), sample_indices(100, 7)[-2:].tolist()
+    ([0, 1], [98, 99])
+    >>> len(sample_indices(100, 7)), len(set(sample_indices(100, 7)))
+    (7, 7)
+    >>> sample_indices(3, 10).tolist()
+    [0, 1, 2]
+    """
+
+    if size >= num_rows:
+        return np.arange(num_rows)
+
+    num_ends = size // 3
+    middle = np.random.default_rng(0).choice(num_rows - 2 * num_ends,
+        size=size - 2 * num_ends, replace=False)
+    return np.concatenate([
+        np.arange(num_ends),
+        np.sort(middle) + num_ends,
+        np.arange(num_rows - num_ends, num_rows),
+    ])
+
+
+def _only_numbers(values):
+    # Returns True when the values contain at least one number (or other
+    # non-string value), and when each string is the empty string.
+    values = values if isinstance(values, np.ndarray) else create_array(values)
+
+    if values.dtype.kind != 'O':
+        return values.dtype.kind != 'U'
+
+    # Most columns of strings fail this test early, so check a prefix first.
+    for part in [values[:header_sample_size], values]:
+        is_str = string_mask(part)
+        if (part[is_str] != '').any():
+            return False
+
+    with np.errstate(all='ignore'):
+        return bool((~is_str & (values != None)).any())
+
+
 def _extract_column_names(matrix):
     if len(matrix) == 0:
         raise expected('nonempty dataset', 'empty dataset')
@@ -1,5 +1,6 @@
 from collections import namedtuple
 import numpy as np
+import pandas as pd
 import scipy.sparse
 
 from .matrix import create_matrix, Matrix
@@ -12,39 +13,52 @@ PredictionReport = namedtuple('PredictionReport', 'predictions, probabilities')
 
 
 class Pipeline:
-    def __init__(self, input_columns, predicts_column, steps, estimator, label_encoder):
+    def __init__(self, input_columns, predicts_column, steps, estimator,
+            label_encoder, compact=False):
         self.input_columns = input_columns
         self.predicts_column = predicts_column
         self.steps = steps
         self.estimator = estimator
         self.label_encoder = label_encoder
 
+        # Indicates if the estimator was trained on 32-bit floats. In this
+        # case, the pipeline makes predictions with 32-bit floats too.
+        self.compact = compact
+
+    def __setstate__(self, state):
+        # Pipelines that older versions of autom8 pickled don't have a
+        # `compact` attribute.
+        self.compact = False
+        self.__dict__.update(state)
+
     @property
     def predicts_classes(self):
         return self.label_encoder.classes_.tolist() if self.label_encoder else None
 
     def run(self, features, receiver=None):
-        if not isinstance(features, (list, Matrix)):
-            raise expected('list or Matrix', typename(features))
+        if not isinstance(features, (list, Matrix, pd.DataFrame, dict, np.ndarray)):
+            raise expected('list, Matrix, DataFrame, dict of columns, or numpy'
+                ' array', typename(features))
 
         if receiver is None:
             receiver = Receiver()
 
-        if isinstance(features, list):
+        if not isinstance(features, Matrix):
             features = create_matrix(features, receiver=receiver)
 
         # Rearrange the matrix so that the columns are in the right order.
         assert isinstance(features, Matrix)
         selected = self._select_columns(features, receiver)
 
-        ctx = PlaybackContext(selected, receiver)
+        ctx = PlaybackContext(selected, receiver, compact=self.compact)
         playback(self.steps, ctx)
         return self._predict(ctx.matrix)
 
     def _predict(self, X):
         # TODO: Require a receiver, and notify it when the features need a lot
         # of coercion.
-        X = X._float_array()
+        if isinstance(X, Matrix):
+            X = X._float_array(np.float32 if self.compact else np.float64)
 
         has_proba = hasattr(self.estimator, 'predict_proba')
         probabilities = [] if has_proba else None
@@ -52,7 +66,7 @@ class Pipeline:
 
         # TODO: Calculate an appropriate stride.
         stride = 1000
-        for i in range(0, len(X), stride):
+        for i in range(0, X.shape[0], stride):
             window = scipy.sparse.csr_matrix(X[i : i + stride])
 
             if has_proba:
@@ -103,11 +117,14 @@ class Pipeline:
 
 
 class PlaybackContext:
-    def __init__(self, matrix, receiver):
+    def __init__(self, matrix, receiver, compact=False):
         self.matrix = matrix
         self.receiver = receiver
         self.is_recording = False
 
+        # Use the same floats as the context that recorded the steps.
+        self.compact = compact
+
 
 def _literalize(obj):
     if hasattr(obj, 'tolist'):
@@ -1,5 +1,6 @@
 from collections import namedtuple
 import functools
+import hashlib
 import itertools
 import logging
 
@@ -9,10 +10,15 @@ import sklearn.preprocessing
 
 from . import categories
 from .exceptions import expected, typename
+from .matrix import LazyArray, sample_indices, SparseArray, StringArray
 
 
 Step = namedtuple('Step', 'func, args, kwargs')
 
+# The number of rows that `drop_duplicate_columns` compares first, before it
+# compares all of the rows of the columns that match.
+duplicate_sample_size = 1000
+
 
 def planner(f):
     @functools.wraps(f)
@@ -25,6 +31,8 @@ def planner(f):
             msg = f'Planning step "{f.__name__}" failed: {exc}'
             logging.getLogger('autom8').exception(msg)
             ctx.receiver.warn(msg)
+        # Keep track of the context's peak memory usage.
+        ctx.memory_usage()
     return wrapper
 
 
@@ -32,6 +40,9 @@ def preprocessor(f):
     @functools.wraps(f)
     def wrapper(ctx, *a, **k):
         f(ctx, *a, **k)
+        # If the matrix spills its columns, then spill any new columns.
+        if ctx.matrix.storage is not None:
+            ctx.matrix.spill()
         if ctx.is_recording:
             ctx.steps.append(Step(wrapper, a, k))
     return wrapper
@@ -62,6 +73,7 @@ def add_column_of_ones(ctx):
 @planner
 def binarize_fractions(ctx):
     indices = _original_numerical_indices(ctx)
+    indices = indices[:_columns_within_limit(ctx, len(indices))]
     if indices:
         _binarize_fractions(ctx, indices)
 
@@ -82,6 +94,7 @@ def _binarize_fractions(ctx, indices):
 @planner
 def binarize_signs(ctx):
     indices = _original_numerical_indices(ctx)
+    indices = indices[:_columns_within_limit(ctx, len(indices))]
     if indices:
         _binarize_signs(ctx, indices)
 
@@ -128,11 +141,14 @@ def divide_columns(ctx):
     denominators = _original_numerical_indices(ctx, lambda c: np.all(c.values != 0))
 
     if numerators and denominators:
-        _divide_columns(ctx, numerators, denominators)
+        count = len(numerators) * len(denominators)
+        max_columns = _columns_within_limit(ctx, count)
+        if max_columns > 0:
+            _divide_columns(ctx, numerators, denominators, max_columns)
 
 
 @preprocessor
-def _divide_columns(ctx, numerators, denominators):
+def _divide_columns(ctx, numerators, denominators, max_columns=None):
     """
     Divides pairs of numerical columns, as long as the divisor column
     does not contain any 0 values.
@@ -141,29 +157,60 @@ def _divide_columns(ctx, numerators, denominators):
     ys = ctx.matrix.select_columns(denominators)
     xs.coerce(float)
     ys.coerce(float)
-    for col_x, col_y in itertools.product(xs.columns, ys.columns):
-        x, y = col_x.values, col_y.values
-        if not np.array_equal(x, y):
-            # Use 0 if we see a denominator that equals 0.
-            ctx.matrix.append_column(
-                values=np.divide(x, y, out=np.zeros_like(x), where=y != 0),
-                formula=['divide', col_x, col_y],
-                role='numerical',
-            )
+    pairs = (
+        (col_x, col_y)
+        for col_x, col_y in itertools.product(xs.columns, ys.columns)
+        if not np.array_equal(col_x.values, col_y.values)
+    )
+    for col_x, col_y in itertools.islice(pairs, max_columns):
+        ctx.matrix.append_column(
+            values=LazyArray(_divide, col_x.values, col_y.values,
+                dtype=_float_dtype(ctx)),
+            formula=['divide', col_x, col_y],
+            role='numerical',
+        )
 
 
 @planner
 def drop_duplicate_columns(ctx):
+    # First group the columns by a sample of their rows, so that a lazy column
+    # only computes all of its values when it may be a duplicate. Then compare
+    # all of the rows of the columns in each group.
+    columns = ctx.matrix.columns
+    rows = sample_indices(len(ctx.matrix), duplicate_sample_size)
+    groups = {}
+    for index, col in enumerate(columns):
+        groups.setdefault(_column_signature(col, rows), []).append(index)
+
     duplicates = []
-    visited = set()
-    for index, col in enumerate(ctx.matrix.columns):
-        signature = col.values.tobytes()
-        if signature in visited:
-            duplicates.append(index)
-        else:
-            visited.add(signature)
+    for indices in groups.values():
+        if len(indices) < 2:
+            continue
+        visited = set()
+        for index in indices:
+            signature = _column_signature(columns[index])
+            if signature in visited:
+                duplicates.append(index)
+            else:
+                visited.add(signature)
     if duplicates:
-        _drop_duplicate_columns(ctx, duplicates)
+        _drop_duplicate_columns(ctx, sorted(duplicates))
+
+
+def _column_signature(col, rows=None):
+    # Returns a digest of the column's values, or of the values in the
+    # indicated rows. (A lazy column only computes the indicated rows.)
+    if rows is not None and col.is_lazy:
+        values = col._values.take(rows)
+    elif rows is not None:
+        values = col.select_rows(rows).values
+    else:
+        values = col.values
+
+    # Compare strings by their contents, instead of by their addresses.
+    if values.dtype == object:
+        return hashlib.sha256(repr(values.tolist()).encode()).digest()
+    return hashlib.sha256(np.ascontiguousarray(values)).digest()
 
 
 @preprocessor
@@ -182,9 +229,7 @@ def drop_weak_columns(ctx, feature_selector=None):
     if feature_selector is None and ctx.is_classification:
         feature_selector = fs.SelectFwe(fs.f_classif)
 
-    X, y = ctx.training_data()
-    X = X._float_array()
-
+    X, y = ctx._float_training_data()
     feature_selector.fit(X, y)
     weak_cols = np.where(np.invert(feature_selector.get_support()))[0]
 
@@ -236,19 +281,30 @@ def _encode_text(ctx, encoder, indices):
     found = ctx.matrix.select_columns(indices)
     ctx.matrix.drop_columns_by_index(indices)
 
-    # Combine textual columns into single column.
+    # Combine textual columns into single column. When every column is a text
+    # column, join the bytes of the strings, so that only the combined strings
+    # become Python objects. Otherwise, decode each column once, and join the
+    # strings themselves.
     found.coerce(str)
-    combined = [' '.join(text) for text in found.stack_columns()]
+    columns = found.columns
+    if all(col.is_text for col in columns):
+        combined = StringArray.join([col._values for col in columns],
+            ' ').tolist()
+    else:
+        combined = [' '.join(row)
+            for row in zip(*[col.values.tolist() for col in columns])]
 
     if ctx.is_recording:
-        result = encoder.fit_transform(combined).toarray()
+        result = encoder.fit_transform(combined).tocsc()
     else:
         # TODO: Append the appropriate number of 0-columns when this fails.
-        result = encoder.transform(combined).toarray()
+        result = encoder.transform(combined).tocsc()
+
+    result = result.astype(_float_dtype(ctx), copy=False)
 
     for i in range(result.shape[1]):
         ctx.matrix.append_column(
-            values=result[:, i],
+            values=SparseArray.from_csc(result, i),
             formula=['encode-text'] + found.columns,
             role='encoded',
         )
@@ -259,6 +315,7 @@ def logarithm_columns(ctx):
     # Find the indices of the original numerical columns that only contain
     # positive values.
     indices = _original_numerical_indices(ctx, lambda c: np.all(c.values > 0))
+    indices = indices[:_columns_within_limit(ctx, len(indices))]
     if indices:
         _logarithm_columns(ctx, indices)
 
@@ -272,9 +329,8 @@ def _logarithm_columns(ctx, indices):
     found = ctx.matrix.select_columns(indices)
     found.coerce(float)
     for col in found.columns:
-        v = col.values
         ctx.matrix.append_column(
-            values=np.log(v, out=np.zeros_like(v), where=v > 0),
+            values=LazyArray(_logarithm, col.values, dtype=_float_dtype(ctx)),
             formula=['log', col],
             role='numerical',
         )
@@ -283,18 +339,24 @@ def _logarithm_columns(ctx, indices):
 @planner
 def multiply_columns(ctx):
     indices = _original_numerical_indices(ctx)
-    if indices:
-        _multiply_columns(ctx, indices)
+    count = len(indices) * (len(indices) - 1) // 2
+    if count == 0:
+        return
+    max_columns = _columns_within_limit(ctx, count)
+    if max_columns > 0:
+        _multiply_columns(ctx, indices, max_columns)
 
 
 @preprocessor
-def _multiply_columns(ctx, indices):
+def _multiply_columns(ctx, indices, max_columns=None):
     """Multiplies pairs of numerical columns."""
     found = ctx.matrix.select_columns(indices)
     found.coerce(float)
-    for x, y in itertools.combinations(found.columns, 2):
+    pairs = itertools.combinations(found.columns, 2)
+    for x, y in itertools.islice(pairs, max_columns):
         ctx.matrix.append_column(
-            values=x.values * y.values,
+            values=LazyArray(np.multiply, x.values, y.values,
+                dtype=_float_dtype(ctx)),
             formula=['multiply', x, y],
             role='numerical',
         )
@@ -327,6 +389,7 @@ def _scale_columns(ctx, scaler, indices):
         except Exception:
             result = np.zeros_like(array)
 
+    result = result.astype(_float_dtype(ctx), copy=False)
     for i in range(result.shape[1]):
         ctx.matrix.append_column(
             values=result[:, i],
@@ -338,6 +401,7 @@ def _scale_columns(ctx, scaler, indices):
 @planner
 def square_columns(ctx):
     indices = _original_numerical_indices(ctx)
+    indices = indices[:_columns_within_limit(ctx, len(indices))]
     if indices:
         _square_columns(ctx, indices)
 
@@ -349,7 +413,8 @@ def _square_columns(ctx, indices):
     found.coerce(float)
     for col in found.columns:
         ctx.matrix.append_column(
-            values=col.values * col.values,
+            values=LazyArray(np.multiply, col.values, col.values,
+                dtype=_float_dtype(ctx)),
             formula=['square', col],
             role='numerical',
         )
@@ -360,6 +425,7 @@ def sqrt_columns(ctx):
     # Find the indices of the original numerical columns that only contain
     # values greater than or equal to zero.
     indices = _original_numerical_indices(ctx, lambda c: np.all(c.values >= 0))
+    indices = indices[:_columns_within_limit(ctx, len(indices))]
     if indices:
         _sqrt_columns(ctx, indices)
 
@@ -373,14 +439,53 @@ def _sqrt_columns(ctx, indices):
     found = ctx.matrix.select_columns(indices)
     found.coerce(float)
     for col in found.columns:
-        v = col.values
         ctx.matrix.append_column(
-            values=np.sqrt(v, out=np.zeros_like(v), where=v >= 0),
+            values=LazyArray(_sqrt, col.values, dtype=_float_dtype(ctx)),
             formula=['square-root', col],
             role='numerical',
         )
 
 
+def _columns_within_limit(ctx, count):
+    # Returns the number of new columns that fit within the context's memory
+    # limit, and warns the receiver when some of them don't fit.
+    allowed = ctx.columns_within_limit(count)
+    if allowed < count:
+        ctx.receiver.warn(
+            f'Skipping {count - allowed} of {count} new columns, to stay'
+            f' within the memory limit of {ctx.memory_limit} bytes.'
+        )
+    return allowed
+
+
+def _float_dtype(ctx):
+    # In compact mode, store engineered columns as 32-bit floats.
+    return np.float32 if ctx.compact else np.float64
+
+
+# The functions for derived columns. Each one accepts an `out` array, so that
+# `LazyArray` can compute the values directly into a matrix's block.
+
+def _divide(x, y, out=None):
+    # Use 0 if we see a denominator that equals 0.
+    return np.divide(x, y, out=_zeros(out, x), where=y != 0)
+
+
+def _logarithm(values, out=None):
+    return np.log(values, out=_zeros(out, values), where=values > 0)
+
+
+def _sqrt(values, out=None):
+    return np.sqrt(values, out=_zeros(out, values), where=values >= 0)
+
+
+def _zeros(out, like):
+    if out is None:
+        return np.zeros_like(like)
+    out.fill(0)
+    return out
+
+
 def _original_numerical_indices(ctx, where=None):
     if where is None:
         where = lambda col: True
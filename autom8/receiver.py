@@ -8,6 +8,10 @@ class Receiver:
     def receive_candidate(self, candidate):
         pass
 
+    def receive_memory_usage(self, nbytes):
+        """Receives the context's peak memory usage, each time it grows."""
+        pass
+
     def warn(self, message):
         exceptions.warn(message)
 
@@ -17,6 +21,7 @@ class Accumulator(Receiver):
         self.test_indices = None
         self.warnings = []
         self.candidates = []
+        self.peak_memory_usage = 0
 
     def receive_candidate(self, candidate):
         self.candidates.append(candidate)
@@ -24,5 +29,8 @@ class Accumulator(Receiver):
     def receive_context(self, context):
         self.test_indices = context.test_indices
 
+    def receive_memory_usage(self, nbytes):
+        self.peak_memory_usage = nbytes
+
     def warn(self, message):
         self.warnings.append(message)
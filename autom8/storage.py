@@ -0,0 +1,95 @@
+"""Memory-mapped storage for matrices that don't fit comfortably in memory."""
+
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+from .exceptions import expected, typename
+
+
+# The number of rows that `SpillStorage.take` copies at once.
+default_chunk_size = 64 * 1024
+
+
+class SpillStorage:
+    """Allocates arrays in memory-mapped temporary files.
+
+    Each array gets its own anonymous temporary file, which the operating
+    system deletes as soon as the array is garbage collected. So the operating
+    system can page the arrays out to disk, instead of keeping them in memory.
+
+    Only arrays of booleans and numbers can be spilled. Arrays of objects
+    (like columns of strings) stay in memory.
+
+    Parameters:
+        directory (str or None): The directory for the temporary files.
+            Defaults to None, which means Python's default temporary
+            directory.
+    """
+
+    def __init__(self, directory=None):
+        if directory is not None and not isinstance(directory, (str, os.PathLike)):
+            raise expected('directory to be a str or None', typename(directory))
+
+        self.directory = None if directory is None else os.fspath(directory)
+
+    def empty(self, shape, dtype=float, order='C'):
+        """Returns a new, memory-mapped array, like `numpy.empty`."""
+
+        dtype = np.dtype(dtype)
+        if np.prod(shape) * dtype.itemsize == 0:
+            return np.empty(shape, dtype=dtype, order=order)
+
+        # The memmap keeps its own handle on the file, so it's fine to close
+        # the file right away.
+        with tempfile.TemporaryFile(prefix='autom8-', dir=self.directory) as f:
+            return np.memmap(f, dtype=dtype, mode='w+', shape=shape, order=order)
+
+    def spill(self, values):
+        """Returns a memory-mapped copy of the array, if it can be spilled.
+
+        Otherwise, returns the array itself.
+        """
+
+        if not can_spill(values) or is_spilled(values):
+            return values
+
+        result = self.empty(values.shape, values.dtype)
+        result[...] = values
+        return result
+
+    def take(self, array, rows, chunk_size=None):
+        """Returns the indicated rows of a 2D array, in a memory-mapped array.
+
+        This function copies the rows in chunks, so that it never needs to
+        hold all of the rows in memory.
+        """
+
+        if chunk_size is None:
+            chunk_size = default_chunk_size
+
+        result = self.empty((len(rows), array.shape[1]), array.dtype, order='F')
+        for start in range(0, len(rows), chunk_size):
+            stop = start + chunk_size
+            result[start:stop] = array[rows[start:stop]]
+        return result
+
+
+def can_spill(values):
+    return isinstance(values, np.ndarray) and values.dtype.kind in 'biuf'
+
+
+def is_spilled(values):
+    """Indicates if the array is (a view of) a memory-mapped array.
+
+    >>> is_spilled(SpillStorage().empty(3))
+    True
+    >>> is_spilled(np.zeros(3))
+    False
+    """
+    # Follow the chain of views back to the array that owns the memory.
+    while isinstance(values, np.ndarray):
+        values = values.base
+    return isinstance(values, mmap.mmap)
@@ -24,8 +24,8 @@ setup(
     python_requires='>=3.6.0',
     install_requires=[
         'chardet>=3.0.4',
-        'numpy>=1.14.4',
-        'pandas>=0.23.4',
+        'numpy>=1.17.0',
+        'pandas>=1.0.0',
         'scikit-learn>=0.19.1',
         'scipy>=1.1.0',
     ],
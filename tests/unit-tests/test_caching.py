@@ -0,0 +1,240 @@
+import logging
+import os
+
+import numpy as np
+import pytest
+
+import autom8
+import autom8.caching
+import autom8.cleaning
+from autom8.matrix import DictionaryArray, SparseArray, StringArray
+from autom8.pipeline import PlaybackContext
+from autom8.preprocessors import playback
+from autom8.storage import is_spilled
+
+
+def setup_module(*a, **k):
+    logging.disable(logging.CRITICAL)
+
+
+def teardown_module(*a, **k):
+    logging.disable(logging.NOTSET)
+
+
+def test_storing_and_loading_entries(tmp_path):
+    cache = autom8.DatasetCache(str(tmp_path))
+    matrix = autom8.create_matrix([
+        ['A', 'B', 'C', 'D'],
+        [1, 2.5, 'x', True],
+        [3, None, 'y', False],
+    ])
+
+    assert cache.load('foo') is None
+    cache.store('foo', matrix, warnings=['hello'])
+
+    entry = cache.load('foo')
+    assert entry.warnings == ['hello']
+    assert entry.steps == []
+    assert entry.matrix.column_names == matrix.column_names
+    assert repr(entry.matrix.tolist()) == repr(matrix.tolist())
+    assert [c.dtype for c in entry.matrix.columns] == [c.dtype for c in matrix.columns]
+
+    # Changing the loaded values must not change the cache entry.
+    entry.matrix.columns[0].values[0] = 100
+    assert cache.load('foo').matrix.columns[0].values[0] == 1
+
+
+def test_encoded_columns_stay_encoded(tmp_path):
+    cache = autom8.DatasetCache(str(tmp_path))
+    matrix = autom8.create_matrix({
+        'a': ['x', 'y'] * 5,
+        'b': [f's{i}' for i in range(10)],
+        'c': [1.5, None] * 5,
+    })
+    matrix.append_column(SparseArray.from_dense(np.arange(10.0) % 3 == 0),
+        formula='d', role='encoded')
+
+    cache.store('foo', matrix)
+    loaded = cache.load('foo').matrix
+
+    kinds = [type(col._values) for col in loaded.columns]
+    assert kinds == [DictionaryArray, StringArray, np.ndarray, SparseArray]
+    assert kinds == [type(col._values) for col in matrix.columns]
+    assert loaded.columns[2].mask.tolist() == [True, False] * 5
+    assert repr(loaded.tolist()) == repr(matrix.tolist())
+
+    # The numeric parts are memory-mapped.
+    assert is_spilled(loaded.columns[0]._values.codes)
+    assert is_spilled(loaded.columns[1]._values.data)
+    assert is_spilled(loaded.columns[2].mask)
+
+
+def test_cleaning_with_cache(tmp_path):
+    path = tmp_path / 'dataset.csv'
+    path.write_text(
+        'a,b,c,d,f,e\n'
+        '1,$2.00,,x,1,5\n'
+        '3,4%,hi,,,6\n'
+        '5,"6,000",7,z,3,7\n'
+        '8,9,10,w,4,8\n'
+    )
+
+    cache_dir = str(tmp_path / 'cache')
+    results = []
+    for _ in range(2):
+        acc = autom8.Accumulator()
+        ctx = autom8.create_context(path, cache=cache_dir, receiver=acc)
+        autom8.clean_dataset(ctx)
+        results.append((ctx, acc.warnings))
+
+    # The parsed dataset, the cleaned dataset, and the schema's plans.
+    (ctx1, warnings1), (ctx2, warnings2) = results
+    assert len(os.listdir(cache_dir)) == 3
+    assert warnings1 == warnings2
+    assert len(warnings1) > 0
+    assert ctx1.matrix.column_names == ctx2.matrix.column_names
+    assert repr(ctx1.matrix.tolist()) == repr(ctx2.matrix.tolist())
+    assert [s.func for s in ctx1.steps] == [s.func for s in ctx2.steps]
+
+    # The cached steps should still work during playback.
+    matrix = autom8.create_matrix([['a', 'b', 'c', 'd'], [9, '$1', 'yo', 'x']])
+    out1 = PlaybackContext(matrix.copy(), autom8.Accumulator())
+    out2 = PlaybackContext(matrix.copy(), autom8.Accumulator())
+    playback(ctx1.steps, out1)
+    playback(ctx2.steps, out2)
+    assert out1.matrix.tolist() == out2.matrix.tolist()
+
+    # A different target column means a different cleaned dataset.
+    ctx3 = autom8.create_context(path, cache=cache_dir, target_column='a',
+        receiver=autom8.Accumulator())
+    autom8.clean_dataset(ctx3)
+    assert len(os.listdir(cache_dir)) == 5
+    assert 'e' in ctx3.matrix.column_names
+
+
+def test_caching_plans_by_schema(tmp_path, monkeypatch):
+    def dataset(num_rows, odd_value=None):
+        rows = [['A', 'B', 'C', 'D', 'E']] + [[
+            f'${i}',
+            None if i % 4 == 0 else i * 1.5,
+            [' ', 'foo', i][i % 3],
+            f's{i % 3}',
+            i,
+        ] for i in range(num_rows)]
+        if odd_value is not None:
+            rows[-1][0] = odd_value
+        return rows
+
+    def clean(rows, cache):
+        acc = autom8.Accumulator()
+        ctx = autom8.create_context(rows, target_column='E', cache=cache,
+            receiver=acc)
+        autom8.clean_dataset(ctx)
+        autom8.infer_roles(ctx)
+        return (
+            ctx.matrix.formulas,
+            repr(ctx.matrix.tolist()),
+            [col.role for col in ctx.matrix.columns],
+            [(step.func, step.args) for step in ctx.steps],
+            acc.warnings,
+        )
+
+    cache = autom8.DatasetCache(str(tmp_path))
+    assert clean(dataset(40), cache) == clean(dataset(40), None)
+
+    # More rows of the same kinds of values means the same schema, so autom8
+    # plays the cached plans, instead of deciding how to clean each column.
+    expected = clean(dataset(60), None)
+    with monkeypatch.context() as m:
+        m.setattr(autom8.cleaning, '_clean_column', None)
+        assert clean(dataset(60), cache) == expected
+    assert 'Column \'B\' has 15 missing values.' in expected[-1]
+
+    # When a cached plan doesn't work, autom8 cleans the column from scratch.
+    expected = clean(dataset(60, odd_value='x'), None)
+    assert clean(dataset(60, odd_value='x'), cache) == expected
+    assert expected[0][0] == 'A' and expected[2][0] == 'textual'
+
+
+def test_cached_plans_match_fresh_plans(tmp_path):
+    def clean(values, cache):
+        acc = autom8.Accumulator()
+        rows = [['X', 'Y']] + [[i, 'y'] for i in values]
+        ctx = autom8.create_context(rows, target_column='Y', cache=cache,
+            receiver=acc)
+        autom8.clean_dataset(ctx)
+        return ctx.matrix.formulas, repr(ctx.matrix.tolist()), acc.warnings
+
+    # Each pair of columns has the same types of values, but the first one
+    # would lead the second one astray.
+    pairs = [
+        (['1', '2', 'x', None], ['1', '2', '3', None]),
+        (['1', '2.5', '3', '4'], ['1', '2', '3', '4']),
+        (['a', ' ', '', 'b'], ['c', '', 'd', 'e']),
+    ]
+    for index, (first, second) in enumerate(pairs):
+        cache = autom8.DatasetCache(str(tmp_path / str(index)))
+        clean(first, cache)
+        assert clean(second, cache) == clean(second, None)
+
+
+def test_evicting_least_recently_used_entries(tmp_path):
+    matrix = autom8.create_matrix([[i, i * 2] for i in range(300)])
+    autom8.DatasetCache(str(tmp_path / 'x')).store('x', matrix)
+    entry_size = autom8.DatasetCache(str(tmp_path / 'x')).size
+
+    cache = autom8.DatasetCache(str(tmp_path / 'y'), max_size=3 * entry_size)
+    tmp_path = tmp_path / 'y'
+
+    for key in ['a', 'b', 'c']:
+        cache.store(key, matrix)
+        os.utime(os.path.join(str(tmp_path), key, 'meta.pkl'),
+            (0, {'a': 1, 'b': 2, 'c': 3}[key]))
+
+    # Using "a" makes "b" the least recently used entry.
+    cache.load('a')
+    cache.store('d', matrix)
+
+    assert sorted(os.listdir(str(tmp_path))) == ['a', 'c', 'd']
+    assert cache.size == 3 * entry_size
+
+
+def test_invalid_entries_are_removed(tmp_path):
+    cache = autom8.DatasetCache(str(tmp_path))
+    cache.store('foo', autom8.create_matrix([[1, 2], [3, 4]]))
+    os.remove(os.path.join(str(tmp_path), 'foo', '0-values.npy'))
+
+    assert cache.load('foo') is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_fingerprints():
+    fingerprint = autom8.caching.fingerprint
+    rows = [[1, 2], [3, 4]]
+    assert fingerprint(rows) == fingerprint([[1, 2], [3, 4]])
+    assert fingerprint(rows) != fingerprint([[1, 2], [3, 5]])
+    assert fingerprint(rows) != fingerprint(rows, ['A', 'B'])
+    assert fingerprint(iter(rows)) is None
+
+    m1 = autom8.create_matrix(rows)
+    m2 = autom8.create_matrix(np.array(rows))
+    assert fingerprint(m1) == fingerprint(m2)
+
+
+def test_fingerprints_include_the_version(monkeypatch):
+    fingerprint = autom8.caching.fingerprint
+    derive_key = autom8.caching.derive_key
+    before = fingerprint([[1, 2]]), derive_key('foo', 'bar')
+
+    monkeypatch.setattr(autom8.caching, '__version__', '999.0.0')
+    after = fingerprint([[1, 2]]), derive_key('foo', 'bar')
+    assert before[0] != after[0]
+    assert before[1] != after[1]
+
+
+def test_invalid_caches():
+    with pytest.raises(autom8.Autom8Exception):
+        autom8.create_context([[1, 2], [3, 4]], cache=1)
+
+    with pytest.raises(autom8.Autom8Exception):
+        autom8.DatasetCache('foo', max_size=0)
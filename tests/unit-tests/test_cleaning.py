@@ -1,7 +1,12 @@
 import logging
 
+import numpy as np
+import pytest
+
 import autom8
 from autom8.pipeline import PlaybackContext
+from autom8.cleaning import _clean_values, _plan_column, _take_census
+from autom8.matrix import Column, DictionaryArray, Matrix
 from autom8.preprocessors import playback
 
 
@@ -200,7 +205,7 @@ def test_column_of_ints_and_floats():
 
     autom8.clean_dataset(ctx)
 
-    assert len(ctx.steps) == 4
+    assert len(ctx.steps) == 2
     assert len(acc.warnings) == 2
     assert ctx.matrix.tolist() == [
         [1.0, True, 3.3, True],
@@ -222,6 +227,45 @@ def test_column_of_ints_and_floats():
     assert out.matrix.columns[2].dtype == float
 
 
+def test_masked_columns_of_numbers():
+    dataset = [
+        ['A', 'B', 'C'],
+        [1, True, 'x'],
+        [None, None, None],
+        [3, False, 'y'],
+    ]
+
+    acc = autom8.Accumulator()
+    matrix = autom8.create_matrix(_add_labels(dataset), receiver=acc)
+    assert matrix.columns[0]._values.dtype == int
+    assert matrix.columns[0].mask.tolist() == [True, False, True]
+    assert matrix.columns[0].values.tolist() == [1, None, 3]
+
+    ctx = autom8.create_context(matrix, receiver=acc)
+    autom8.clean_dataset(ctx)
+    assert len(acc.warnings) == 2
+    assert ctx.matrix.tolist() == [
+        ['x', 1, True, True, True],
+        ['', 0, False, False, False],
+        ['y', 3, True, False, True],
+    ]
+    assert [c.dtype for c in ctx.matrix.columns[1:]] == [int, bool, bool, bool]
+
+    # Playback works on masked columns and on plain columns of objects.
+    vectors = [['A', 'B', 'C'], [None, True, None], [5, None, 'z']]
+    for masked in [True, False]:
+        matrix = autom8.create_matrix(vectors, receiver=acc)
+        if not masked:
+            for col in matrix.columns:
+                col.values = col.values.copy()
+        out = PlaybackContext(matrix, receiver=acc)
+        playback(ctx.steps, out)
+        assert out.matrix.tolist() == [
+            ['', 0, False, True, True],
+            ['z', 5, True, False, False],
+        ]
+
+
 def test_columns_with_some_empty_strings():
     dataset = [
         ['A', 'B', 'C'],
@@ -238,7 +282,7 @@ def test_columns_with_some_empty_strings():
 
     autom8.clean_dataset(ctx)
 
-    assert len(ctx.steps) == 6
+    assert len(ctx.steps) == 3
     assert len(acc.warnings) == 3
     assert ctx.matrix.tolist() == [
         [True, True, 1.1, True, 20, True],
@@ -318,7 +362,7 @@ def test_mixed_up_columns_with_strings_and_numbers():
 
     autom8.clean_dataset(ctx)
 
-    assert len(ctx.steps) == 6
+    assert len(ctx.steps) == 2
     assert len(acc.warnings) == 0
     assert ctx.matrix.tolist() == [
         [1.0, '', 0.0, 'foo'],
@@ -351,3 +395,100 @@ def test_mixed_up_columns_with_strings_and_numbers():
 
 def _add_labels(dataset):
     return [i + ['<label>'] for i in dataset]
+
+
+def test_census_of_dictionary_columns():
+    strings = ['1', ' ', '', '2.5', None, '1', '', None, ' ', '1'] * 3
+    values = np.array(strings + [4, 5.5], dtype=object)
+    plain = Column(values, 'A', None, True)
+
+    # Build the dictionary column by hand, since create_matrix only encodes
+    # columns of strings.
+    codes = np.array([0, 1, 2, 3, 4, 0, 2, 4, 1, 0] * 3 + [5, 6], dtype=np.uint8)
+    categories = np.array(['1', ' ', '', '2.5', None, 4, 5.5], dtype=object)
+    encoded = Column(DictionaryArray(codes, categories), 'A', None, True)
+    assert encoded.values.tolist() == values.tolist()
+
+    census = _take_census(plain)
+    assert census == _take_census(encoded)
+    assert census.num_strings == 24
+    assert (census.num_blank, census.num_empty, census.num_none) == (6, 6, 6)
+    assert not census.numeric_strings
+
+
+def test_cleaning_columns_in_parallel():
+    dataset = [['A', 'B', 'C', 'D', 'E', 'F']] + [
+        [i, f'${i}', [None, 'x', 2][i % 3], ' ' if i % 4 else 1.5, str(i) * 3,
+            None if i % 5 else i]
+        for i in range(40)
+    ]
+
+    results = []
+    for processes in [1, 3]:
+        acc = autom8.Accumulator()
+        ctx = autom8.create_context(_add_labels(dataset), processes=processes,
+            receiver=acc)
+        autom8.clean_dataset(ctx)
+        results.append((ctx, acc.warnings))
+
+    (ctx1, warnings1), (ctx2, warnings2) = results
+    assert len(warnings1) > 0
+    assert warnings1 == warnings2
+    assert ctx1.matrix.formulas == ctx2.matrix.formulas
+    assert ctx1.matrix.tolist() == ctx2.matrix.tolist()
+    assert [(s.func, s.args) for s in ctx1.steps] == [
+        (s.func, s.args) for s in ctx2.steps]
+
+    # The recorded steps still play back on new data.
+    matrix = autom8.create_matrix([dataset[0], dataset[7], dataset[30]])
+    out = PlaybackContext(matrix, receiver=autom8.Accumulator())
+    playback(ctx2.steps, out)
+    assert out.matrix.formulas == ctx2.matrix.formulas
+
+    with pytest.raises(autom8.Autom8Exception):
+        autom8.create_context(_add_labels(dataset), processes=0)
+
+
+def test_fused_cleaning_steps():
+    vectors = [
+        ['A', 'B', 'C', 'D', 'E'],
+        [1, '', ' $2 ', None, 'x'],
+        [2.5, 3, '4%', 1, ' '],
+        [None, 4.5, '1,000', 2.5, 'x'],
+        [' ', 5, '', None, 3],
+        [4, None, 7, 3, 'y'],
+    ]
+    matrix = autom8.create_matrix(vectors)
+
+    for col in matrix.columns:
+        plan = _plan_column(col)
+        assert len(plan.steps) > 1
+        assert plan.steps[0].func is not _clean_values
+
+        separate = PlaybackContext(Matrix([col.copy()]), autom8.Accumulator())
+        fused = PlaybackContext(Matrix([col.copy()]), autom8.Accumulator())
+
+        playback(plan.steps, separate)
+        ops = [(step.func, step.args) for step in plan.steps]
+        _clean_values(fused, 0, ops)
+
+        assert fused.matrix.formulas == separate.matrix.formulas
+        assert repr(fused.matrix.tolist()) == repr(separate.matrix.tolist())
+        assert ([c.dtype for c in fused.matrix.columns]
+            == [c.dtype for c in separate.matrix.columns])
+
+
+def test_column_of_bools_ints_floats_and_none():
+    dataset = [['A'], ['4.5'], [True], [None], [1], ['3'], [-1.0]]
+    acc = autom8.Accumulator()
+    matrix = autom8.create_matrix(_add_labels(dataset), receiver=acc)
+    ctx = autom8.create_context(matrix, receiver=acc)
+
+    autom8.clean_dataset(ctx)
+
+    assert ctx.matrix.formulas == ['A', ['is-defined', 'A']]
+    assert ctx.matrix.tolist() == [
+        [4.5, True], [1.0, True], [0.0, False], [1.0, True], [3.0, True],
+        [-1.0, True],
+    ]
+    assert acc.warnings == ["Column 'A' has 1 missing value."]
@@ -0,0 +1,82 @@
+import numpy as np
+
+from autom8.coercion import (
+    _coerce_string_to_number,
+    _string_to_number_regex,
+    can_coerce_strings,
+    coerce_strings,
+    coerce_to_numbers,
+)
+from autom8.formats import parse_number
+from autom8.matrix import Column
+
+
+examples = [
+    '1', ' 2 ', '+3', '-4', '5.5', '.6', '7.', '1,234', '5_678', '$9',
+    '10%', '$-11.%', '1e5', 'nan', 'inf', '0xff', '', '   ', 'foo', '1.2.3',
+    '1+2', '$,%', '99999999999999999999', ' 12 ', '\t-.5\n',
+]
+
+
+def test_coerce_strings_matches_scalar_rules():
+    for i in examples:
+        for j in examples:
+            strings = [i, j, i]
+            values, invalid = coerce_strings(strings)
+            for s, v, bad in zip(strings, values, invalid):
+                expected = _coerce_string_to_number(s)
+                if isinstance(expected, str):
+                    assert bad and v is None
+                else:
+                    assert not bad
+                    _assert_same_number(v, expected)
+
+
+def test_strict_coerce_strings_matches_parse_number():
+    for i in examples:
+        for j in examples:
+            strings = [j, i]
+            values, invalid = coerce_strings(strings, strict=True)
+            for s, v, bad in zip(strings, values, invalid):
+                try:
+                    expected = parse_number(s)
+                except Exception:
+                    assert bad and v is None
+                else:
+                    assert not bad
+                    _assert_same_number(v, expected)
+
+
+def test_can_coerce_strings():
+    for i in examples:
+        for j in examples:
+            strings = [i, j]
+            expected = all(_string_to_number_regex.match(s) for s in strings)
+            assert can_coerce_strings(strings) == expected
+
+    assert can_coerce_strings(['1', '$2', '3%', '4,000'])
+    assert not can_coerce_strings(['1', '$2', '3%', '4,000', '1e5'])
+    assert not can_coerce_strings(['1\n2'])
+
+
+def test_coerce_to_numbers_matches_column_coerce():
+    values = np.array(
+        [1, 2.7, True, None, '3', ' 4 ', '5.5', '0x10', 'x', (), '1,000'],
+        dtype=object,
+    )
+    floats = coerce_to_numbers(values, float, 0.0)
+    ints = coerce_to_numbers(values, int, 0)
+    assert floats.tolist() == [1.0, 2.7, 1.0, 0.0, 3.0, 4.0, 5.5, 16.0, 0.0, 0.0, 1000.0]
+    assert ints.tolist() == [1, 2, 1, 0, 3, 4, 5, 16, 0, 0, 1000]
+
+    col = Column(values, formula='A', role=None, is_original=True)
+    col.coerce(float)
+    assert col.values.tolist() == floats.tolist()
+
+
+def _assert_same_number(received, expected):
+    assert type(received) == type(expected)
+    if expected != expected:
+        assert received != received
+    else:
+        assert received == expected
@@ -1,8 +1,12 @@
+import pickle
+
 import pytest
 import numpy as np
+import sklearn.linear_model
 
 import autom8
 from autom8.pipeline import PlaybackContext
+from autom8.storage import is_spilled
 
 
 def test_is_recording_property():
@@ -99,6 +103,12 @@ def test_training_and_testing_data():
         [3, 7, False, 11],
     ]
 
+    # Replacing the labels replaces them in each split, too.
+    ctx.labels = ctx.labels._replace(encoded=np.array([5, 6, 7, 8]))
+    assert ctx.testing_data()[1].tolist() == [6, 8]
+    assert ctx.training_data()[1].tolist() == [5, 7]
+    assert ctx._float_training_data()[1].tolist() == [5, 7]
+
 
 def test_sandbox():
     ctx = autom8.create_context(
@@ -142,3 +152,212 @@ def test_sandbox():
         [3, 7, False, 11, 1],
         [4, 8, True, 12, 1],
     ]
+
+
+def test_float_training_and_testing_data():
+    ctx = autom8.create_context([
+        [1, 5, True, 10],
+        [2, 6, False, 20],
+        [3, 7, False, 30],
+        [4, 8, True, 40],
+    ])
+    ctx.test_indices = [0, 2]
+
+    X1, y1 = ctx._float_training_data()
+    X2, y2 = ctx._float_testing_data()
+    assert X1.tolist() == [[2, 6, 0], [4, 8, 1]]
+    assert X2.tolist() == [[1, 5, 1], [3, 7, 0]]
+    assert y1.tolist() == [20, 40]
+    assert y2.tolist() == [10, 30]
+
+    # The context's matrix keeps its original types.
+    assert ctx.matrix.tolist()[0] == [1, 5, True]
+
+    # The arrays are shared until the matrix changes.
+    assert ctx._float_training_data()[0] is X1
+    autom8.add_column_of_ones(ctx)
+    X3, _ = ctx._float_training_data()
+    assert X3 is not X1
+    assert X3.tolist() == [[2, 6, 0, 1], [4, 8, 1, 1]]
+
+    # After a sandbox, the arrays match the restored matrix.
+    with ctx.sandbox():
+        autom8.add_column_of_ones(ctx)
+        assert ctx._float_training_data()[0].shape == (2, 5)
+    assert ctx._float_training_data()[0].shape == (2, 4)
+
+    # Assigning new test indices changes the split.
+    ctx.test_indices = [3]
+    X4, y4 = ctx._float_testing_data()
+    assert X4.tolist() == [[4, 8, 1, 1]]
+    assert y4.tolist() == [40]
+
+
+def test_compact_mode():
+    dataset = [[i, i % 3 + 1.5, i % 2 == 0, i / 7 + (i % 3) / 3]
+        for i in range(20)]
+    ctx = autom8.create_context(dataset, compact=True)
+    ctx.receiver = acc = autom8.Accumulator()
+    autom8.multiply_columns(ctx)
+    autom8.scale_columns(ctx)
+
+    assert all(col.dtype == np.float32 for col in ctx.matrix.columns
+        if col.role == 'numerical')
+
+    X1, _ = ctx._float_training_data()
+    X2, _ = ctx._float_testing_data()
+    assert X1.dtype == np.float32
+    assert X2.dtype == np.float32
+    assert ctx._float_split().sparse_train.dtype == np.float32
+
+    autom8.drop_weak_columns(ctx)
+    ctx.fit(sklearn.linear_model.LinearRegression())
+    assert len(acc.candidates) == 1
+    assert acc.warnings == []
+
+    # Pipelines make predictions with the same 32-bit features as the ones
+    # that the estimator saw during training.
+    pipeline = acc.candidates[0].pipeline
+    assert pipeline.compact
+    X, _ = ctx._float_testing_data()
+    report = pipeline.run([dataset[i][:3] for i in ctx.test_indices])
+    assert report.predictions == pipeline.estimator.predict(X).tolist()
+
+    # Pipelines that were pickled before compact mode still run.
+    del pipeline.compact
+    old = pickle.loads(pickle.dumps(pipeline))
+    assert old.compact is False
+    assert len(old.run([row[:3] for row in dataset]).predictions) == 20
+
+    with pytest.raises(autom8.Autom8Exception) as excinfo:
+        autom8.create_context(dataset, compact='yes')
+    excinfo.match('Expected.*compact')
+
+
+def test_memory_limit():
+    dataset = [[i, i + 1.5, i * 3, i * 2.0] for i in range(100)]
+
+    # Each original column uses 8 bytes per row.
+    ctx = autom8.create_context(dataset, receiver=autom8.Accumulator())
+    assert ctx.matrix.nbytes == 3 * 8 * 100
+    assert ctx.memory_usage() == 3 * 8 * 100
+
+    # Each new column costs about 3 * 8 bytes per row. So leave room for two.
+    acc = autom8.Accumulator()
+    ctx = autom8.create_context(dataset, memory_limit=(3 + 2 * 3) * 8 * 100,
+        column_roles=['numerical'] * 4, receiver=acc)
+    autom8.multiply_columns(ctx)
+    assert ctx.matrix.formulas == ['A', 'B', 'C',
+        ['multiply', 'A', 'B'], ['multiply', 'A', 'C']]
+    assert acc.warnings == [
+        'Skipping 1 of 3 new columns, to stay within the memory limit of'
+        ' 7200 bytes.'
+    ]
+
+    # The estimate is conservative, since the training data doesn't exist
+    # yet. So there's room for one more column.
+    autom8.square_columns(ctx)
+    assert ctx.matrix.formulas[5:] == [['square', 'A']]
+    assert acc.warnings[1].startswith('Skipping 2 of 3 new columns')
+
+    # The receiver gets the peak memory usage.
+    ctx._float_training_data()
+    assert acc.peak_memory_usage == ctx.peak_memory_usage
+    assert ctx.peak_memory_usage > 5 * 8 * 100
+
+    # The steps play back the same columns.
+    out = PlaybackContext(autom8.create_matrix(
+        [row[:3] for row in dataset], column_roles=['numerical'] * 3),
+        autom8.Accumulator())
+    autom8.preprocessors.playback(ctx.steps, out)
+    assert out.matrix.formulas == ctx.matrix.formulas
+
+    # When the matrix spills its columns, they don't count. But each new
+    # column still costs about 8 bytes per row, until the matrix spills it.
+    acc = autom8.Accumulator()
+    ctx = autom8.create_context(dataset, memory_limit=2 * 8 * 100, spill=True,
+        column_roles=['numerical'] * 4, receiver=acc)
+    assert ctx.memory_usage() == 0
+    autom8.multiply_columns(ctx)
+    assert len(ctx.matrix.columns) == 5
+    assert acc.warnings[0].startswith('Skipping 1 of 3 new columns')
+
+    for limit in [0, 1.5, '1GB', True]:
+        with pytest.raises(autom8.Autom8Exception) as excinfo:
+            autom8.create_context(dataset, memory_limit=limit)
+        excinfo.match('Expected.*memory_limit')
+
+
+def test_spilling_columns(tmp_path):
+    dataset = [[i, i % 7 + 0.5, f's{i % 3}', i * 2.0] for i in range(50)]
+    acc = autom8.Accumulator()
+    ctx = autom8.create_context(dataset, spill=str(tmp_path), receiver=acc)
+
+    cols = ctx.matrix.columns
+    assert [is_spilled(col.values) for col in cols] == [True, True, False]
+    assert ctx.matrix.nbytes == cols[2].nbytes
+
+    # The files are anonymous, so they never show up in the directory.
+    assert list(tmp_path.iterdir()) == []
+
+    autom8.clean_dataset(ctx)
+    autom8.infer_roles(ctx)
+    autom8.multiply_columns(ctx)
+    autom8.encode_categories(ctx, method='ordinal')
+    autom8.scale_columns(ctx)
+    assert all(is_spilled(col.values) for col in ctx.matrix.columns)
+
+    rows = ctx.matrix.select_rows([1, 2, 3])
+    assert rows.storage is ctx.matrix.storage
+    assert all(is_spilled(col.values) for col in rows.columns)
+    assert is_spilled(rows.stack_columns())
+
+    X, y = ctx._float_training_data()
+    assert is_spilled(X)
+    assert ctx._float_split().sparse_train is X
+
+    ctx.fit(sklearn.linear_model.LinearRegression())
+    assert len(acc.candidates) == 1
+    assert acc.warnings == []
+
+    with pytest.raises(autom8.Autom8Exception) as excinfo:
+        autom8.create_context(dataset, spill=1)
+    excinfo.match('Expected.*spill')
+
+
+def test_sampling_columns():
+    names = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
+    dataset = [names] + [[
+        i % 5,
+        i,
+        f'some text {i}',
+        f's{i % 3}',
+        'x' if i == 150 else str(i),
+        'y' if i == 0 else str(i),
+        99 if i == 137 else i % 4,
+        None if i % 10 == 0 else i % 7,
+    ] for i in range(300)]
+
+    results = []
+    for sample_size in [None, 20, 60]:
+        acc = autom8.Accumulator()
+        ctx = autom8.create_context(dataset, target_column='A',
+            sample_size=sample_size, receiver=acc)
+        autom8.clean_dataset(ctx)
+        autom8.infer_roles(ctx)
+        results.append((
+            ctx.matrix.formulas,
+            repr(ctx.matrix.tolist()),
+            [col.role for col in ctx.matrix.columns],
+            [step.func for step in ctx.steps],
+            acc.warnings,
+        ))
+
+    assert results[0] == results[1] == results[2]
+    assert results[0][2] == ['numerical', 'textual', 'categorical', 'textual',
+        'textual', 'categorical', 'categorical', 'encoded']
+
+    for sample_size in [0, True, 1.5]:
+        with pytest.raises(autom8.Autom8Exception) as excinfo:
+            autom8.create_context(dataset, sample_size=sample_size)
+        excinfo.match('Expected.*sample_size')
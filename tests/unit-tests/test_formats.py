@@ -1,10 +1,24 @@
+from io import BytesIO, StringIO
 import os.path
 
+import numpy as np
+import pytest
+
+import autom8
+import autom8.formats
+from autom8.pipeline import PredictionReport
 from autom8.formats import (
     decode_csv,
+    decode_csv_batches,
+    drop_empty_rows,
+    empty_row_mask,
+    encode_csv,
     excel_column_index,
     excel_column_name,
+    plan_csv_ranges,
     read_csv,
+    read_csv_batches,
+    write_csv,
 )
 
 
@@ -78,9 +92,12 @@ def test_decode_csv_with_hex_numbers():
 
 
 def _read_csv(name):
+    return read_csv(_dataset_path(name))
+
+
+def _dataset_path(name):
     testdir = os.path.dirname(os.path.dirname(__file__))
-    path = os.path.join(testdir, 'datasets', name)
-    return read_csv(path)
+    return os.path.join(testdir, 'datasets', name)
 
 
 def test_excel_column_name():
@@ -153,3 +170,149 @@ def test_excel_column_conversions():
 
     for s in ['FOO', 'BAR', 'BAZ', 'FIZ', 'BUZ', 'ZIM', 'ZAM', 'BIM', 'BAM']:
         assert excel_column_name(excel_column_index(s)) == s
+
+
+def test_read_csv_batches():
+    for name in ['boston.csv', 'iris.csv', 'wine.csv']:
+        expected = _read_csv(name)
+        batches = list(read_csv_batches(_dataset_path(name), batch_size=50))
+        assert all(len(batch) <= 50 for batch in batches)
+        assert [row for batch in batches for row in batch] == expected
+
+
+def test_decode_csv_batches():
+    payload = 'foo,bar\n1,2.5\n"x, y",0xff\n\n3,4\n'.encode('utf-8')
+    batches = list(decode_csv_batches(BytesIO(payload), batch_size=2))
+    assert batches == [
+        [['foo', 'bar'], [1, 2.5]],
+        [['x, y', 255], []],
+        [[3, 4]],
+    ]
+    assert list(decode_csv_batches(BytesIO(b''))) == []
+
+
+def test_decode_csv_batches_with_non_ascii_text():
+    payload = ('name,city\n' + 'a,b\n' * 40000 + 'x,Zürich\n').encode('utf-8')
+    rows = [row for batch in decode_csv_batches(BytesIO(payload)) for row in batch]
+    assert len(rows) == 40002
+    assert rows[0] == ['name', 'city']
+    assert rows[-1] == ['x', 'Zürich']
+
+
+def test_decode_csv_batches_with_late_latin_1_text(tmp_path):
+    # The first 64KB are plain ASCII, so they look like UTF-8.
+    text = 'name,city\n' + 'a,b\n' * 40000 + 'x,Zürich\n'
+    payload = text.encode('latin-1')
+    batches = decode_csv_batches(BytesIO(payload))
+    rows = [row for batch in batches for row in batch]
+    assert len(rows) == 40002
+    assert rows[-1] == ['x', 'Zürich']
+
+    path = tmp_path / 'dataset.csv'
+    path.write_bytes(payload)
+    matrix = autom8.load_csv(path, receiver=autom8.Accumulator())
+    assert matrix.columns[1].values[-1] == 'Zürich'
+
+
+def test_read_csv_in_parallel():
+    for name in ['boston.csv', 'iris.csv', 'wine.csv']:
+        path = _dataset_path(name)
+        assert read_csv(path, processes=3) == read_csv(path, processes=1)
+
+
+def test_splitting_csv_at_row_boundaries(tmp_path, monkeypatch):
+    path = tmp_path / 'dataset.csv'
+    path.write_bytes((
+        'id,note\r\n'
+        + ''.join(f'{i},"a {i},\nb"\r\n\r\n' for i in range(200))
+    ).encode('utf-8'))
+
+    monkeypatch.setattr(autom8.formats, 'max_range_size', 100)
+    plan = plan_csv_ranges(str(path), processes=2)
+    assert len(plan.ranges) > 20
+
+    payload = path.read_bytes()
+    for start, end in plan.ranges:
+        assert payload[:start].count(b'"') % 2 == 0
+        assert start == 0 or payload[start - 1:start] == b'\n'
+
+    expected = read_csv(str(path), processes=1)
+    assert read_csv(str(path), processes=2) == expected
+    assert expected[1] == [0, 'a 0,\nb']
+
+
+def test_read_csv_uses_one_process_by_default(monkeypatch):
+    def fail(*a, **k):
+        raise AssertionError('Unexpected process pool')
+
+    monkeypatch.setattr(autom8.formats, 'ProcessPoolExecutor', fail)
+    path = _dataset_path('wine.csv')
+    assert plan_csv_ranges(path) is None
+    assert read_csv(path) == read_csv(path, processes=1)
+
+
+def test_planning_csv_ranges(tmp_path):
+    path = tmp_path / 'dataset.csv'
+    path.write_text('a,b\n1,2\n')
+    assert plan_csv_ranges(str(path)) is None
+    assert plan_csv_ranges(str(path), processes=1) is None
+    assert plan_csv_ranges(str(path), processes=2).ranges == [(0, 8)]
+
+    path.write_text('a,b\n1,2\n', encoding='utf-16')
+    assert plan_csv_ranges(str(path), processes=2) is None
+
+    with pytest.raises(ValueError):
+        plan_csv_ranges(str(path), processes=0)
+
+
+def test_empty_row_mask_matches_drop_empty_rows():
+    rng = np.random.RandomState(0)
+    cells = [None, '', ' ', '\t\n', 'a', ' b ', 0, 1.5, False]
+    rows = [[cells[i] for i in rng.randint(len(cells), size=3)]
+        for _ in range(2000)]
+    rows += [[None, '', ' ']] * 10
+
+    columns = [np.array([row[i] for row in rows], dtype=object) for i in range(3)]
+    mask = empty_row_mask(columns)
+    assert [row for row, m in zip(rows, mask) if not m] == drop_empty_rows(rows)
+
+    strings = [np.array([' ', 'a', '']), np.array(['', ' ', '\t'])]
+    assert empty_row_mask(strings).tolist() == [True, False, True]
+
+
+def test_write_csv_matches_encode_csv():
+    matrix = autom8.create_matrix(_read_csv('iris.csv'))
+    expected = encode_csv([matrix.column_names] + matrix.tolist())
+
+    out = StringIO()
+    assert write_csv(out, matrix, batch_size=7) == len(matrix)
+    assert out.getvalue() == expected
+
+    out = StringIO()
+    batches = iter([matrix.select_rows(range(0, 50)), matrix.select_rows(range(50, 150))])
+    assert write_csv(out, batches) == 150
+    assert out.getvalue() == expected
+
+
+def test_write_csv_with_predictions(tmp_path):
+    reports = iter([
+        PredictionReport(['a', 'b'], [[('a', 0.75), ('b', 0.25)], [('b', 1.0)]]),
+        PredictionReport([], []),
+        PredictionReport(['c'], [[('c', 0.5)]]),
+    ])
+    path = str(tmp_path / 'predictions.csv')
+    assert write_csv(path, reports) == 3
+    assert read_csv(path) == [
+        ['prediction', 'probability'], ['a', 0.75], ['b', 1.0], ['c', 0.5],
+    ]
+
+    out = StringIO()
+    write_csv(out, PredictionReport([1.5, 2.5], None), column_names=['y'])
+    assert out.getvalue() == 'y\r\n1.5\r\n2.5\r\n'
+
+    out = StringIO()
+    write_csv(out, [np.arange(2), ['x', None]])
+    assert out.getvalue() == '0,x\r\n1,\r\n'
+
+    with pytest.raises(autom8.Autom8Exception):
+        write_csv(out, 'foo')
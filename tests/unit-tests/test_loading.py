@@ -0,0 +1,134 @@
+import os.path
+import pathlib
+import numpy as np
+import pytest
+
+import autom8
+import autom8.formats
+from autom8.loading import ColumnBuilder
+
+
+def test_loading_datasets():
+    for name in ['boston.csv', 'iris.csv', 'wine.csv']:
+        path = _dataset_path(name)
+        expected = autom8.create_matrix(autom8.read_csv(path))
+        received = autom8.load_csv(path, batch_size=64)
+        _assert_same_matrix(received, expected)
+
+
+def test_loading_messy_csv(tmp_path):
+    path = _write(tmp_path, (
+        'id,amount,code,note\n'
+        '1,"1,200",0xff,hello\n'
+        '\n'
+        '2,3.5,0x10,\n'
+        ' , ,,\n'
+        '3,,12,"a, b"\n'
+        '99999999999999999999,4,5,6,7\n'
+    ))
+
+    for batch_size in [1, 2, 3, 100]:
+        a1 = autom8.Accumulator()
+        a2 = autom8.Accumulator()
+        expected = autom8.create_matrix(autom8.read_csv(path), receiver=a1)
+        received = autom8.load_csv(path, receiver=a2, batch_size=batch_size)
+        _assert_same_matrix(received, expected)
+        assert a1.warnings == a2.warnings
+
+
+def test_loading_csv_in_parallel(tmp_path, monkeypatch):
+    path = _write(tmp_path, (
+        'id,amount,note\n'
+        + ''.join(f'{i},{i / 4},"x\n{i % 3}"\n\n' for i in range(300))
+        + '1e400,?,z,extra\n'
+    ))
+
+    # Use tiny byte ranges, so that each process gets several of them.
+    monkeypatch.setattr(autom8.formats, 'max_range_size', 256)
+
+    a1 = autom8.Accumulator()
+    a2 = autom8.Accumulator()
+    expected = autom8.load_csv(path, receiver=a1, processes=1)
+    received = autom8.load_csv(path, receiver=a2, processes=3)
+    _assert_same_matrix(received, expected)
+    assert a1.warnings == a2.warnings
+
+    for name in ['boston.csv', 'iris.csv', 'wine.csv']:
+        path = _dataset_path(name)
+        expected = autom8.create_matrix(autom8.read_csv(path))
+        _assert_same_matrix(autom8.load_csv(path, processes=2), expected)
+
+
+def test_loading_csv_without_column_names(tmp_path):
+    path = _write(tmp_path, '1,2.5,x\n3,4.5,y\n')
+    matrix = autom8.load_csv(path)
+    assert matrix.column_names == ['A', 'B', 'C']
+    assert matrix.tolist() == [[1, 2.5, 'x'], [3, 4.5, 'y']]
+    assert matrix.columns[0].dtype == np.int64
+    assert matrix.columns[1].dtype == np.float64
+
+    matrix = autom8.load_csv(path,
+        column_names=['foo', 'bar', 'baz'],
+        column_roles={'baz': 'categorical'},
+    )
+    assert matrix.column_names == ['foo', 'bar', 'baz']
+    assert matrix.columns[2].role == 'categorical'
+    assert len(matrix) == 2
+
+    matrix = autom8.load_csv(path, column_names='included')
+    assert matrix.column_names == ['1', '2.5', 'x']
+    assert matrix.tolist() == [[3, 4.5, 'y']]
+
+    with pytest.raises(autom8.Autom8Exception):
+        autom8.load_csv(path, column_names=['foo'])
+
+
+def test_loading_empty_csv(tmp_path):
+    matrix = autom8.load_csv(_write(tmp_path, ''))
+    assert matrix.columns == []
+
+
+def test_column_builder_promotes_types():
+    builder = ColumnBuilder()
+    builder.append_cells(['1', '2'])
+    assert builder.dtype == np.int64
+
+    builder.append_cells(['3.5', '4'])
+    assert builder.finish().dtype == np.float64
+    assert builder.finish().tolist() == [1.0, 2.0, 3.5, 4.0]
+
+    # Once the column contains strings, the ints stay ints, just like they
+    # would if we had parsed every cell at once.
+    builder.append_cells(['n/a', '0x1f'])
+    assert builder.dtype == object
+    assert len(builder) == 6
+    assert repr(builder.finish().tolist()) == repr([1, 2, 3.5, 4, 'n/a', 31])
+
+
+def _assert_same_matrix(received, expected):
+    assert received.column_names == expected.column_names
+    assert [c.dtype for c in received.columns] == [c.dtype for c in expected.columns]
+    assert repr(received.tolist()) == repr(expected.tolist())
+
+
+def test_only_paths_are_loaded_as_files(tmp_path):
+    path = _write(tmp_path, 'a,b\n1,x\n2,y\n')
+    matrix = autom8.create_matrix(pathlib.Path(path))
+    assert matrix.column_names == ['a', 'b']
+    assert matrix.tolist() == [[1, 'x'], [2, 'y']]
+
+    # A string is never read as a file, even when the file exists.
+    with pytest.raises(autom8.Autom8Exception) as excinfo:
+        autom8.create_matrix(path)
+    excinfo.match('Expected.*pathlib.Path')
+
+
+def _write(tmp_path, text):
+    path = tmp_path / 'dataset.csv'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def _dataset_path(name):
+    testdir = os.path.dirname(os.path.dirname(__file__))
+    return os.path.join(testdir, 'datasets', name)
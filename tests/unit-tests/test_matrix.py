@@ -1,6 +1,10 @@
+import pickle
+
 import pytest
 import numpy as np
+import pandas as pd
 import autom8
+from autom8.matrix import _looks_like_column_names, header_sample_size
 
 
 def test_invalid_arguments():
@@ -13,9 +17,17 @@ def test_invalid_arguments():
     excinfo.match('Expected.*list')
 
     with pytest.raises(autom8.Autom8Exception) as excinfo:
-        autom8.create_matrix({})
+        autom8.create_matrix({'A': 1})
+    excinfo.match('Expected.*list')
+
+    with pytest.raises(autom8.Autom8Exception) as excinfo:
+        autom8.create_matrix(set())
     excinfo.match('Expected.*list')
 
+    with pytest.raises(autom8.Autom8Exception) as excinfo:
+        autom8.create_matrix({'A': [1, 2], 'B': [3]})
+    excinfo.match('Expected.*equal length')
+
 
 def test_empty_datasets():
     for data in [[], (), np.array([]), autom8.Matrix([])]:
@@ -406,3 +418,282 @@ def test_coerce_values_to_numbers_with_weird_values():
     matrix = autom8.create_matrix([[1], [2.0], ['3'], ['hi'], [object()], [4]])
     matrix.coerce(int)
     assert matrix.tolist() == [[1], [2], [3], [0], [0], [4]]
+
+
+def test_creating_matrix_from_batches():
+    dataset = [
+        ['name', 'count', 'score'],
+        ['a', 1, 1.5],
+        [],
+        ['b', 2, 2],
+        ['c', 3, 'n/a'],
+        ['d', 4, 4.5, 'extra'],
+    ]
+    a1 = autom8.Accumulator()
+    a2 = autom8.Accumulator()
+    m1 = autom8.create_matrix(dataset, receiver=a1)
+    m2 = autom8.create_matrix(
+        iter([dataset[:1], dataset[1:4], [], dataset[4:]]), receiver=a2,
+    )
+
+    assert m2.column_names == m1.column_names == ['name', 'count', 'score']
+    assert repr(m2.tolist()) == repr(m1.tolist())
+    assert [c.dtype for c in m2.columns] == [c.dtype for c in m1.columns]
+    assert a2.warnings == a1.warnings
+    assert len(a2.warnings) == 2
+
+
+def test_creating_matrix_from_dataframe():
+    df = pd.DataFrame({
+        'count': np.arange(4),
+        'score': [1.5, 2.0, np.nan, 4.5],
+        'name': ['a', None, 'c', ' '],
+        'kind': pd.Categorical(['x', 'y', 'x', None]),
+    })
+    matrix = autom8.create_matrix(df)
+
+    assert matrix.column_names == ['count', 'score', 'name', 'kind']
+    assert np.shares_memory(matrix.columns[0].values, df['count'].to_numpy())
+    assert np.shares_memory(matrix.columns[1].values, df['score'].to_numpy())
+    assert matrix.columns[2].values.tolist() == ['a', None, 'c', ' ']
+    assert matrix.columns[3].values.tolist() == ['x', 'y', 'x', None]
+
+    matrix = autom8.create_matrix(df, column_names=['A', 'B', 'C', 'D'],
+        column_roles={'D': 'categorical'})
+    assert matrix.column_names == ['A', 'B', 'C', 'D']
+    assert matrix.columns[3].role == 'categorical'
+
+
+def test_creating_matrix_from_columns():
+    ints = np.arange(5)
+    floats = np.linspace(0, 1, 5)
+    m1 = autom8.create_matrix({'i': ints, 'f': floats, 's': list('abcde')})
+    assert m1.column_names == ['i', 'f', 's']
+    assert m1.columns[0].values is ints
+    assert m1.columns[1].values is floats
+    assert m1.columns[2].dtype == object
+
+    records = np.array([(1, 2.5), (3, 4.5)], dtype=[('a', 'i8'), ('b', 'f8')])
+    m2 = autom8.create_matrix(records)
+    assert m2.column_names == ['a', 'b']
+    assert m2.tolist() == [[1, 2.5], [3, 4.5]]
+    assert np.shares_memory(m2.columns[0].values, records)
+
+    array = np.arange(12.0).reshape(4, 3)
+    m3 = autom8.create_matrix(array)
+    assert m3.column_names == ['A', 'B', 'C']
+    assert m3.tolist() == array.tolist()
+    assert all(np.shares_memory(c.values, array) for c in m3.columns)
+
+
+def test_dropping_empty_rows_from_columns():
+    acc = autom8.Accumulator()
+    matrix = autom8.create_matrix({
+        'a': ['x', None, '', 'y'],
+        'b': ['1', ' ', None, 2],
+    }, receiver=acc)
+    assert matrix.tolist() == [['x', '1'], ['y', 2]]
+    assert acc.warnings == ['Dropped 2 empty rows from dataset.']
+
+
+def test_header_detection_matches_python_version():
+    def expected(first_row, remaining):
+        if all(isinstance(i, str) for i in first_row):
+            return True
+        for first, rest in zip(first_row, remaining):
+            has_name = isinstance(first, str)
+            has_nums = any(i is not None and not isinstance(i, str) for i in rest)
+            no_strs = all(not isinstance(i, str) or i == '' for i in rest)
+            if has_name and len(rest) > 0 and has_nums and no_strs:
+                return True
+        return False
+
+    n = header_sample_size + 10
+    columns = [
+        np.arange(n),
+        np.array(['x'] * n),
+        np.array([1, None, ''] * n, dtype=object),
+        np.array([None, ''] * n, dtype=object),
+        np.array([1] * n + ['late string'], dtype=object),
+        np.array([], dtype=object),
+    ]
+    for first in [1, 'name']:
+        for col in columns:
+            first_row = [first, 2]
+            remaining = [col, np.arange(len(col))]
+            received = _looks_like_column_names(first_row, remaining)
+            assert received == expected(first_row, remaining)
+
+
+def test_creating_matrix_from_2d_object_array():
+    rows = [['a', 'b', 'c'], [1, 'x', None], [None, '', ' '], [2, 'y', 3.5]]
+    a1 = autom8.Accumulator()
+    a2 = autom8.Accumulator()
+    m1 = autom8.create_matrix(rows, receiver=a1)
+    m2 = autom8.create_matrix(np.array(rows, dtype=object), receiver=a2)
+    assert m2.column_names == m1.column_names == ['a', 'b', 'c']
+    assert m2.tolist() == m1.tolist()
+    assert [c.dtype for c in m2.columns] == [c.dtype for c in m1.columns]
+    assert a2.warnings == a1.warnings
+
+
+def test_float_block_storage():
+    matrix = autom8.create_matrix({'a': [1, 2, 3], 'b': [0.5, 1.5, 2.5]})
+    array = matrix._float_array()
+    assert array.tolist() == [[1, 0.5], [2, 1.5], [3, 2.5]]
+    assert array.flags.f_contiguous
+    assert all(np.shares_memory(c.values, array) for c in matrix.columns)
+
+    # Calling _float_array again shouldn't copy anything.
+    assert np.shares_memory(matrix._float_array(), array)
+    assert np.shares_memory(matrix.stack_columns(), array)
+
+    # Appending columns of floats should keep the matrix packed.
+    for i in range(5):
+        matrix.append_column(np.array([i, i, i], dtype=float), f'c{i}', None)
+    assert matrix._is_packed()
+    assert matrix._float_array().tolist() == [
+        [1, 0.5, 0, 1, 2, 3, 4],
+        [2, 1.5, 0, 1, 2, 3, 4],
+        [3, 2.5, 0, 1, 2, 3, 4],
+    ]
+
+    # Copies don't share the block, and they can't write into it.
+    copy = matrix.copy()
+    assert copy._block is None
+    with pytest.raises(ValueError):
+        copy.columns[0].values[0] = 100
+    assert matrix.columns[0].values[0] == 1
+
+    # Replacing or dropping columns means that the block has to be rebuilt.
+    matrix.columns[1].values = np.array([7, 8, 9])
+    matrix.drop_columns_by_index([0])
+    assert not matrix._is_packed()
+    assert matrix._float_array()[:, :2].tolist() == [[7, 0], [8, 0], [9, 0]]
+    assert matrix._is_packed()
+
+    # Appending other kinds of values simply unpacks the matrix.
+    matrix.append_column(np.array(['x', 'y', 'z']), 'd', None)
+    assert not matrix._is_packed()
+    assert matrix.stack_columns().shape == (3, 7)
+
+
+def test_copies_share_values_until_replaced():
+    m1 = autom8.create_matrix({'a': np.arange(4), 'b': ['w', 'x', 'y', 'z']})
+    m2 = m1.copy()
+    m3 = m1.select_columns([1])
+
+    for a, b in zip(m1.columns, m2.columns):
+        assert not a.values.flags.writeable
+        assert not b.values.flags.writeable
+
+    # The column of strings is packed into a StringArray, which is immutable.
+    assert np.shares_memory(m1.columns[0].values, m2.columns[0].values)
+    assert m1.columns[1]._values is m2.columns[1]._values
+
+    with pytest.raises(ValueError):
+        m2.columns[0].values[0] = 10
+
+    # Changing a copy means giving it new values.
+    m2.columns[0].values = np.array([10, 1, 2, 3])
+    m3.columns[0].values = np.array(['v', 'x', 'y', 'z'], dtype=object)
+    assert m1.tolist() == [[0, 'w'], [1, 'x'], [2, 'y'], [3, 'z']]
+    assert m2.columns[0].values.tolist() == [10, 1, 2, 3]
+    assert m3.columns[0].values.tolist() == ['v', 'x', 'y', 'z']
+
+
+def test_column_index():
+    m = autom8.create_matrix([['A', 'B', 'C'], [1, 2, 3]])
+    assert m.column_index('B') == 1
+    assert m.column_index('D') is None
+    assert m.select_columns_by_name(['C', 'A']).tolist() == [[3, 1]]
+
+    # The index notices when the columns or their formulas change.
+    m.append_column(np.array([4]), formula=['double', m.columns[1]], role=None)
+    m.columns[0].formula = 'D'
+    assert m.column_index(['double', 'B']) == 3
+    assert m.column_index('A') is None
+    assert m.column_index('D') == 0
+    assert m.column_names == ['D', 'B', 'C', "['double', 'B']"]
+
+    m.drop_columns_by_index([3, 0, 0, 10])
+    assert m.column_names == ['B', 'C']
+    assert m.column_index('C') == 1
+
+
+def test_dictionary_encoded_strings():
+    m = autom8.create_matrix({
+        'a': ['x', 'y', None, 'x', 'y', 'x'],
+        'b': ['p', 'q', 'r', 's', 't', 'u'],
+        'c': ['1', 1, '1', 1, '1', 1],
+    })
+
+    # Only the column of repeated strings gets encoded.
+    assert [col.is_dictionary for col in m.columns] == [True, False, False]
+    a = m.columns[0]
+    assert a._values.categories.tolist() == ['x', 'y', None]
+    assert a._values.codes.dtype == np.uint8
+    assert a.values.tolist() == ['x', 'y', None, 'x', 'y', 'x']
+    assert not a.values.flags.writeable
+
+    # Copies and row selections keep the encoding.
+    assert m.copy().columns[0]._values is a._values
+    assert m.select_rows([3, 2]).columns[0].values.tolist() == ['x', None]
+    assert m.exclude_rows([0, 1]).columns[0].values.tolist() == [None, 'x', 'y', 'x']
+    assert m.select_rows([0, 2]).columns[0].is_dictionary
+
+    # Coercing to numbers converts each distinct value once.
+    m2 = autom8.create_matrix({'a': ['1', '2.5', '1', '1']})
+    m2.columns[0].coerce(float)
+    assert m2.columns[0].values.tolist() == [1.0, 2.5, 1.0, 1.0]
+
+    # New values replace the encoding.
+    m.columns[0].values = np.array(['z', 'y', None, 'x', 'y', 'x'],
+        dtype=object)
+    assert m.columns[0].values.tolist() == ['z', 'y', None, 'x', 'y', 'x']
+    assert not m.columns[0].is_dictionary
+
+
+def test_text_columns_use_string_buffers(tmp_path):
+    text = [f'row {i}: naïve café' for i in range(100)]
+    m = autom8.create_matrix({'a': text, 'b': text[:99] + [None]})
+
+    # The None value gets masked.
+    assert [col.is_text for col in m.columns] == [True, True]
+    assert m.columns[1].values.tolist() == text[:99] + [None]
+    a = m.columns[0]
+    assert a.values.tolist() == text
+    assert a.nbytes < len(text) * 30
+    assert m.select_rows([5, 1]).columns[0].values.tolist() == [text[5], text[1]]
+    assert m.exclude_rows(list(range(98))).columns[0].values.tolist() == text[98:]
+
+    # The column pickles as two arrays, instead of one object per string.
+    copy = pickle.loads(pickle.dumps(a))
+    assert copy.is_text
+    assert copy.values.tolist() == text
+
+    m.spill(autom8.SpillStorage(str(tmp_path)))
+    assert m.columns[0].is_text
+    assert m.columns[0].nbytes == 0
+    assert m.columns[0].values.tolist() == text
+
+
+def test_masked_columns():
+    m = autom8.create_matrix({'a': [1.5, None, 2.5, None], 'b': [1, 2.5, None, 3]})
+
+    # Only a column of one type of number gets a mask.
+    a, b = m.columns
+    assert a._values.tolist() == [1.5, 0.0, 2.5, 0.0]
+    assert a.mask.tolist() == [True, False, True, False]
+    assert a.dtype == object
+    assert b.mask is None
+
+    assert m.copy().columns[0].mask is a.mask
+    assert m.select_rows([1, 2]).columns[0].values.tolist() == [None, 2.5]
+    assert m.exclude_rows([0]).columns[0].values.tolist() == [None, 2.5, None]
+    assert m.stack_columns()[:, 0].tolist() == [1.5, None, 2.5, None]
+
+    # Setting new values replaces the mask.
+    a.coerce(float)
+    assert a.mask is None
+    assert a.values.tolist() == [1.5, 0.0, 2.5, 0.0]
@@ -1,5 +1,7 @@
 import math
 import numpy as np
+import scipy.sparse
+import sklearn.linear_model
 
 import autom8
 from autom8.pipeline import PlaybackContext
@@ -159,6 +161,27 @@ def test_drop_duplicate_columns():
     assert repr(_playback(ctx, roles, features)) == repr(ctx.matrix.tolist())
 
 
+def test_drop_duplicate_lazy_columns(monkeypatch):
+    monkeypatch.setattr(autom8.preprocessors, 'duplicate_sample_size', 4)
+    features = [[float(i % 2), i + 0.5, i % 2 + (i == 4) * 2.0]
+        for i in range(10)]
+    roles = ['numerical'] * 3
+
+    ctx = _create_context(features, roles)
+    autom8.square_columns(ctx)
+    squares = ctx.matrix.columns[3:]
+    assert all(col.is_lazy for col in squares)
+
+    # The square of column A is a copy of column A. Column C and its square
+    # match column A in the sampled rows, but not in row 4. So only the
+    # square of column B stays lazy.
+    autom8.drop_duplicate_columns(ctx)
+    assert ctx.matrix.formulas == ['A', 'B', 'C',
+        ['square', 'B'], ['square', 'C']]
+    assert ctx.matrix.columns[3].is_lazy
+    assert not ctx.matrix.columns[4].is_lazy
+
+
 def test_ordinal_encode_categories():
     features = [
         [1.1, 10, 'foo', 'bar', True, 5.0],
@@ -246,6 +269,29 @@ def test_ordinal_encode_categories():
     ]
 
 
+def test_encoding_dictionary_columns():
+    features = [['ab'[i % 2], 'xyz'[i % 3], 'xyz'[i % 3]] for i in range(12)]
+    roles = [None] * 3
+
+    ctx = _create_context(features, roles)
+    assert all(col.is_dictionary for col in ctx.matrix.columns[:3])
+
+    autom8.infer_roles(ctx)
+    assert [col.role for col in ctx.matrix.columns[:3]] == ['categorical'] * 3
+
+    # The copies of column B get the same signature.
+    autom8.drop_duplicate_columns(ctx)
+    assert ctx.matrix.formulas == ['A', 'B']
+
+    autom8.encode_categories(ctx, method='ordinal', only_strings=True)
+    assert ctx.matrix.tolist()[:4] == [[1, 1], [2, 2], [1, 3], [2, 1]]
+
+    # Playback gets the same result from plain object columns.
+    plain = [['ab'[i % 2], 'stuvwxyz'[i % 8], 'xyz'[i % 3]] for i in range(8)]
+    assert not _create_matrix(plain, roles).columns[1].is_dictionary
+    assert _playback(ctx, roles, plain)[:4] == [[1, 0], [2, 0], [1, 0], [2, 0]]
+
+
 def test_one_hot_encode_categories():
     features = [
         [1, 10, 'foo', 'bar', -1.0],
@@ -313,6 +359,34 @@ def test_one_hot_encode_categories():
     ]
 
 
+def test_one_hot_encoded_columns_are_sparse():
+    features = [[i, 'abcde'[i % 5], i % 3] for i in range(20)]
+    roles = ['numerical', 'categorical', 'categorical']
+    ctx = _create_context(features, roles)
+    ctx.labels = ctx.labels._replace(encoded=np.arange(20.0))
+    ctx.test_indices = [0, 1, 2, 3]
+    autom8.encode_categories(ctx, method='one-hot', only_strings=False)
+
+    assert [col.is_sparse for col in ctx.matrix.columns] == [False] + [True] * 8
+    assert ctx.matrix.columns[1].values.tolist() == [True, False, False, False, False] * 4
+
+    # The estimators get a sparse matrix, without a dense intermediate.
+    X, y = ctx._float_training_data()
+    assert scipy.sparse.isspmatrix_csr(X)
+    assert X.shape == (16, 9)
+    assert X.toarray().tolist() == ctx.matrix.copy().stack_columns()[4:].tolist()
+
+    acc = autom8.Accumulator()
+    ctx.receiver = acc
+    ctx.fit(sklearn.linear_model.LinearRegression())
+    assert len(acc.candidates) == 1
+
+    # Selecting weak columns keeps the other columns sparse.
+    autom8.drop_weak_columns(ctx)
+    assert acc.warnings == []
+    assert all(col.is_sparse for col in ctx.matrix.columns[1:])
+
+
 def test_ordinal_encode_categories_when_something_goes_wrong():
     import autom8.categories
 
@@ -536,6 +610,55 @@ def test_multiply_colums():
     ]
 
 
+def test_multiply_columns_with_one_numerical_column():
+    features = [[1, 'foo'], [2, 'bar'], [3, 'foo']]
+    ctx = _create_context(features, ['numerical', 'categorical'])
+    autom8.multiply_columns(ctx)
+
+    assert len(ctx.steps) == 0
+    assert ctx.matrix.formulas == ['A', 'B']
+
+
+def test_derived_columns_are_lazy():
+    features = [[1, 4], [2, 5], [3, 0]]
+    roles = ['numerical'] * 2
+    ctx = _create_context(features, roles)
+
+    autom8.multiply_columns(ctx)
+    autom8.square_columns(ctx)
+    autom8.divide_columns(ctx)
+    autom8.logarithm_columns(ctx)
+    autom8.sqrt_columns(ctx)
+
+    derived = ctx.matrix.columns[2:]
+    assert len(derived) == 7
+    assert all(col.is_lazy for col in derived)
+
+    # The estimators get the values without computing the context's columns.
+    X, _ = ctx._float_training_data()
+    assert all(col.is_lazy for col in derived)
+
+    # Copies share the computed values.
+    copy = ctx.matrix.copy()
+    expected = [
+        [1, 4, 4, 1, 16, 4, 0, 1, 2],
+        [2, 5, 10, 4, 25, 2.5, math.log(2), math.sqrt(2), math.sqrt(5)],
+        [3, 0, 0, 9, 0, 0, math.log(3), math.sqrt(3), 0],
+    ]
+    assert np.allclose(ctx.matrix.tolist(), expected)
+    assert all(a.values is b.values for a, b in zip(derived, copy.columns[2:]))
+
+    rows = sorted(set(range(3)) - set(ctx.test_indices))
+    assert np.allclose(X, [expected[i] for i in rows])
+
+    # Stacking computes the lazy columns directly into the result.
+    m1 = _create_matrix(features, roles)
+    ctx1 = PlaybackContext(m1, autom8.Accumulator())
+    playback(ctx.steps, ctx1)
+    assert np.allclose(ctx1.matrix.stack_columns(), expected)
+    assert all(col.is_lazy for col in ctx1.matrix.columns[2:])
+
+
 def test_scale_columns():
     features = [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10], [11, 12]]
     roles = ['numerical'] * 2